@@ -7,13 +7,15 @@ simulates trades, and reports performance metrics.
 Usage:
     python backtest.py
     python backtest.py --symbol XAUUSD --days 180
+    python backtest.py --offline          # Use cached candles only
+    python backtest.py --workers 8 --chunk-days 90
 """
 
 import sys
 import io
 import argparse
 from datetime import datetime, timedelta
-from dataclasses import dataclass, field
+from dataclasses import dataclass
 from typing import List, Optional
 
 import pandas as pd
@@ -21,30 +23,97 @@ import numpy as np
 
 import config
 import mt5_connector as mt5c
-from indicators import calculate_emas, are_emas_stacked, get_200ema_bias
-from fvg_detector import find_fvgs
-from trident_pattern import validate_trident_pattern
-from time_filter import is_in_kill_zone
+import candle_store
+import kernels
+from columnar import NAT, ColumnStore, RowView, epoch_ns_array
+from indicators import calculate_emas, stacked_mask
+from mtf_panel import MTFPanel, closed_bar_count
+from time_filter import get_server_now
+from trident_pattern import BUY, SELL, scan_all_signals
 from logger import setup_logger
 
 log = setup_logger("Backtest")
 
 
 # ─── Trade Record ──────────────────────────────────────────────────────────────
-@dataclass
-class BacktestTrade:
-    """Record of a simulated trade."""
-    symbol: str
-    direction: str          # "BUY" or "SELL"
-    entry_price: float
-    entry_time: datetime
-    stop_loss: float
-    exit_price: float = 0.0
-    exit_time: Optional[datetime] = None
-    pnl_pips: float = 0.0
-    rr_ratio: float = 0.0
-    result: str = "OPEN"    # "WIN", "LOSS", "OPEN"
-    exit_reason: str = ""
+# Enum codes of TradeArrays.result / TradeArrays.exit_reason
+OPEN, WIN, LOSS = 0, 1, 2
+EXIT_REASONS = {
+    0: "",
+    1: "Stop loss hit",
+    2: "Gold candle close filter",
+    3: "Daily EMA unstack",
+    4: "Max hold period",
+}
+
+
+class TradeArrays(ColumnStore):
+    """Simulated trades of one symbol, one typed array per field (export order)."""
+    FIELDS = {
+        "direction": "i1",      # BUY or SELL
+        "entry_time": "i8",
+        "entry_price": "f8",
+        "stop_loss": "f8",
+        "exit_time": "i8",
+        "exit_price": "f8",
+        "pnl_pips": "f8",
+        "rr_ratio": "f8",
+        "result": "i1",         # OPEN, WIN or LOSS
+        "exit_reason": "i1",    # Key of EXIT_REASONS
+    }
+    ENUMS = {
+        "direction": {BUY: "BUY", SELL: "SELL"},
+        "result": {OPEN: "OPEN", WIN: "WIN", LOSS: "LOSS"},
+        "exit_reason": EXIT_REASONS,
+    }
+    TIMES = ("entry_time", "exit_time")
+
+    def __init__(self, symbol: str = "", capacity: int = 0):
+        super().__init__(capacity)
+        self.symbol = symbol
+
+    def _frame_prefix(self) -> dict:
+        return {"symbol": self.symbol}
+
+    @classmethod
+    def entries(cls, symbol: str, direction: np.ndarray, entry_time: np.ndarray,
+                entry_price: np.ndarray, stop_loss: np.ndarray) -> "TradeArrays":
+        """Open trades from entry columns (direction codes, epoch-ns times)."""
+        count = len(direction)
+        zeros = np.zeros(count)
+        return cls.from_columns({
+            "direction": direction,
+            "entry_time": entry_time,
+            "entry_price": entry_price,
+            "stop_loss": stop_loss,
+            "exit_time": np.full(count, NAT, dtype=np.int64),
+            "exit_price": zeros,
+            "pnl_pips": zeros.copy(),
+            "rr_ratio": zeros.copy(),
+            "result": np.full(count, OPEN, dtype=np.int8),
+            "exit_reason": np.zeros(count, dtype=np.int8),
+        }, symbol=symbol)
+
+
+class BacktestTrade(RowView):
+    """Record of a simulated trade (a row view of a TradeArrays)."""
+    __slots__ = ()
+    _fields = ("symbol",) + tuple(TradeArrays.FIELDS)
+
+    def __init__(self, symbol: str, direction: str, entry_price: float,
+                 entry_time: datetime, stop_loss: float, **fields):
+        """Stand-alone trade backed by its own one-row TradeArrays."""
+        trades = TradeArrays(symbol, capacity=1)
+        trades.add(direction=direction, entry_price=entry_price,
+                   entry_time=entry_time, stop_loss=stop_loss, **fields)
+        super().__init__(trades, 0)
+
+    @property
+    def symbol(self) -> str:
+        return self._store.symbol
+
+
+TradeArrays.bind(BacktestTrade)
 
 
 # ─── Backtest Engine ───────────────────────────────────────────────────────────
@@ -61,7 +130,11 @@ class BacktestResult:
     max_drawdown_pips: float = 0.0
     best_trade_pips: float = 0.0
     worst_trade_pips: float = 0.0
-    trades: List[BacktestTrade] = field(default_factory=list)
+    trades: Optional[TradeArrays] = None
+
+    def __post_init__(self):
+        if self.trades is None:
+            self.trades = TradeArrays(self.symbol)
 
 
 def get_pip_value(symbol: str) -> float:
@@ -75,123 +148,304 @@ def get_pip_value(symbol: str) -> float:
         return 0.0001
 
 
+@dataclass
+class ExitContext:
+    """
+    Per-symbol arrays for exit simulation, built once per backtest.
+
+    daily_count[i] is the number of daily candles closed by the close of 30M
+    bar i (see mtf_panel — the forming daily candle is never included).
+    unstack_long[k] / unstack_short[k] say whether the daily EMA stack
+    breaks on the k-th daily candle (evaluated on the first k candles).
+    """
+    times: np.ndarray          # df_30m["time"] as int64 epoch ns
+    close: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    daily_count: Optional[np.ndarray]
+    unstack_long: Optional[np.ndarray]
+    unstack_short: Optional[np.ndarray]
+
+
+def _daily_unstack_events(df_daily: pd.DataFrame, direction: str,
+                          periods: Optional[List[int]] = None) -> np.ndarray:
+    """
+    For every prefix length k, whether the daily EMAs are no longer stacked on
+    candle k-1 but were stacked on candle k-2 (needs at least 5 candles).
+    EMAs are causal, so one pass over the full frame equals recomputing
+    them on each prefix.
+    """
+    if periods is None:
+        periods = config.EMA_FAST_PERIODS
+    daily = calculate_emas(df_daily.copy(), periods)
+    emas = [daily[f"ema_{p}"].to_numpy(dtype=np.float64) for p in periods]
+    stacked = stacked_mask(emas, direction)
+
+    events = np.zeros(len(daily) + 1, dtype=bool)
+    k = np.arange(5, len(daily) + 1)
+    events[k] = ~stacked[k - 1] & stacked[k - 2]
+    return events
+
+
+def build_exit_context(df_30m: pd.DataFrame, df_daily: pd.DataFrame,
+                       fast_periods: Optional[List[int]] = None,
+                       daily_count: Optional[np.ndarray] = None) -> ExitContext:
+    """
+    Precompute the arrays simulate_trade_exit needs for a symbol. Pass the
+    daily_count of an MTFPanel to reuse its alignment.
+    """
+    unstack_long = unstack_short = None
+    if df_daily.empty:
+        daily_count = None
+    else:
+        if daily_count is None:
+            daily_count = closed_bar_count(epoch_ns_array(df_30m["time"].array),
+                                           epoch_ns_array(df_daily["time"].array))
+        unstack_long = _daily_unstack_events(df_daily, "long", fast_periods)
+        unstack_short = _daily_unstack_events(df_daily, "short", fast_periods)
+
+    return ExitContext(
+        times=epoch_ns_array(df_30m["time"].array),
+        close=df_30m["close"].to_numpy(dtype=np.float64),
+        high=df_30m["high"].to_numpy(dtype=np.float64),
+        low=df_30m["low"].to_numpy(dtype=np.float64),
+        daily_count=daily_count,
+        unstack_long=unstack_long,
+        unstack_short=unstack_short,
+    )
+
+
+def _first_true(mask: np.ndarray) -> Optional[int]:
+    """Index of the first True in mask, or None."""
+    idx = int(np.argmax(mask)) if len(mask) else 0
+    return idx if len(mask) and mask[idx] else None
+
+
 def simulate_trade_exit(df_30m: pd.DataFrame, df_daily: pd.DataFrame,
                         trade: BacktestTrade, entry_bar_idx: int,
-                        pip_value: float) -> BacktestTrade:
+                        pip_value: float,
+                        ctx: Optional[ExitContext] = None,
+                        gold_close_pct: Optional[float] = None) -> BacktestTrade:
     """
     Simulate forward from entry to find the exit point.
     
     Exit conditions:
     1. Price hits stop loss (candle close for Gold, hard SL for others)
-    2. Daily EMAs break stacking
-    3. Significant opposing candle on daily chart
-    4. Max hold: 20 daily candles (safety net)
+    2. Daily EMAs break stacking (checked every 48 bars ≈ 1 day of 30M)
+    3. Max hold: 960 30M bars (~20 days, safety net)
+
+    Each condition is evaluated as an array over the holding window and the
+    earliest event wins (stop loss first when both fire on the same bar).
+    Pass a prebuilt ExitContext when simulating many trades on one symbol.
+    With gold_close_pct set, Gold exits on a close that far beyond the entry
+    price (the live check_gold_candle_filter rule) instead of beyond the SL.
     """
+    if ctx is None:
+        ctx = build_exit_context(df_30m, df_daily)
+
     is_gold = trade.symbol.upper() in ["XAUUSD", "GOLD"]
-    risk_pips = abs(trade.entry_price - trade.stop_loss) / pip_value
+    is_buy = trade.direction == "BUY"
 
     # Scan forward through 30M candles
-    max_bars = min(len(df_30m), entry_bar_idx + 960)  # ~20 days of 30M bars
-
-    for i in range(entry_bar_idx + 1, max_bars):
-        candle = df_30m.iloc[i]
-
-        if trade.direction == "BUY":
-            # Check stop loss hit
-            if not is_gold:
-                if candle["low"] <= trade.stop_loss:
-                    trade.exit_price = trade.stop_loss
-                    trade.exit_time = candle["time"]
-                    trade.pnl_pips = (trade.exit_price - trade.entry_price) / pip_value
-                    trade.result = "LOSS"
-                    trade.exit_reason = "Stop loss hit"
-                    return trade
-            else:
-                # Gold: candle CLOSE filter
-                if candle["close"] <= trade.stop_loss:
-                    trade.exit_price = candle["close"]
-                    trade.exit_time = candle["time"]
-                    trade.pnl_pips = (trade.exit_price - trade.entry_price) / pip_value
-                    trade.result = "LOSS"
-                    trade.exit_reason = "Gold candle close filter"
-                    return trade
-
-        elif trade.direction == "SELL":
-            if not is_gold:
-                if candle["high"] >= trade.stop_loss:
-                    trade.exit_price = trade.stop_loss
-                    trade.exit_time = candle["time"]
-                    trade.pnl_pips = (trade.entry_price - trade.exit_price) / pip_value
-                    trade.result = "LOSS"
-                    trade.exit_reason = "Stop loss hit"
-                    return trade
-            else:
-                if candle["close"] >= trade.stop_loss:
-                    trade.exit_price = candle["close"]
-                    trade.exit_time = candle["time"]
-                    trade.pnl_pips = (trade.entry_price - trade.exit_price) / pip_value
-                    trade.result = "LOSS"
-                    trade.exit_reason = "Gold candle close filter"
-                    return trade
-
-        # Check daily exit conditions every ~48 bars (1 day of 30M)
-        if (i - entry_bar_idx) % 48 == 0 and not df_daily.empty:
-            # Find the corresponding daily candle
-            candle_date = candle["time"].date() if hasattr(candle["time"], "date") else candle["time"]
-            daily_up_to = df_daily[df_daily["time"].dt.date <= candle_date] if hasattr(df_daily["time"].dt, "date") else df_daily
-
-            if len(daily_up_to) >= 5:
-                daily_subset = calculate_emas(daily_up_to.copy(), config.EMA_FAST_PERIODS)
-
-                if trade.direction == "BUY":
-                    if not are_emas_stacked(daily_subset, "long", -1):
-                        was_stacked = are_emas_stacked(daily_subset, "long", -2)
-                        if was_stacked:
-                            trade.exit_price = candle["close"]
-                            trade.exit_time = candle["time"]
-                            trade.pnl_pips = (trade.exit_price - trade.entry_price) / pip_value
-                            trade.result = "WIN" if trade.pnl_pips > 0 else "LOSS"
-                            trade.exit_reason = "Daily EMA unstack"
-                            return trade
-
-                elif trade.direction == "SELL":
-                    if not are_emas_stacked(daily_subset, "short", -1):
-                        was_stacked = are_emas_stacked(daily_subset, "short", -2)
-                        if was_stacked:
-                            trade.exit_price = candle["close"]
-                            trade.exit_time = candle["time"]
-                            trade.pnl_pips = (trade.entry_price - trade.exit_price) / pip_value
-                            trade.result = "WIN" if trade.pnl_pips > 0 else "LOSS"
-                            trade.exit_reason = "Daily EMA unstack"
-                            return trade
-
-    # Max hold reached — close at last candle
-    if max_bars < len(df_30m):
-        last_candle = df_30m.iloc[max_bars - 1]
+    n = len(ctx.close)
+    max_bars = min(n, entry_bar_idx + 960)  # ~20 days of 30M bars
+    lo = entry_bar_idx + 1
+
+    def pnl(exit_price):
+        if is_buy:
+            return (exit_price - trade.entry_price) / pip_value
+        return (trade.entry_price - exit_price) / pip_value
+
+    # ─── Stop loss ─────────────────────────────────────────────────────
+    if is_gold:
+        # Gold: candle CLOSE filter
+        level = trade.stop_loss
+        if gold_close_pct is not None:
+            level = trade.entry_price * ((1 - gold_close_pct) if is_buy else (1 + gold_close_pct))
+        closes = ctx.close[lo:max_bars]
+        sl_mask = closes <= level if is_buy else closes >= level
+    elif is_buy:
+        sl_mask = ctx.low[lo:max_bars] <= trade.stop_loss
     else:
-        last_candle = df_30m.iloc[-1]
+        sl_mask = ctx.high[lo:max_bars] >= trade.stop_loss
+    sl_hit = _first_true(sl_mask)
+    sl_bar = None if sl_hit is None else lo + sl_hit
+
+    # ─── Daily EMA unstack, checked once per ~day of 30M bars ──────────
+    daily_bar = None
+    if ctx.daily_count is not None:
+        check_bars = np.arange(entry_bar_idx + 48, max_bars, 48)
+        if sl_bar is not None:
+            check_bars = check_bars[check_bars < sl_bar]
+        events = ctx.unstack_long if is_buy else ctx.unstack_short
+        hit = _first_true(events[ctx.daily_count[check_bars]])
+        if hit is not None:
+            daily_bar = int(check_bars[hit])
+
+    if sl_bar is not None and (daily_bar is None or sl_bar <= daily_bar):
+        if is_gold:
+            trade.exit_price = ctx.close[sl_bar]
+            trade.exit_reason = "Gold candle close filter"
+        else:
+            trade.exit_price = trade.stop_loss
+            trade.exit_reason = "Stop loss hit"
+        trade.exit_time = ctx.times[sl_bar]
+        trade.pnl_pips = pnl(trade.exit_price)
+        trade.result = "LOSS"
+        return trade
+
+    if daily_bar is not None:
+        trade.exit_price = ctx.close[daily_bar]
+        trade.exit_time = ctx.times[daily_bar]
+        trade.pnl_pips = pnl(trade.exit_price)
+        trade.result = "WIN" if trade.pnl_pips > 0 else "LOSS"
+        trade.exit_reason = "Daily EMA unstack"
+        return trade
 
-    trade.exit_price = last_candle["close"]
-    trade.exit_time = last_candle["time"]
-    if trade.direction == "BUY":
-        trade.pnl_pips = (trade.exit_price - trade.entry_price) / pip_value
-    else:
-        trade.pnl_pips = (trade.entry_price - trade.exit_price) / pip_value
+    # Max hold reached — close at last candle
+    last_idx = max_bars - 1 if max_bars < n else n - 1
+    trade.exit_price = ctx.close[last_idx]
+    trade.exit_time = ctx.times[last_idx]
+    trade.pnl_pips = pnl(trade.exit_price)
     trade.result = "WIN" if trade.pnl_pips > 0 else "LOSS"
     trade.exit_reason = "Max hold period"
     return trade
 
 
-def backtest_symbol(symbol: str, days: Optional[int] = None) -> BacktestResult:
+def simulate_trades(trades: TradeArrays, entry_idx: np.ndarray, pip_value: float,
+                    ctx: ExitContext, gold_close_pct: Optional[float] = None) -> TradeArrays:
+    """
+    Simulate every trade in trades (entered on bar entry_idx[i]) and fill in
+    exit, PnL, R:R and result — simulate_trade_exit() for a whole batch.
+    With kernels.ENABLED the bar walk of all trades is one compiled loop.
+    """
+    if not kernels.ENABLED:
+        for trade, bar in zip(trades, entry_idx):
+            simulate_trade_exit(None, None, trade, int(bar), pip_value,
+                                ctx=ctx, gold_close_pct=gold_close_pct)
+            risk = abs(trade.entry_price - trade.stop_loss)
+            trade.rr_ratio = trade.pnl_pips * pip_value / risk if risk > 0 else 0.0
+        return trades
+
+    is_gold = trades.symbol.upper() in ["XAUUSD", "GOLD"]
+    is_buy = trades.column("direction") == BUY
+    entry = trades.column("entry_price")
+    stop = trades.column("stop_loss")
+    level = stop
+    if is_gold and gold_close_pct is not None:
+        level = entry * np.where(is_buy, 1 - gold_close_pct, 1 + gold_close_pct)
+
+    exit_idx, reason = kernels.exit_bars(
+        entry_idx, is_buy, stop, level, np.full(len(trades), is_gold),
+        ctx.close, ctx.high, ctx.low,
+        ctx.daily_count, ctx.unstack_long, ctx.unstack_short,
+    )
+
+    exit_price = np.where(reason == kernels.EXIT_STOP_LOSS, stop, ctx.close[exit_idx])
+    pnl = np.where(is_buy, exit_price - entry, entry - exit_price) / pip_value
+    risk = np.abs(entry - stop)
+    stopped = (reason == kernels.EXIT_STOP_LOSS) | (reason == kernels.EXIT_GOLD_CLOSE)
+
+    trades.column("exit_time")[:] = ctx.times[exit_idx]
+    trades.column("exit_price")[:] = exit_price
+    trades.column("pnl_pips")[:] = pnl
+    trades.column("rr_ratio")[:] = np.divide(pnl * pip_value, risk, out=np.zeros_like(pnl),
+                                             where=risk > 0)
+    trades.column("result")[:] = np.where(stopped | ~(pnl > 0), LOSS, WIN)
+    trades.column("exit_reason")[:] = reason
+    return trades
+
+
+def load_history(symbol: str, date_from: datetime, date_to: datetime,
+                 offline: bool = False):
+    """Load 30M and daily candles for a symbol from the local candle cache."""
+    df_30m = candle_store.load_candles(symbol, config.ENTRY_TIMEFRAME,
+                                       date_from, date_to, refresh=not offline)
+    df_daily = candle_store.load_candles(symbol, config.BIAS_TIMEFRAME,
+                                         date_from, date_to, refresh=not offline)
+    return df_30m, df_daily
+
+
+def run_backtest(symbol: str, df_30m: pd.DataFrame, df_daily: pd.DataFrame,
+                 start_idx: int = 0, end_idx: Optional[int] = None) -> BacktestResult:
+    """
+    Scan df_30m for Trident signals and simulate every trade.
+
+    Only signals whose confirmation candle lies in [start_idx, end_idx) are
+    traded; bars outside that range serve as EMA warm-up / exit look-ahead.
+    Summary stats are not filled in — see summarize_result().
+    """
+    result = BacktestResult(symbol=symbol)
+    pip_value = get_pip_value(symbol)
+    if end_idx is None:
+        end_idx = len(df_30m)
+
+    # EMAs and the 30M → daily alignment, computed once for the dataset
+    panel = MTFPanel(symbol, df_30m, df_daily)
+    df_30m = panel.entry
+    exit_ctx = build_exit_context(df_30m, panel.bias, daily_count=panel.bias_count)
+
+    # Single pass over the full history — every signal carries its
+    # absolute confirmation index into df_30m
+    signals = scan_all_signals(df_30m, symbol, check_time=True)
+    confirm_idx = signals.column("confirmation_idx")
+    signals = signals.select((start_idx <= confirm_idx) & (confirm_idx < end_idx))
+    log.info(f"Found {len(signals)} Trident signals")
+
+    # Simulate every trade forward
+    result.trades = simulate_trades(
+        TradeArrays.entries(symbol, signals.column("direction"), signals.column("signal_time"),
+                            signals.column("entry_price"), signals.column("stop_loss")),
+        signals.column("confirmation_idx"), pip_value, exit_ctx,
+    )
+
+    for trade in result.trades:
+        win_mark = "[WIN]" if trade.result == "WIN" else "[LOSS]"
+        log.info(f"  {win_mark} {trade.direction} @ {trade.entry_price:.5f} -> "
+                 f"{trade.exit_price:.5f} | {trade.pnl_pips:+.1f} pips | "
+                 f"R:R {trade.rr_ratio:+.1f} | {trade.exit_reason} | "
+                 f"{trade.entry_time}")
+
+    return result
+
+
+def summarize_result(result: BacktestResult) -> BacktestResult:
+    """Fill in the aggregate statistics from result.trades."""
+    outcome = result.trades.column("result")
+    pnl_values = result.trades.column("pnl_pips")
+    rr_values = result.trades.column("rr_ratio")
+    rr_values = rr_values[rr_values != 0]
+
+    result.total_trades = len(result.trades)
+    result.wins = int(np.count_nonzero(outcome == WIN))
+    result.losses = int(np.count_nonzero(outcome == LOSS))
+    result.win_rate = (result.wins / result.total_trades * 100) if result.total_trades > 0 else 0
+    result.total_pnl_pips = float(pnl_values.sum())
+    result.avg_rr = float(rr_values.mean()) if len(rr_values) else 0.0
+    result.best_trade_pips = float(pnl_values.max()) if len(pnl_values) else 0.0
+    result.worst_trade_pips = float(pnl_values.min()) if len(pnl_values) else 0.0
+
+    # Max drawdown
+    if len(pnl_values):
+        cumulative = np.cumsum(pnl_values)
+        running_max = np.maximum.accumulate(cumulative)
+        drawdowns = running_max - cumulative
+        result.max_drawdown_pips = float(np.max(drawdowns))
+
+    return result
+
+
+def backtest_symbol(symbol: str, days: Optional[int] = None,
+                    offline: bool = False) -> BacktestResult:
     """
     Run backtest for a single symbol.
     
-    Fetches historical data, scans for Trident patterns, simulates entries/exits.
+    Loads historical data from the local candle cache (topped up from MT5
+    unless offline), scans for Trident patterns, simulates entries/exits.
     """
     if days is None:
         days = config.BACKTEST_DAYS
 
-    result = BacktestResult(symbol=symbol)
     pip_value = get_pip_value(symbol)
 
     log.info(f"{'='*60}")
@@ -199,102 +453,108 @@ def backtest_symbol(symbol: str, days: Optional[int] = None) -> BacktestResult:
     log.info(f"{'='*60}")
 
     # Fetch historical data
-    date_to = datetime.now()
+    date_to = get_server_now()  # Same clock as the candle times
     date_from = date_to - timedelta(days=days)
-
-    df_30m = mt5c.get_candles_range(symbol, config.ENTRY_TIMEFRAME, date_from, date_to)
-    df_daily = mt5c.get_candles_range(symbol, config.BIAS_TIMEFRAME, date_from, date_to)
+    df_30m, df_daily = load_history(symbol, date_from, date_to, offline=offline)
 
     if df_30m.empty:
         log.warning(f"No 30M data for {symbol}")
-        return result
+        return BacktestResult(symbol=symbol)
 
     log.info(f"Loaded {len(df_30m)} bars (30M) and {len(df_daily)} bars (Daily)")
 
-    # Calculate EMAs on full dataset
-    all_periods = config.EMA_FAST_PERIODS + [config.EMA_TREND_PERIOD]
-    df_30m = calculate_emas(df_30m, all_periods)
-
-    if not df_daily.empty:
-        df_daily = calculate_emas(df_daily, config.EMA_FAST_PERIODS)
-
-    # Sliding window scan — step by window_size to avoid duplicate detections
-    window_size = 50  # Look at 50 candles at a time
-    seen_entry_times = set()  # Track unique trades by entry time
-    last_trade_idx = -window_size
-
-    for start_idx in range(0, len(df_30m) - window_size, window_size // 2):
-        # Skip if too close to last trade
-        if start_idx - last_trade_idx < 10:
-            continue
-
-        window = df_30m.iloc[start_idx:start_idx + window_size].copy().reset_index(drop=True)
-
-        # Scan for Trident Pattern (time check enabled for kill zone)
-        signal = validate_trident_pattern(window, symbol, check_time=True)
-
-        if signal:
-            # Deduplicate: skip if we already found a trade at this entry time
-            entry_key = (str(signal.signal_time), signal.entry_price, signal.direction)
-            if entry_key in seen_entry_times:
-                continue
-            seen_entry_times.add(entry_key)
-
-            # Map confirmation index back to main DataFrame
-            actual_confirm_idx = start_idx + signal.confirmation_idx
-
-            trade = BacktestTrade(
-                symbol=symbol,
-                direction=signal.direction,
-                entry_price=signal.entry_price,
-                entry_time=signal.signal_time,
-                stop_loss=signal.stop_loss,
-            )
-
-            # Simulate the trade forward
-            trade = simulate_trade_exit(
-                df_30m, df_daily, trade,
-                actual_confirm_idx, pip_value
-            )
-
-            # Calculate R:R
-            risk = abs(trade.entry_price - trade.stop_loss)
-            if risk > 0:
-                trade.rr_ratio = trade.pnl_pips * pip_value / risk
-            else:
-                trade.rr_ratio = 0.0
+    result = run_backtest(symbol, df_30m, df_daily)
+    return summarize_result(result)
 
-            result.trades.append(trade)
-            last_trade_idx = start_idx
 
-            win_mark = "[WIN]" if trade.result == "WIN" else "[LOSS]"
-            log.info(f"  {win_mark} {trade.direction} @ {trade.entry_price:.5f} -> "
-                     f"{trade.exit_price:.5f} | {trade.pnl_pips:+.1f} pips | "
-                     f"R:R {trade.rr_ratio:+.1f} | {trade.exit_reason} | "
-                     f"{trade.entry_time}")
+# ─── Parallel Runner ───────────────────────────────────────────────────────────
+WARMUP_BARS = getattr(config, "BACKTEST_WARMUP_BARS", 1000)  # EMA warm-up before each chunk
+MAX_HOLD_BARS = 960  # Forward bars simulate_trade_exit may look at
 
-    # Calculate summary stats
-    result.total_trades = len(result.trades)
-    result.wins = sum(1 for t in result.trades if t.result == "WIN")
-    result.losses = sum(1 for t in result.trades if t.result == "LOSS")
-    result.win_rate = (result.wins / result.total_trades * 100) if result.total_trades > 0 else 0
-    result.total_pnl_pips = sum(t.pnl_pips for t in result.trades)
 
-    rr_values = [t.rr_ratio for t in result.trades if t.rr_ratio != 0]
-    result.avg_rr = np.mean(rr_values) if rr_values else 0.0
+@dataclass
+class BacktestTask:
+    """One unit of parallel work: a symbol and a slice of the date range."""
+    symbol: str
+    date_from: datetime      # Full range (defines the cached data to map)
+    date_to: datetime
+    chunk_from: datetime     # Signals are only taken inside [chunk_from, chunk_to)
+    chunk_to: datetime
 
-    pnl_values = [t.pnl_pips for t in result.trades]
-    result.best_trade_pips = max(pnl_values) if pnl_values else 0.0
-    result.worst_trade_pips = min(pnl_values) if pnl_values else 0.0
 
-    # Max drawdown
-    if pnl_values:
-        cumulative = np.cumsum(pnl_values)
-        running_max = np.maximum.accumulate(cumulative)
-        drawdowns = running_max - cumulative
-        result.max_drawdown_pips = np.max(drawdowns)
+def _run_task(task: BacktestTask) -> BacktestResult:
+    """
+    Worker entry point. Candles come from the memory-mapped cache files, so
+    every worker shares the same read-only pages instead of its own copy.
+    """
+    df_30m, df_daily = load_history(task.symbol, task.date_from, task.date_to, offline=True)
+    if df_30m.empty:
+        return BacktestResult(symbol=task.symbol)
+
+    times = df_30m["time"].to_numpy()
+    start = int(np.searchsorted(times, np.datetime64(task.chunk_from), side="left"))
+    end = int(np.searchsorted(times, np.datetime64(task.chunk_to), side="left"))
+    if start >= end:
+        return BacktestResult(symbol=task.symbol)
+
+    # Warm-up overlap for the 200 EMA before the chunk, exit look-ahead after it
+    lo = max(0, start - WARMUP_BARS)
+    hi = min(len(df_30m), end + MAX_HOLD_BARS + 1)
+    window = df_30m.iloc[lo:hi].reset_index(drop=True)
+
+    return run_backtest(task.symbol, window, df_daily, start - lo, end - lo)
+
+
+def make_tasks(symbols: List[str], date_from: datetime, date_to: datetime,
+               chunk_days: Optional[int] = None) -> List[BacktestTask]:
+    """Split every symbol's date range into chunks (one chunk if chunk_days is None)."""
+    tasks = []
+    for symbol in symbols:
+        chunk_from = date_from
+        while chunk_from < date_to:
+            chunk_to = date_to + timedelta(seconds=1)
+            if chunk_days:
+                chunk_to = min(chunk_from + timedelta(days=chunk_days), chunk_to)
+            tasks.append(BacktestTask(symbol, date_from, date_to, chunk_from, chunk_to))
+            chunk_from = chunk_to
+    return tasks
+
+
+def backtest_parallel(symbols: List[str], days: int, workers: int,
+                      chunk_days: Optional[int] = None,
+                      offline: bool = False) -> List[BacktestResult]:
+    """
+    Fan symbols (and optional date chunks) out to a process pool (run in
+    this process when workers is 1).
 
-    return result
+    The candle cache is topped up once in this process, then workers read it
+    offline. Chunk results are merged per symbol in chronological order, so
+    output does not depend on worker scheduling.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    date_to = get_server_now()  # Same clock as the candle times
+    date_from = date_to - timedelta(days=days)
+
+    if not offline:
+        for symbol in symbols:
+            for tf in (config.ENTRY_TIMEFRAME, config.BIAS_TIMEFRAME):
+                candle_store.update_cache(symbol, tf, date_from, date_to)
+
+    tasks = make_tasks(symbols, date_from, date_to, chunk_days)
+    log.info(f"Running {len(tasks)} backtest tasks on {workers} workers")
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunk_results = list(pool.map(_run_task, tasks))
+    else:
+        chunk_results = [_run_task(task) for task in tasks]
+
+    merged = {symbol: BacktestResult(symbol=symbol) for symbol in symbols}
+    for task, chunk in zip(tasks, chunk_results):
+        merged[task.symbol].trades.extend(chunk.trades)
+
+    return [summarize_result(merged[symbol]) for symbol in symbols]
 
 
 def print_results(results: List[BacktestResult]):
@@ -332,27 +592,15 @@ def print_results(results: List[BacktestResult]):
 
 
 def save_results_csv(results: List[BacktestResult], filename: str = "backtest_results.csv"):
-    """Save all trades to a CSV file for further analysis."""
-    rows = []
-    for r in results:
-        for t in r.trades:
-            rows.append({
-                "symbol": t.symbol,
-                "direction": t.direction,
-                "entry_time": t.entry_time,
-                "entry_price": t.entry_price,
-                "stop_loss": t.stop_loss,
-                "exit_time": t.exit_time,
-                "exit_price": t.exit_price,
-                "pnl_pips": t.pnl_pips,
-                "rr_ratio": t.rr_ratio,
-                "result": t.result,
-                "exit_reason": t.exit_reason,
-            })
-
-    if rows:
-        df = pd.DataFrame(rows)
-        df.to_csv(filename, index=False)
+    """Save all trades for further analysis (Parquet if filename ends in .parquet)."""
+    frames = [r.trades.to_frame() for r in results if len(r.trades)]
+
+    if frames:
+        df = pd.concat(frames, ignore_index=True)
+        if filename.endswith(".parquet"):
+            df.to_parquet(filename, index=False)
+        else:
+            df.to_csv(filename, index=False)
         log.info(f"Results saved to {filename}")
     else:
         log.info("No trades to save.")
@@ -365,7 +613,13 @@ def main():
     parser.add_argument("--days", type=int, default=config.BACKTEST_DAYS,
                         help=f"Number of days to backtest (default: {config.BACKTEST_DAYS})")
     parser.add_argument("--output", type=str, default="backtest_results.csv",
-                        help="CSV output filename")
+                        help="Output filename (.csv, or .parquet with pyarrow installed)")
+    parser.add_argument("--offline", action="store_true",
+                        help="Use only the local candle cache (no MT5 connection)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Worker processes for parallel backtesting (default: 1)")
+    parser.add_argument("--chunk-days", type=int, default=None,
+                        help="Split each symbol into date chunks of this size (also without --workers)")
     args = parser.parse_args()
 
     # Fix Windows console encoding
@@ -376,24 +630,28 @@ def main():
     print("  TG Capital Playbook -- Trident Pattern Backtest")
     print("=" * 60)
 
-    # Connect to MT5 for historical data
-    if not mt5c.connect():
+    # Connect to MT5 to top up the candle cache
+    if not args.offline and not mt5c.connect():
         log.error("Failed to connect to MT5. Make sure MT5 is open and logged in.")
         sys.exit(1)
 
     try:
         symbols = [args.symbol] if args.symbol else config.SYMBOLS
-        results = []
 
-        for symbol in symbols:
-            result = backtest_symbol(symbol, days=args.days)
-            results.append(result)
+        if args.workers > 1 or args.chunk_days:
+            results = backtest_parallel(symbols, args.days, args.workers,
+                                        chunk_days=args.chunk_days,
+                                        offline=args.offline)
+        else:
+            results = [backtest_symbol(symbol, days=args.days, offline=args.offline)
+                       for symbol in symbols]
 
         print_results(results)
         save_results_csv(results, args.output)
 
     finally:
-        mt5c.disconnect()
+        if not args.offline:
+            mt5c.disconnect()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,481 @@
+"""
+Benchmark — timings of the detection and backtest hot paths on synthetic data.
+
+Candles are a seeded random walk with complete Trident sequences (FVG,
+doji wicking into its midpoint, confirmation candle) injected at regular
+intervals, so every stage has real work to do. Each benchmark runs on every
+requested size; the best of several runs is kept.
+
+Results can be saved as a JSON baseline, and later runs compared against
+it. The run fails (exit code 1) when any timing is slower than the
+baseline by more than --threshold. Runs offline; MetaTrader5 is not needed.
+
+--check runs consistency checks instead of timings: the compiled kernels
+against the NumPy implementations (signals and simulated trades, field by
+field), the rolling FVGIndex against full detection on every live-size
+window, and the event journal reader on written, empty and truncated
+journals. It fails (exit code 1) on any difference. Without numba the
+kernels run as plain Python, so the check still compares both code paths.
+
+Usage:
+    python benchmark.py                                  # 1k, 10k, 100k bars
+    python benchmark.py --sizes 1000,1000000 --save-baseline benchmark_baseline.json
+    python benchmark.py --baseline benchmark_baseline.json --threshold 0.25
+    python benchmark.py --check
+"""
+
+import sys
+import argparse
+import json
+import os
+import platform
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+
+import config
+
+# Benchmarks never talk to a terminal; this must be set before backtest
+# (and through it mt5_connector) is imported
+config.BROKER_BACKEND = "sim"
+
+import journal
+import kernels
+from backtest import (TradeArrays, build_exit_context, get_pip_value, simulate_trade_exit,
+                      simulate_trades)
+from columnar import epoch_ns_array
+from fvg_detector import BULLISH, detect_fvgs, find_fvgs
+from fvg_index import ACTIVE, INVALIDATED, MITIGATED, FVGIndex
+from indicators import calculate_emas
+from time_filter import compute_session_masks
+from trident_pattern import BUY, SELL, scan_all_signals, signal_rows, validate_trident_pattern
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+DEFAULT_THRESHOLD = 0.25    # Allowed slowdown vs. baseline (25%)
+MIN_RUNS = 3
+MIN_TIME = 0.2              # Seconds spent per benchmark and size (at least MIN_RUNS runs)
+EXIT_TRADES = 500           # Trades simulated by the exit benchmark
+LIVE_WINDOW = 200           # Bars handed to validate_trident_pattern by the live bot
+CHECK_DATASETS = [("EURUSD", 20_000, 0), ("XAUUSD", 20_000, 3)]  # --check: symbol, bars, seed
+CHECK_INDEX_BARS = 3_000    # Live windows replayed through FVGIndex by --check
+
+
+# ─── Synthetic data ────────────────────────────────────────────────────────────
+def _trident_sequence(price: float, unit: float, bullish: bool) -> np.ndarray:
+    """OHLC rows for FVG candles 1-3, the doji and the confirmation candle."""
+    rows = np.array([
+        # open  high  low   close
+        [0.00, 1.00, -1.00, 0.50],   # candle1
+        [0.50, 4.20, 0.40, 4.00],    # candle2 (impulse)
+        [4.00, 5.00, 2.00, 4.50],    # candle3 — gap between 1.00 and 2.00
+        [3.00, 3.50, 1.40, 3.05],    # doji wicking below the 1.50 midpoint
+        [3.05, 3.60, 2.90, 3.40],    # confirmation closing below the doji high
+    ])
+    if not bullish:
+        rows = -rows[:, [0, 2, 1, 3]]  # Mirror: high <-> low
+    return price + rows * unit
+
+
+def synthetic_candles(n: int, seed: int = 0, pattern_every: int = 40,
+                      start: str = "2024-01-01") -> pd.DataFrame:
+    """
+    n 30M candles: a trending random walk with a Trident sequence injected
+    every pattern_every bars (in the direction of the local drift).
+    """
+    rng = np.random.default_rng(seed)
+    unit = 0.0005
+    drift = np.repeat(rng.choice([-1.0, 1.0], size=n // 500 + 1), 500)[:n] * unit * 0.15
+    steps = drift + rng.normal(0.0, unit, n)
+
+    # Pattern closes replace the walk's steps, so the walk continues from them
+    starts = np.arange(pattern_every, n - 5, pattern_every)
+    bullish = drift[starts] > 0
+    sequences = np.stack([_trident_sequence(0.0, unit, True), _trident_sequence(0.0, unit, False)])
+    seq = sequences[np.where(bullish, 0, 1)]                  # (patterns, 5, 4) offsets
+    rows = starts[:, None] + np.arange(5)
+    steps[rows] = np.diff(seq[:, :, 3], axis=1, prepend=0.0)
+
+    close = 1.1 + np.cumsum(steps)
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    spread = np.abs(rng.normal(0.0, unit, (2, n)))
+    high = np.maximum(open_, close) + spread[0]
+    low = np.minimum(open_, close) - spread[1]
+    ohlc = np.stack([open_, high, low, close], axis=1)
+    ohlc[rows] = close[starts - 1][:, None, None] + seq
+
+    return pd.DataFrame({
+        "time": pd.date_range(start, periods=n, freq="30min"),
+        "open": ohlc[:, 0], "high": ohlc[:, 1], "low": ohlc[:, 2], "close": ohlc[:, 3],
+        "volume": rng.integers(100, 1000, n),
+    })
+
+
+def daily_from(df: pd.DataFrame) -> pd.DataFrame:
+    """Daily candles aggregated from 30M candles."""
+    return (df.resample("1D", on="time")
+              .agg({"open": "first", "high": "max", "low": "min", "close": "last",
+                    "volume": "sum"})
+              .dropna().reset_index())
+
+
+# ─── Timing ────────────────────────────────────────────────────────────────────
+def best_time(setup: Callable[[], tuple], func: Callable) -> float:
+    """Fastest of at least MIN_RUNS runs of func(*setup()); setup is not timed."""
+    best = float("inf")
+    spent = 0.0
+    runs = 0
+    while runs < MIN_RUNS or spent < MIN_TIME:
+        args = setup()
+        start = time.perf_counter()
+        func(*args)
+        elapsed = time.perf_counter() - start
+        best = min(best, elapsed)
+        spent += elapsed
+        runs += 1
+    return best
+
+
+def run_benchmarks(sizes: List[int], only: List[str] = None) -> Dict[str, Dict[str, float]]:
+    """{benchmark: {size: seconds}} for every hot path and size."""
+    periods = config.EMA_FAST_PERIODS + [config.EMA_TREND_PERIOD]
+    results: Dict[str, Dict[str, float]] = {}
+
+    def add(name, size, setup, func):
+        if only and name not in only:
+            return
+        seconds = best_time(setup, func)
+        results.setdefault(name, {})[str(size)] = seconds
+        print(f"  {name:<26} {size:>9,} bars  {seconds * 1000:10.3f} ms")
+
+    for size in sizes:
+        df = synthetic_candles(size)
+        df_emas = calculate_emas(df.copy(), periods)
+        df_daily = calculate_emas(daily_from(df), config.EMA_FAST_PERIODS)
+        fresh = lambda: (df_emas.copy(),)  # New frame per run: no cached session masks
+
+        add("calculate_emas", size, lambda: (df.copy(),), lambda d: calculate_emas(d, periods))
+        add("find_fvgs", size, fresh, lambda d: find_fvgs(d))
+        add("detect_fvgs", size, fresh, lambda d: detect_fvgs(d))
+        add("scan_all_signals", size, fresh, lambda d: scan_all_signals(d, "EURUSD"))
+        add("validate_trident_pattern", size, fresh,
+            lambda d: validate_trident_pattern(d, "EURUSD"))
+
+        # Live-size window: the last LIVE_WINDOW bars, as handed over by the bot
+        window = df_emas.iloc[-LIVE_WINDOW:].reset_index(drop=True)
+        add("validate_trident_window", size, lambda: (window.copy(),),
+            lambda d: validate_trident_pattern(d, "EURUSD"))
+
+        add("build_exit_context", size, lambda: (df, df_daily),
+            lambda d, dd: build_exit_context(d, dd))
+
+        ctx = build_exit_context(df, df_daily)
+        rng = np.random.default_rng(1)
+        entries = np.sort(rng.choice(np.arange(size - 1), size=min(EXIT_TRADES, size - 1),
+                                     replace=False))
+        close = df["close"].to_numpy()
+        times = df["time"].array
+
+        def exits(entries=entries):
+            trades = TradeArrays("EURUSD")
+            for i in entries:
+                buy = i % 2 == 0
+                trade = trades.add(direction="BUY" if buy else "SELL",
+                                   entry_price=close[i], entry_time=times[i],
+                                   stop_loss=close[i] - 0.002 if buy else close[i] + 0.002)
+                simulate_trade_exit(None, None, trade, int(i), 0.0001, ctx=ctx)
+
+        add("simulate_trade_exit", size, lambda: (), exits)
+
+        # Same trades as one batch (a compiled loop when numba is available)
+        is_buy = entries % 2 == 0
+        stops = np.where(is_buy, close[entries] - 0.002, close[entries] + 0.002)
+        entry_times = epoch_ns_array(times[entries])
+        add("simulate_trades", size,
+            lambda: (TradeArrays.entries("EURUSD", np.where(is_buy, 1, -1), entry_times,
+                                         close[entries], stops),),
+            lambda trades: simulate_trades(trades, entries, 0.0001, ctx))
+
+    return results
+
+
+# ─── Consistency checks ────────────────────────────────────────────────────────
+def _with_kernels(enabled: bool, func: Callable, *args, **kwargs):
+    """func(*args, **kwargs) with kernels.ENABLED forced on or off."""
+    saved = kernels.ENABLED
+    kernels.ENABLED = enabled
+    try:
+        return func(*args, **kwargs)
+    finally:
+        kernels.ENABLED = saved
+
+
+def _diff_trades(a: TradeArrays, b: TradeArrays) -> List[str]:
+    """Fields that differ between two trade stores (NaN equals NaN)."""
+    if len(a) != len(b):
+        return [f"{len(a)} vs {len(b)} trades"]
+    return [name for name in TradeArrays.FIELDS
+            if not np.array_equal(a.column(name), b.column(name),
+                                  equal_nan=a.column(name).dtype.kind == "f")]
+
+
+def check_backends(symbol: str, df: pd.DataFrame) -> List[str]:
+    """Differences between the compiled kernels and the NumPy paths on one data set."""
+    failures = []
+    df_emas = calculate_emas(df.copy(), config.EMA_FAST_PERIODS + [config.EMA_TREND_PERIOD])
+    ohlc = [df[k].to_numpy(dtype=np.float64) for k in ("open", "high", "low", "close")]
+    fvgs = detect_fvgs(df, check_time=False)
+    kill_zone = compute_session_masks(df["time"]).kill_zone
+    fast = [df_emas[f"ema_{p}"].to_numpy() for p in config.EMA_FAST_PERIODS]
+    trend = df_emas[f"ema_{config.EMA_TREND_PERIOD}"].to_numpy()
+
+    # NaN EMAs (warm-up gaps) must be rejected the same way by both paths
+    nan_fast = [ema.copy() for ema in fast]
+    for ema in nan_fast:
+        ema[::97] = np.nan
+
+    for name, emas, zone, threshold in [
+        ("signals", fast, kill_zone, None),
+        ("signals, no kill zone", fast, None, None),
+        ("signals, doji 0.5", fast, kill_zone, 0.5),
+        ("signals, NaN EMAs", nan_fast, None, None),
+    ]:
+        rows = [_with_kernels(enabled, signal_rows, fvgs, *ohlc, emas, trend,
+                              kill_zone=zone, doji_threshold=threshold)
+                for enabled in (True, False)]
+        if not np.array_equal(*rows):
+            failures.append(f"{symbol} {name}: {len(rows[0])} vs {len(rows[1])} rows")
+
+    # Every FVG's confirmation bar as an entry, both directions
+    confirm = fvgs.candle3_idx + 2
+    keep = confirm < len(df)
+    entry_idx = confirm[keep]
+    is_buy = fvgs.direction[keep] == BULLISH
+    close = ohlc[3]
+    stops = np.where(is_buy, fvgs.fvg_candle_low[keep], fvgs.fvg_candle_high[keep])
+    times = epoch_ns_array(df["time"].array)[entry_idx]
+
+    daily = daily_from(df)
+    ctx = build_exit_context(df, daily)
+    for name, context, gold_pct in [
+        ("trades", ctx, None),
+        ("trades, gold close pct", ctx, 0.003),
+        ("trades, no daily bars", build_exit_context(df, daily.iloc[:0]), None),
+    ]:
+        stores = [_with_kernels(enabled, simulate_trades,
+                                TradeArrays.entries(symbol, np.where(is_buy, BUY, SELL), times,
+                                                    close[entry_idx], stops),
+                                entry_idx, get_pip_value(symbol), context, gold_close_pct=gold_pct)
+                  for enabled in (True, False)]
+        fields = _diff_trades(*stores)
+        if fields:
+            failures.append(f"{symbol} {name}: {', '.join(fields)} differ")
+    return failures
+
+
+def check_fvg_index(df: pd.DataFrame, check_time: bool,
+                    bars: int = CHECK_INDEX_BARS) -> List[str]:
+    """
+    Differences between FVGIndex and full detection: live-size windows are
+    fed bar by bar (skipping a few bars now and then, like a late scan) and
+    the latest signal is compared; the gap states are checked against a
+    brute-force pass over the candles every LIVE_WINDOW bars.
+    """
+    failures = []
+    df = calculate_emas(df.copy(), config.EMA_FAST_PERIODS + [config.EMA_TREND_PERIOD])
+    times = epoch_ns_array(df["time"].array)
+    high, low, close = (df[k].to_numpy() for k in ("high", "low", "close"))
+    index = FVGIndex(check_time=check_time)
+    rng = np.random.default_rng(0)
+
+    def key(signal):
+        return None if signal is None else (signal.confirmation_idx, signal.entry_price,
+                                            signal.stop_loss, signal.fvg.top, signal.fvg.bottom)
+
+    def check_states():
+        last = int(np.searchsorted(times, index.last_time))
+        for gap in index.gaps():
+            after = slice(int(np.searchsorted(times, gap.candle1_time)) + 3, last + 1)
+            if gap.direction == BULLISH:
+                filled = low[after] <= gap.bottom
+                beyond = close[after] < gap.bottom
+            else:
+                filled = high[after] >= gap.top
+                beyond = close[after] > gap.top
+            invalid = (np.cumsum(filled) > 0) & beyond
+            expected = INVALIDATED if invalid.any() else MITIGATED if filled.any() else ACTIVE
+            if gap.status != expected:
+                failures.append(f"FVGIndex state of {gap!r}: expected {expected}")
+
+    end, next_state_check = LIVE_WINDOW, LIVE_WINDOW
+    while end < min(len(df), LIVE_WINDOW + bars):
+        window = df.iloc[end - LIVE_WINDOW:end].reset_index(drop=True)
+        full = validate_trident_pattern(window, "EURUSD", check_time=check_time)
+        index.update(window)
+        indexed = validate_trident_pattern(window, "EURUSD", check_time=check_time,
+                                           fvg_index=index)
+        if key(full) != key(indexed):
+            failures.append(f"FVGIndex signal differs at bar {end - 1}: "
+                            f"{key(indexed)} vs {key(full)}")
+        if end >= next_state_check:
+            check_states()
+            next_state_check += LIVE_WINDOW
+        end += 1 if rng.random() < 0.95 else int(rng.integers(2, 5))
+    check_states()
+    return failures
+
+
+def check_journal(df: pd.DataFrame) -> List[str]:
+    """Journal reader round trips: written bars, signature only, truncated first record."""
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        def write(name: str, bars: pd.DataFrame, keep_bytes: int = None) -> str:
+            path = os.path.join(tmp, name)
+            writer = journal.Journal(path)
+            for row in bars.itertuples(index=False):
+                writer.write(journal.BAR, b"EURUSD", 1800, journal._epoch(row.time),
+                             row.open, row.high, row.low, row.close, int(row.volume))
+            writer.close()
+            if keep_bytes is not None:
+                with open(path, "r+b") as f:
+                    f.truncate(keep_bytes)
+            return path
+
+        cases = [
+            ("round trip", write("full.bin", df), len(df)),
+            ("signature only", write("empty.bin", df.iloc[:0]), 0),
+            ("truncated record", write("cut.bin", df.iloc[:1],
+                                       len(journal.SIGNATURE) + journal.RECORD_SIZE // 2), 0),
+        ]
+        for name, path, expected in cases:
+            try:
+                with journal.JournalReader(path) as reader:
+                    arrays = reader.arrays(journal.BAR)
+                    bars = reader.bars("EURUSD", "TIMEFRAME_M30")
+            except Exception as e:
+                failures.append(f"journal {name}: {type(e).__name__}: {e}")
+                continue
+            if len(arrays) != expected or len(bars) != expected:
+                failures.append(f"journal {name}: {len(arrays)} records, "
+                                f"{len(bars)} bars (expected {expected})")
+            elif expected and not np.allclose(bars["close"].to_numpy(),
+                                              df["close"].to_numpy()):
+                failures.append(f"journal {name}: closes differ")
+    return failures
+
+
+def run_checks() -> List[str]:
+    """All consistency checks; returns the failures (empty = pass)."""
+    failures = []
+    for symbol, size, seed in CHECK_DATASETS:
+        df = synthetic_candles(size, seed=seed)
+        found = check_backends(symbol, df)
+        print(f"  kernels vs numpy   {symbol:<8} {size:>9,} bars  {'ok' if not found else 'FAILED'}")
+        failures += found
+    df = synthetic_candles(CHECK_INDEX_BARS + LIVE_WINDOW, seed=5)
+    for check_time in (True, False):
+        found = check_fvg_index(df, check_time)
+        label = "time" if check_time else "no time"
+        print(f"  fvg index vs full  {label:<8} {CHECK_INDEX_BARS:>9,} bars  "
+              f"{'ok' if not found else 'FAILED'}")
+        failures += found
+    found = check_journal(df.iloc[:LIVE_WINDOW])
+    print(f"  journal reader              {LIVE_WINDOW:>9,} bars  {'ok' if not found else 'FAILED'}")
+    failures += found
+    return failures
+
+
+# ─── Baseline ──────────────────────────────────────────────────────────────────
+def save_baseline(path: str, results: Dict[str, Dict[str, float]]):
+    payload = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "kernels": kernels.backend(),
+        "results": results,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=1, sort_keys=True)
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+            threshold: float) -> List[str]:
+    """Regressions beyond threshold, as printable lines (empty = pass)."""
+    regressions = []
+    print(f"\n  {'benchmark':<26} {'bars':>9}  {'baseline':>10}  {'now':>10}  change")
+    for name, by_size in results.items():
+        for size, seconds in by_size.items():
+            base = baseline.get(name, {}).get(size)
+            if not base:
+                continue
+            change = seconds / base - 1.0
+            flag = "  ❌" if change > threshold else ""
+            print(f"  {name:<26} {int(size):>9,}  {base * 1000:8.3f}ms  "
+                  f"{seconds * 1000:8.3f}ms  {change:+7.1%}{flag}")
+            if change > threshold:
+                regressions.append(f"{name} @ {int(size):,} bars: {change:+.1%}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Trident detection hot paths")
+    parser.add_argument("--sizes", type=lambda t: [int(v) for v in t.split(",")],
+                        default=DEFAULT_SIZES,
+                        help="Comma-separated candle counts (default: 1000,10000,100000)")
+    parser.add_argument("--only", type=lambda t: t.split(","), default=None,
+                        help="Comma-separated benchmark names to run")
+    parser.add_argument("--baseline", type=str, default=None,
+                        help="JSON baseline to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help=f"Allowed slowdown before failing (default: {DEFAULT_THRESHOLD})")
+    parser.add_argument("--save-baseline", type=str, default=None,
+                        help="Write this run's results as a JSON baseline")
+    parser.add_argument("--check", action="store_true",
+                        help="Check kernels vs NumPy, FVGIndex vs full detection and the "
+                             "journal reader instead")
+    args = parser.parse_args()
+
+    # Fix Windows console encoding
+    sys.stdout.reconfigure(encoding='utf-8', errors='replace')
+    sys.stderr.reconfigure(encoding='utf-8', errors='replace')
+
+    print("\n" + "=" * 60)
+    print("  TG Capital Playbook -- Hot Path Benchmark")
+    print(f"  Kernels : {kernels.backend()}")
+    print("=" * 60)
+
+    if args.check:
+        failures = run_checks()
+        if failures:
+            print(f"\n  ❌ {len(failures)} difference(s):")
+            for line in failures:
+                print(f"     {line}")
+            sys.exit(1)
+        print("\n  ✅ Backends, FVG index and journal reader agree")
+        return
+
+    results = run_benchmarks(args.sizes, args.only)
+
+    if args.save_baseline:
+        save_baseline(args.save_baseline, results)
+        print(f"\n  Baseline saved to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n  ❌ {len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+            for line in regressions:
+                print(f"     {line}")
+            sys.exit(1)
+        print(f"\n  ✅ No regressions beyond {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
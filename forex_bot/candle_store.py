@@ -0,0 +1,177 @@
+"""
+Candle Store — local on-disk cache of MT5 candle history.
+
+Each symbol/timeframe is one append-only binary file of MT5 rate records
+(the same fields copy_rates_range returns). Files are memory-mapped on load,
+so repeat backtests read from the OS page cache instead of the terminal and
+work fully offline. Only the missing range is pulled from MT5 on top-up.
+
+Candle times are in the trade server's clock. Naive datetimes passed in
+are taken to be in that clock too (use time_filter.get_server_now() for
+"now"); timezone-aware ones are converted to it.
+"""
+
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import config
+from logger import setup_logger
+from time_filter import utc_to_server
+
+log = setup_logger()
+
+CACHE_DIR = getattr(config, "CANDLE_CACHE_DIR", "candle_cache")
+
+# On-disk record layout (matches MT5 rate records)
+RATE_DTYPE = np.dtype([
+    ("time", "<i8"),
+    ("open", "<f8"),
+    ("high", "<f8"),
+    ("low", "<f8"),
+    ("close", "<f8"),
+    ("tick_volume", "<i8"),
+    ("spread", "<i4"),
+    ("real_volume", "<i8"),
+])
+
+
+def cache_path(symbol: str, timeframe_name: str) -> str:
+    """Path of the cache file for a symbol/timeframe."""
+    return os.path.join(CACHE_DIR, f"{symbol}_{timeframe_name}.bin")
+
+
+def _to_epoch(dt: datetime) -> int:
+    """Datetime → epoch seconds in the candle (trade-server) clock."""
+    ts = pd.Timestamp(dt)
+    if ts.tzinfo is not None:
+        ts = pd.Timestamp(utc_to_server(ts.tz_convert("UTC").tz_localize(None).to_pydatetime()))
+    return int(ts.timestamp())
+
+
+def read_rates(symbol: str, timeframe_name: str) -> np.ndarray:
+    """Memory-map all cached records for a symbol/timeframe (empty array if none)."""
+    path = cache_path(symbol, timeframe_name)
+    if not os.path.exists(path) or os.path.getsize(path) < RATE_DTYPE.itemsize:
+        return np.empty(0, dtype=RATE_DTYPE)
+
+    count = os.path.getsize(path) // RATE_DTYPE.itemsize
+    return np.memmap(path, dtype=RATE_DTYPE, mode="r", shape=(count,))
+
+
+def _cached_bounds(path: str):
+    """Return (first_time, last_time, record_count) by reading only the file ends."""
+    count = os.path.getsize(path) // RATE_DTYPE.itemsize if os.path.exists(path) else 0
+    if count == 0:
+        return None, None, 0
+
+    with open(path, "rb") as f:
+        first = np.frombuffer(f.read(RATE_DTYPE.itemsize), dtype=RATE_DTYPE)
+        f.seek((count - 1) * RATE_DTYPE.itemsize)
+        last = np.frombuffer(f.read(RATE_DTYPE.itemsize), dtype=RATE_DTYPE)
+    return int(first["time"][0]), int(last["time"][0]), count
+
+
+def append_rates(symbol: str, timeframe_name: str, rates: np.ndarray):
+    """
+    Append records to the cache. Cached records at or after the first new
+    record's time are replaced, so re-fetching the last (possibly still
+    forming) bar overwrites it instead of duplicating it.
+    """
+    if rates is None or len(rates) == 0:
+        return
+
+    rates = np.asarray(rates).astype(RATE_DTYPE)
+    path = cache_path(symbol, timeframe_name)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+
+    first_time, last_time, count = _cached_bounds(path)
+    keep = count
+    if count and int(rates["time"][0]) <= last_time:
+        cached = read_rates(symbol, timeframe_name)
+        keep = int(np.searchsorted(cached["time"], rates["time"][0], side="left"))
+        del cached  # Release the mapping before truncating
+
+    with open(path, "r+b" if count else "wb") as f:
+        f.truncate(keep * RATE_DTYPE.itemsize)
+        f.seek(keep * RATE_DTYPE.itemsize)
+        f.write(rates.tobytes())
+
+
+def _prepend_rates(symbol: str, timeframe_name: str, rates: np.ndarray):
+    """Rewrite the cache with older records in front (history extended backwards)."""
+    path = cache_path(symbol, timeframe_name)
+    rates = np.asarray(rates).astype(RATE_DTYPE)
+    cached = np.fromfile(path, dtype=RATE_DTYPE)
+    older = rates[rates["time"] < cached["time"][0]]
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(older.tobytes())
+        f.write(cached.tobytes())
+    os.replace(tmp_path, path)
+
+
+def update_cache(symbol: str, timeframe_name: str,
+                 date_from: datetime, date_to: datetime):
+    """
+    Top up the cache from MT5 so it covers [date_from, date_to].
+    Only ranges missing from the cache are requested from the terminal.
+    """
+    import mt5_connector as mt5c
+
+    path = cache_path(symbol, timeframe_name)
+    first_time, last_time, count = _cached_bounds(path)
+
+    if count == 0:
+        append_rates(symbol, timeframe_name,
+                     mt5c.get_rates_range(symbol, timeframe_name, date_from, date_to))
+        return
+
+    if _to_epoch(date_from) < first_time:
+        older = mt5c.get_rates_range(symbol, timeframe_name, date_from,
+                                     pd.Timestamp(first_time, unit="s").to_pydatetime())
+        if older is not None and len(older):
+            _prepend_rates(symbol, timeframe_name, older)
+
+    if _to_epoch(date_to) > last_time:
+        # Re-fetch from the last cached bar — it may have been stored while forming
+        newer = mt5c.get_rates_range(symbol, timeframe_name,
+                                     pd.Timestamp(last_time, unit="s").to_pydatetime(),
+                                     date_to)
+        append_rates(symbol, timeframe_name, newer)
+
+
+def rates_to_frame(rates: np.ndarray) -> pd.DataFrame:
+    """Build the candle DataFrame the detectors expect from rate records."""
+    if len(rates) == 0:
+        return pd.DataFrame()
+
+    columns = {name: rates[name] for name in RATE_DTYPE.names}
+    columns["time"] = pd.to_datetime(rates["time"], unit="s")
+    return pd.DataFrame(columns, copy=False)
+
+
+def load_candles(symbol: str, timeframe_name: str,
+                 date_from: datetime, date_to: datetime,
+                 refresh: bool = True) -> pd.DataFrame:
+    """
+    Load candles for [date_from, date_to] from the local cache.
+
+    With refresh=True the cache is first topped up from MT5 (requires a
+    connection); with refresh=False it works fully offline.
+    """
+    if refresh:
+        update_cache(symbol, timeframe_name, date_from, date_to)
+
+    rates = read_rates(symbol, timeframe_name)
+    if len(rates) == 0:
+        log.warning(f"No cached candles for {symbol} on {timeframe_name}")
+        return pd.DataFrame()
+
+    times = rates["time"]
+    start = int(np.searchsorted(times, _to_epoch(date_from), side="left"))
+    end = int(np.searchsorted(times, _to_epoch(date_to), side="right"))
+    return rates_to_frame(rates[start:end])
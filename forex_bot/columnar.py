@@ -0,0 +1,258 @@
+"""
+Columnar records — growable struct-of-arrays tables with __slots__ row views.
+
+A ColumnStore keeps one typed NumPy array per field instead of a Python
+object per row: times are int64 nanoseconds since the epoch (naive UTC,
+NaT = NAT) and string fields with a fixed vocabulary are small-int enum
+codes. Indexing a store returns a row view — a __slots__ object that reads
+and writes the store's arrays — so callers that want objects still get
+attribute access, while bulk consumers work on whole columns and export
+is a direct dump of the arrays (to_frame / to_csv / to_parquet).
+
+    class TradeArrays(ColumnStore):
+        FIELDS = {"direction": "i1", "entry_price": "f8", "entry_time": "i8"}
+        ENUMS = {"direction": {1: "BUY", -1: "SELL"}}
+        TIMES = ("entry_time",)
+
+    class Trade(RowView):
+        __slots__ = ()
+
+    TradeArrays.bind(Trade)
+"""
+
+from typing import Dict, Iterator, Tuple
+
+import numpy as np
+import pandas as pd
+
+NAT = np.iinfo(np.int64).min  # int64 encoding of NaT
+
+
+def epoch_ns(value) -> int:
+    """Nanoseconds since the epoch of one timestamp (None / NaT → NAT; ints pass through)."""
+    if isinstance(value, pd.Timestamp):
+        return value.value
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    if value is None:
+        return NAT
+    ts = pd.Timestamp(value)
+    return NAT if ts is pd.NaT else int(ts.value)
+
+
+def epoch_ns_array(values) -> np.ndarray:
+    """Nanoseconds since the epoch of an array of timestamps (NaT → NAT)."""
+    return pd.DatetimeIndex(values).as_unit("ns").asi8
+
+
+def to_timestamp(ns: int):
+    """Inverse of epoch_ns (NAT → NaT)."""
+    return pd.NaT if ns == NAT else pd.Timestamp(ns)
+
+
+# ─── Row views ─────────────────────────────────────────────────────────────────
+class RowView:
+    """Attribute access to one row of a columnar container."""
+    __slots__ = ("_store", "_row")
+    _fields: Tuple[str, ...] = ()
+
+    def __init__(self, store, row: int):
+        self._store = store
+        self._row = row
+
+    @classmethod
+    def _view(cls, store, row: int) -> "RowView":
+        """View of row in store, bypassing any subclass constructor."""
+        view = object.__new__(cls)
+        view._store = store
+        view._row = row
+        return view
+
+    def as_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self._fields}
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self._fields)
+        return f"{type(self).__name__}({fields})"
+
+
+def _value_field(name: str) -> property:
+    def get(self):
+        return self._store._cols[name].item(self._row)
+
+    def set(self, value):
+        self._store._cols[name][self._row] = value
+    return property(get, set)
+
+
+def _time_field(name: str) -> property:
+    def get(self):
+        return to_timestamp(self._store._cols[name].item(self._row))
+
+    def set(self, value):
+        self._store._cols[name][self._row] = epoch_ns(value)
+    return property(get, set)
+
+
+def _enum_field(name: str, labels: Dict[int, str]) -> property:
+    codes = {label: code for code, label in labels.items()}
+
+    def get(self):
+        return labels[self._store._cols[name].item(self._row)]
+
+    def set(self, value):
+        self._store._cols[name][self._row] = codes[value]
+    return property(get, set)
+
+
+# ─── Stores ────────────────────────────────────────────────────────────────────
+class ColumnStore:
+    """
+    Growable table of typed columns. Subclasses declare FIELDS (name → dtype,
+    in export order), ENUMS (name → {code: label}) and TIMES (int64 epoch-ns
+    fields), then bind() their row view class.
+    """
+    FIELDS: Dict[str, str] = {}
+    ENUMS: Dict[str, Dict[int, str]] = {}
+    TIMES: Tuple[str, ...] = ()
+    ROW = RowView
+
+    def __init__(self, capacity: int = 0):
+        self._n = 0
+        self._cols = {name: np.empty(capacity, dtype=dtype)
+                      for name, dtype in self.FIELDS.items()}
+
+    @classmethod
+    def bind(cls, row_cls: type):
+        """Use row_cls as this store's row view and give it a property per field."""
+        for name in cls.FIELDS:
+            if name in vars(row_cls):
+                continue  # Explicitly defined on the view
+            if name in cls.ENUMS:
+                prop = _enum_field(name, cls.ENUMS[name])
+            elif name in cls.TIMES:
+                prop = _time_field(name)
+            else:
+                prop = _value_field(name)
+            setattr(row_cls, name, prop)
+        if not row_cls._fields:
+            row_cls._fields = tuple(cls.FIELDS)
+        cls.ROW = row_cls
+
+    @classmethod
+    def from_columns(cls, columns: Dict[str, np.ndarray], **attrs) -> "ColumnStore":
+        """Store over already-encoded column arrays (not copied)."""
+        store = cls.__new__(cls)
+        store.__dict__.update(attrs)
+        store._cols = {name: np.asarray(columns[name], dtype=dtype)
+                       for name, dtype in cls.FIELDS.items()}
+        store._n = len(next(iter(store._cols.values()))) if store._cols else 0
+        return store
+
+    # ─── Sequence protocol ─────────────────────────────────────────────────────
+    def __len__(self) -> int:
+        return self._n
+
+    def __getitem__(self, i: int):
+        if i < 0:
+            i += self._n
+        if not 0 <= i < self._n:
+            raise IndexError(f"row {i} out of range")
+        return self.ROW._view(self, i)
+
+    def __iter__(self) -> Iterator:
+        view = self.ROW._view
+        for i in range(self._n):
+            yield view(self, i)
+
+    def column(self, name: str) -> np.ndarray:
+        """Encoded values of one field (a view, not a copy)."""
+        return self._cols[name][:self._n]
+
+    def select(self, rows) -> "ColumnStore":
+        """New store holding only the given rows (mask or indices)."""
+        attrs = {k: v for k, v in self.__dict__.items() if k not in ("_cols", "_n")}
+        return type(self).from_columns({name: self.column(name)[rows] for name in self._cols},
+                                       **attrs)
+
+    # ─── Appending ─────────────────────────────────────────────────────────────
+    def _reserve(self, extra: int):
+        need = self._n + extra
+        capacity = len(next(iter(self._cols.values()))) if self._cols else 0
+        if need <= capacity:
+            return
+        capacity = max(need, capacity * 2, 16)
+        for name, col in self._cols.items():
+            grown = np.empty(capacity, dtype=col.dtype)
+            grown[:self._n] = col[:self._n]
+            self._cols[name] = grown
+
+    def add(self, **values):
+        """
+        Append one row from decoded values (labels, timestamps) and return its
+        view. Fields not given are 0 (enum code 0) or NaT.
+        """
+        self._reserve(1)
+        row = self._n
+        self._n += 1
+        view = self.ROW._view(self, row)
+        for name, col in self._cols.items():
+            col[row] = 0 if name not in self.TIMES else NAT
+        for name, value in values.items():
+            setattr(view, name, value)
+        return view
+
+    def append(self, view: RowView):
+        """Append a copy of another store's row."""
+        self._reserve(1)
+        for name, col in self._cols.items():
+            col[self._n] = view._store._cols[name][view._row]
+        self._n += 1
+
+    def extend(self, other: "ColumnStore"):
+        """Append every row of another store of the same type."""
+        self._reserve(len(other))
+        for name, col in self._cols.items():
+            col[self._n:self._n + len(other)] = other.column(name)
+        self._n += len(other)
+
+    # ─── Export ────────────────────────────────────────────────────────────────
+    @property
+    def nbytes(self) -> int:
+        return sum(self.column(name).nbytes for name in self._cols)
+
+    def _frame_prefix(self) -> Dict[str, object]:
+        """Constant columns placed before the fields in to_frame()."""
+        return {}
+
+    def to_frame(self) -> pd.DataFrame:
+        """Decoded DataFrame (enum labels, datetime64 times) built column by column."""
+        data = dict(self._frame_prefix())
+        for name in self._cols:
+            values = self.column(name)
+            if name in self.ENUMS:
+                labels = self.ENUMS[name]
+                codes = np.array(sorted(labels))
+                names = np.array([labels[c] for c in codes], dtype=object)
+                values = names[np.searchsorted(codes, values)]
+            elif name in self.TIMES:
+                values = values.view("datetime64[ns]")
+            data[name] = values
+        return pd.DataFrame(data, index=pd.RangeIndex(self._n))
+
+    def to_csv(self, path: str):
+        self.to_frame().to_csv(path, index=False)
+
+    def to_parquet(self, path: str):
+        """Write as Parquet (needs pyarrow or fastparquet)."""
+        self.to_frame().to_parquet(path, index=False)
+
+    # ─── Pickling (process pools) ──────────────────────────────────────────────
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state["_cols"] = {name: self.column(name).copy() for name in self._cols}
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
@@ -5,25 +5,184 @@ A Bullish FVG:  candle1.high < candle3.low  → gap between candle1 high and can
 A Bearish FVG:  candle1.low  > candle3.high → gap between candle1 low and candle3 high
 """
 
+import numpy as np
 import pandas as pd
 from dataclasses import dataclass
-from typing import Optional, List
-from time_filter import is_in_fvg_window
+from typing import Iterator, Optional, List
+from columnar import RowView
+from time_filter import get_session_masks
+
+
+class FVG(RowView):
+    """Represents a detected Fair Value Gap (a row view of an FVGArrays)."""
+    __slots__ = ()
+    _fields = ("direction", "top", "bottom", "midpoint", "candle1_idx", "candle2_idx",
+               "candle3_idx", "candle1_time", "fvg_candle_low", "fvg_candle_high")
+
+    @property
+    def direction(self) -> str:          # "bullish" or "bearish"
+        return _DIRECTION_NAMES[self._store.direction.item(self._row)]
+
+    @property
+    def top(self) -> float:              # Upper boundary of the gap
+        return self._store.top.item(self._row)
+
+    @property
+    def bottom(self) -> float:           # Lower boundary of the gap
+        return self._store.bottom.item(self._row)
+
+    @property
+    def midpoint(self) -> float:         # 50% level (consequent encroachment)
+        return self._store.midpoint.item(self._row)
+
+    @property
+    def candle1_idx(self) -> int:        # Index of the first candle in the FVG
+        return self._store.candle1_idx.item(self._row)
+
+    @property
+    def candle2_idx(self) -> int:        # Index of the middle candle (impulse)
+        return self.candle1_idx + 1
+
+    @property
+    def candle3_idx(self) -> int:        # Index of the third candle
+        return self.candle1_idx + 2
+
+    @property
+    def candle1_time(self) -> pd.Timestamp:
+        times = self._store.times
+        return times[self.candle1_idx] if times is not None else pd.NaT
+
+    @property
+    def fvg_candle_low(self) -> float:   # Low of the FVG-forming candle (for stop loss)
+        return self._store.fvg_candle_low.item(self._row)
+
+    @property
+    def fvg_candle_high(self) -> float:  # High of the FVG-forming candle (for stop loss)
+        return self._store.fvg_candle_high.item(self._row)
+
+
+# Direction codes used by the columnar detection result
+BULLISH = 1
+BEARISH = -1
+
+_DIRECTION_NAMES = {BULLISH: "bullish", BEARISH: "bearish"}
 
 
 @dataclass
-class FVG:
-    """Represents a detected Fair Value Gap."""
-    direction: str          # "bullish" or "bearish"
-    top: float              # Upper boundary of the gap
-    bottom: float           # Lower boundary of the gap
-    midpoint: float         # 50% level (consequent encroachment)
-    candle1_idx: int        # Index of the first candle in the FVG
-    candle2_idx: int        # Index of the middle candle (impulse)
-    candle3_idx: int        # Index of the third candle
-    candle1_time: pd.Timestamp
-    fvg_candle_low: float   # Low of the FVG-forming candle (for stop loss)
-    fvg_candle_high: float  # High of the FVG-forming candle (for stop loss)
+class FVGArrays:
+    """
+    Columnar Fair Value Gap detection result — one array entry per gap.
+
+    Gaps are stored in chronological order. Indexing or iterating the result
+    yields FVG row views over these arrays.
+    """
+    direction: np.ndarray        # int8: BULLISH or BEARISH
+    top: np.ndarray              # float64
+    bottom: np.ndarray           # float64
+    midpoint: np.ndarray         # float64
+    candle1_idx: np.ndarray      # int64 positional index of the first candle
+    fvg_candle_low: np.ndarray   # float64 low of the impulse candle
+    fvg_candle_high: np.ndarray  # float64 high of the impulse candle
+    times: Optional[object] = None  # Source "time" column values (None if absent)
+
+    @classmethod
+    def empty(cls) -> "FVGArrays":
+        f = np.empty(0, dtype=np.float64)
+        return cls(np.empty(0, dtype=np.int8), f, f, f,
+                   np.empty(0, dtype=np.int64), f, f)
+
+    @property
+    def candle2_idx(self) -> np.ndarray:
+        return self.candle1_idx + 1
+
+    @property
+    def candle3_idx(self) -> np.ndarray:
+        return self.candle1_idx + 2
+
+    def __len__(self) -> int:
+        return len(self.candle1_idx)
+
+    def __getitem__(self, i: int) -> FVG:
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(f"FVG {i} out of range")
+        return FVG(self, int(i))
+
+    def __iter__(self) -> Iterator[FVG]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def select(self, rows) -> "FVGArrays":
+        """Return a new FVGArrays holding only the given rows (mask or indices)."""
+        return FVGArrays(
+            direction=self.direction[rows],
+            top=self.top[rows],
+            bottom=self.bottom[rows],
+            midpoint=self.midpoint[rows],
+            candle1_idx=self.candle1_idx[rows],
+            fvg_candle_low=self.fvg_candle_low[rows],
+            fvg_candle_high=self.fvg_candle_high[rows],
+            times=self.times,
+        )
+
+    def to_list(self) -> List[FVG]:
+        return list(self)
+
+
+def detect_fvgs(df: pd.DataFrame, check_time: bool = True) -> FVGArrays:
+    """
+    Vectorized FVG scan over the whole DataFrame.
+
+    Candle1/2/3 are the high/low columns shifted against each other, so every
+    gap is found with a handful of array comparisons instead of a bar loop.
+    Produces exactly the same gaps as iterating bar by bar.
+
+    Args:
+        df: DataFrame with OHLC data
+        check_time: If True, only keep FVGs whose impulse candle is in the
+                    FVG time window
+
+    Returns:
+        FVGArrays with one entry per gap
+    """
+    if len(df) < 3:
+        return FVGArrays.empty()
+
+    high = df["high"].to_numpy(dtype=np.float64)
+    low = df["low"].to_numpy(dtype=np.float64)
+
+    high1, low1 = high[:-2], low[:-2]
+    high2, low2 = high[1:-1], low[1:-1]
+    high3, low3 = high[2:], low[2:]
+
+    # Bullish: gap between candle1 high and candle3 low
+    bullish = low3 > high1
+    # Bearish: gap between candle1 low and candle3 high
+    bearish = (high3 < low1) & ~bullish
+
+    idx = np.flatnonzero(bullish | bearish)
+
+    has_time = "time" in df.columns
+    if check_time and has_time and len(idx):
+        # FVG window is checked on the impulse candle (candle2)
+        in_window = get_session_masks(df).fvg_window
+        idx = idx[in_window[idx + 1]]
+
+    is_bull = bullish[idx]
+    top = np.where(is_bull, low3[idx], low1[idx])
+    bottom = np.where(is_bull, high1[idx], high3[idx])
+
+    return FVGArrays(
+        direction=np.where(is_bull, BULLISH, BEARISH).astype(np.int8),
+        top=top,
+        bottom=bottom,
+        midpoint=(top + bottom) / 2.0,
+        candle1_idx=idx.astype(np.int64),
+        fvg_candle_low=low2[idx],     # Impulse candle low for SL (longs)
+        fvg_candle_high=high2[idx],   # Impulse candle high for SL (shorts)
+        times=df["time"].array if has_time else None,
+    )
 
 
 def find_fvgs(df: pd.DataFrame, check_time: bool = True) -> List[FVG]:
@@ -40,62 +199,7 @@ def find_fvgs(df: pd.DataFrame, check_time: bool = True) -> List[FVG]:
     Returns:
         List of FVG objects found
     """
-    fvgs = []
-
-    if len(df) < 3:
-        return fvgs
-
-    for i in range(len(df) - 2):
-        candle1 = df.iloc[i]
-        candle2 = df.iloc[i + 1]  # The impulse candle
-        candle3 = df.iloc[i + 2]
-
-        # Check time window if required
-        if check_time and "time" in df.columns:
-            if not is_in_fvg_window(candle2["time"]):
-                continue
-
-        # Bullish FVG: gap between candle1 high and candle3 low
-        if candle3["low"] > candle1["high"]:
-            top = candle3["low"]
-            bottom = candle1["high"]
-            midpoint = (top + bottom) / 2.0
-
-            fvg = FVG(
-                direction="bullish",
-                top=top,
-                bottom=bottom,
-                midpoint=midpoint,
-                candle1_idx=i,
-                candle2_idx=i + 1,
-                candle3_idx=i + 2,
-                candle1_time=candle1.get("time", pd.NaT),
-                fvg_candle_low=candle2["low"],     # Impulse candle low for SL
-                fvg_candle_high=candle2["high"],
-            )
-            fvgs.append(fvg)
-
-        # Bearish FVG: gap between candle1 low and candle3 high
-        elif candle3["high"] < candle1["low"]:
-            top = candle1["low"]
-            bottom = candle3["high"]
-            midpoint = (top + bottom) / 2.0
-
-            fvg = FVG(
-                direction="bearish",
-                top=top,
-                bottom=bottom,
-                midpoint=midpoint,
-                candle1_idx=i,
-                candle2_idx=i + 1,
-                candle3_idx=i + 2,
-                candle1_time=candle1.get("time", pd.NaT),
-                fvg_candle_low=candle2["low"],
-                fvg_candle_high=candle2["high"],   # Impulse candle high for SL
-            )
-            fvgs.append(fvg)
-
-    return fvgs
+    return detect_fvgs(df, check_time=check_time).to_list()
 
 
 def find_latest_fvg(df: pd.DataFrame, direction: str,
@@ -104,13 +208,17 @@ def find_latest_fvg(df: pd.DataFrame, direction: str,
     Find the most recent FVG matching the given direction.
     Returns None if no FVG is found.
     """
-    fvgs = find_fvgs(df, check_time=check_time)
-    matching = [f for f in fvgs if f.direction == direction]
+    codes = {name: code for code, name in _DIRECTION_NAMES.items()}
+    if direction not in codes:
+        return None  # Unknown direction matches no FVG
+
+    fvgs = detect_fvgs(df, check_time=check_time)
+    matching = np.flatnonzero(fvgs.direction == codes[direction])
 
-    if not matching:
+    if not len(matching):
         return None
 
-    return matching[-1]  # Most recent
+    return fvgs[matching[-1]]  # Most recent
 
 
 def get_fvg_midpoint(fvg: FVG) -> float:
@@ -0,0 +1,272 @@
+"""
+FVG Index — rolling per-symbol record of Fair Value Gaps for the live scanner.
+
+update() is called with every scan's candle frame (closed bars + the forming
+bar). Only the newly closed bars are scanned for gaps, and each of them
+moves the gaps already tracked along:
+
+    ACTIVE    → MITIGATED    price traded through the far edge of the gap
+                             (bullish: low <= bottom, bearish: high >= top)
+    MITIGATED → INVALIDATED  a candle closed beyond the far edge
+
+Gaps are evicted once their first candle is more than FVG_MAX_AGE_BARS
+closed bars old. Gaps are kept in lists sorted by their edges /
+midpoint, so each bar's mitigation check and near() are binary searches
+plus the gaps that match. The forming bar never changes a gap's state.
+
+fvgs_for() hands the tracked gaps to trident_pattern as FVGArrays positioned
+in the current frame — the same gaps detect_fvgs would find there. With
+FVG_IGNORE_MITIGATED only ACTIVE gaps are handed over, so setups on gaps
+that have since been filled are no longer reported.
+"""
+
+from bisect import bisect_left, bisect_right
+from collections import deque
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+import config
+from columnar import epoch_ns_array
+from fvg_detector import BULLISH, FVGArrays, detect_fvgs
+
+FVG_MAX_AGE_BARS = getattr(config, "FVG_MAX_AGE_BARS", 200)         # Closed bars a gap is tracked
+FVG_IGNORE_MITIGATED = getattr(config, "FVG_IGNORE_MITIGATED", False)  # Skip filled gaps in signals
+
+# Gap states
+ACTIVE = "active"
+MITIGATED = "mitigated"
+INVALIDATED = "invalidated"
+
+
+class TrackedFVG:
+    """One gap in an FVGIndex. Times are candle open times (epoch ns)."""
+    __slots__ = ("direction", "top", "bottom", "midpoint", "candle1_time",
+                 "fvg_candle_low", "fvg_candle_high", "seq", "status", "mitigated_time")
+
+    def __init__(self, direction: int, top: float, bottom: float, candle1_time: int,
+                 fvg_candle_low: float, fvg_candle_high: float, seq: int):
+        self.direction = direction            # BULLISH or BEARISH
+        self.top = top
+        self.bottom = bottom
+        self.midpoint = (top + bottom) / 2.0
+        self.candle1_time = candle1_time
+        self.fvg_candle_low = fvg_candle_low
+        self.fvg_candle_high = fvg_candle_high
+        self.seq = seq                        # Closed-bar number of candle1
+        self.status = ACTIVE
+        self.mitigated_time: Optional[int] = None
+
+    @property
+    def far_edge(self) -> float:
+        """Edge price must trade through to fill the gap."""
+        return self.bottom if self.direction == BULLISH else self.top
+
+    def __repr__(self) -> str:
+        side = "bullish" if self.direction == BULLISH else "bearish"
+        return (f"TrackedFVG({side} {self.bottom:.5f}-{self.top:.5f} "
+                f"@ {pd.Timestamp(self.candle1_time)}, {self.status})")
+
+
+class _SortedGaps:
+    """Gaps sorted by one price key, with range pops by binary search."""
+    __slots__ = ("keys", "gaps")
+
+    def __init__(self):
+        self.keys: List[float] = []
+        self.gaps: List[TrackedFVG] = []
+
+    def __len__(self) -> int:
+        return len(self.gaps)
+
+    def add(self, key: float, gap: TrackedFVG):
+        i = bisect_right(self.keys, key)
+        self.keys.insert(i, key)
+        self.gaps.insert(i, gap)
+
+    def remove(self, key: float, gap: TrackedFVG):
+        i = bisect_left(self.keys, key)
+        while self.gaps[i] is not gap:
+            i += 1
+        del self.keys[i], self.gaps[i]
+
+    def pop_at_least(self, key: float) -> List[TrackedFVG]:
+        """Remove and return the gaps with key >= key."""
+        i = bisect_left(self.keys, key)
+        popped = self.gaps[i:]
+        del self.keys[i:], self.gaps[i:]
+        return popped
+
+    def pop_at_most(self, key: float) -> List[TrackedFVG]:
+        """Remove and return the gaps with key <= key."""
+        i = bisect_right(self.keys, key)
+        popped = self.gaps[:i]
+        del self.keys[:i], self.gaps[:i]
+        return popped
+
+    def between(self, lo: float, hi: float) -> List[TrackedFVG]:
+        return self.gaps[bisect_left(self.keys, lo):bisect_right(self.keys, hi)]
+
+
+class FVGIndex:
+    """
+    Fair Value Gaps of one symbol/timeframe, maintained bar by bar.
+
+    check_time must match the check_time the signals are validated with
+    (gaps outside the FVG window are not indexed when it is True).
+    """
+
+    def __init__(self, check_time: bool = True, max_age: int = FVG_MAX_AGE_BARS,
+                 ignore_mitigated: bool = FVG_IGNORE_MITIGATED):
+        self.check_time = check_time
+        self.max_age = max_age
+        self.ignore_mitigated = ignore_mitigated
+        self.reset()
+
+    def reset(self):
+        self.last_time: Optional[int] = None   # Newest closed bar applied (epoch ns)
+        self._seq = 0                          # Closed bars applied so far
+        self._gaps = deque()                   # Tracked gaps, oldest first
+        self._bull_active = _SortedGaps()      # by bottom
+        self._bull_mitigated = _SortedGaps()   # by bottom
+        self._bear_active = _SortedGaps()      # by top
+        self._bear_mitigated = _SortedGaps()   # by top
+        self._by_mid = _SortedGaps()           # active gaps by midpoint
+        self._max_half = 0.0                   # Widest half-gap indexed (for near())
+
+    def __len__(self) -> int:
+        return len(self._gaps)
+
+    # ─── Updates ───────────────────────────────────────────────────────────────
+    def update(self, df: pd.DataFrame) -> int:
+        """
+        Apply the closed bars of df (last row = forming bar) that are newer
+        than the last update. Returns the number of new gaps. If df does not
+        reach back to the last applied bar, the index is rebuilt from df.
+        """
+        closed = df.iloc[:-1]
+        if closed.empty:
+            return 0
+        times = epoch_ns_array(closed["time"].array)
+        if self.last_time is not None and times[0] > self.last_time:
+            self.reset()  # Bars were missed — mitigation state is unknown
+        start = 0 if self.last_time is None else int(np.searchsorted(times, self.last_time, "right"))
+        if start >= len(closed):
+            return 0
+
+        high = closed["high"].to_numpy(dtype=np.float64)
+        low = closed["low"].to_numpy(dtype=np.float64)
+        close = closed["close"].to_numpy(dtype=np.float64)
+
+        # Gaps completed by the new bars: candle3 in [start, len)
+        lo = max(start - 2, 0)
+        found = detect_fvgs(closed.iloc[lo:], check_time=self.check_time)
+        by_candle3 = {}
+        for row, c1 in enumerate(found.candle1_idx):
+            by_candle3.setdefault(lo + int(c1) + 2, []).append(row)
+
+        added = 0
+        for j in range(start, len(closed)):
+            self._seq += 1
+            self._apply_bar(high[j], low[j], close[j], int(times[j]))
+            for row in by_candle3.get(j, ()):
+                self._add(TrackedFVG(
+                    direction=int(found.direction[row]),
+                    top=float(found.top[row]),
+                    bottom=float(found.bottom[row]),
+                    candle1_time=int(times[j - 2]),
+                    fvg_candle_low=float(found.fvg_candle_low[row]),
+                    fvg_candle_high=float(found.fvg_candle_high[row]),
+                    seq=self._seq - 2,
+                ))
+                added += 1
+            self._evict()
+
+        self.last_time = int(times[-1])
+        return added
+
+    def _add(self, gap: TrackedFVG):
+        self._gaps.append(gap)
+        if gap.direction == BULLISH:
+            self._bull_active.add(gap.bottom, gap)
+        else:
+            self._bear_active.add(gap.top, gap)
+        self._by_mid.add(gap.midpoint, gap)
+        self._max_half = max(self._max_half, (gap.top - gap.bottom) / 2.0)
+
+    def _apply_bar(self, high: float, low: float, close: float, time_ns: int):
+        """Mitigate / invalidate tracked gaps with one closed bar."""
+        for gap in self._bull_active.pop_at_least(low):
+            self._mitigate(gap, time_ns, self._bull_mitigated)
+        for gap in self._bear_active.pop_at_most(high):
+            self._mitigate(gap, time_ns, self._bear_mitigated)
+
+        # Closed beyond the far edge
+        for gap in (self._bull_mitigated.pop_at_least(np.nextafter(close, np.inf))
+                    + self._bear_mitigated.pop_at_most(np.nextafter(close, -np.inf))):
+            gap.status = INVALIDATED
+
+    def _mitigate(self, gap: TrackedFVG, time_ns: int, mitigated: _SortedGaps):
+        gap.status = MITIGATED
+        gap.mitigated_time = time_ns
+        mitigated.add(gap.far_edge, gap)
+        self._by_mid.remove(gap.midpoint, gap)
+
+    def _evict(self):
+        """Drop gaps older than max_age closed bars."""
+        while self._gaps and self._gaps[0].seq <= self._seq - self.max_age:
+            gap = self._gaps.popleft()
+            bullish = gap.direction == BULLISH
+            if gap.status == ACTIVE:
+                (self._bull_active if bullish else self._bear_active).remove(gap.far_edge, gap)
+                self._by_mid.remove(gap.midpoint, gap)
+            elif gap.status == MITIGATED:
+                (self._bull_mitigated if bullish else self._bear_mitigated).remove(gap.far_edge, gap)
+
+    # ─── Queries ───────────────────────────────────────────────────────────────
+    def gaps(self, include_mitigated: bool = True) -> List[TrackedFVG]:
+        """Tracked gaps, oldest first."""
+        return [g for g in self._gaps if include_mitigated or g.status == ACTIVE]
+
+    def near(self, price: float, distance: float = 0.0,
+             direction: Optional[int] = None) -> List[TrackedFVG]:
+        """Active gaps within distance of price (inside the gap = 0), nearest first."""
+        reach = distance + self._max_half
+        hits = [g for g in self._by_mid.between(price - reach, price + reach)
+                if g.bottom - distance <= price <= g.top + distance
+                and (direction is None or g.direction == direction)]
+        return sorted(hits, key=lambda g: abs(g.midpoint - price))
+
+    def fvgs_for(self, df: pd.DataFrame, include_mitigated: Optional[bool] = None) -> FVGArrays:
+        """
+        Tracked gaps as FVGArrays indexed into df (gaps whose candles are not
+        all in df are skipped). include_mitigated defaults to the opposite of
+        ignore_mitigated.
+        """
+        if include_mitigated is None:
+            include_mitigated = not self.ignore_mitigated
+        gaps = self.gaps(include_mitigated)
+        if not gaps or df.empty:
+            return FVGArrays.empty()
+
+        times = epoch_ns_array(df["time"].array)
+        c1_times = np.fromiter((g.candle1_time for g in gaps), dtype=np.int64, count=len(gaps))
+        pos = np.searchsorted(times, c1_times)
+        keep = pos < len(times)
+        keep[keep] = times[pos[keep]] == c1_times[keep]
+        rows = np.flatnonzero(keep)
+
+        def column(attr, dtype=np.float64):
+            return np.fromiter((getattr(gaps[r], attr) for r in rows), dtype=dtype, count=len(rows))
+
+        return FVGArrays(
+            direction=column("direction", np.int8),
+            top=column("top"),
+            bottom=column("bottom"),
+            midpoint=column("midpoint"),
+            candle1_idx=pos[rows].astype(np.int64),
+            fvg_candle_low=column("fvg_candle_low"),
+            fvg_candle_high=column("fvg_candle_high"),
+            times=df["time"].array,
+        )
@@ -4,7 +4,7 @@ Indicators — EMA calculations, EMA stacking, trend bias, and doji detection.
 
 import pandas as pd
 import numpy as np
-from typing import List, Optional
+from typing import Dict, List, Optional
 import config
 
 
@@ -23,6 +23,83 @@ def calculate_emas(df: pd.DataFrame, periods: Optional[List[int]] = None) -> pd.
     return df
 
 
+class EMAState:
+    """
+    Incremental EMA values for one (symbol, timeframe) candle stream.
+
+    Seeded once from a long history, then each newly closed bar updates every
+    EMA in O(1) using the same recurrence as pandas ewm(adjust=False). The
+    last row handed to seed()/update() is the still-forming bar: it gets
+    provisional EMA values but is never committed to the state.
+    """
+
+    def __init__(self, periods: Optional[List[int]] = None, max_bars: int = 200):
+        if periods is None:
+            periods = config.EMA_FAST_PERIODS + [config.EMA_TREND_PERIOD]
+        self.periods = list(periods)
+        self.alphas = {p: 2.0 / (p + 1.0) for p in self.periods}
+        self.max_bars = max_bars
+        self.values: Dict[int, float] = {}
+        self.last_time: Optional[pd.Timestamp] = None
+        self.history = pd.DataFrame()
+
+    def _step(self, values: Dict[int, float], close: float) -> Dict[int, float]:
+        """One EMA update — the exact arithmetic pandas uses for adjust=False."""
+        stepped = {}
+        for p, prev in values.items():
+            alpha = self.alphas[p]
+            stepped[p] = ((1.0 - alpha) * prev + alpha * close) / ((1.0 - alpha) + alpha)
+        return stepped
+
+    def _with_forming(self, forming: pd.DataFrame) -> pd.DataFrame:
+        """Append the forming bar with provisional EMAs to the closed history."""
+        forming = forming.copy()
+        provisional = self._step(self.values, float(forming["close"].iat[0]))
+        for p, value in provisional.items():
+            forming[f"ema_{p}"] = value
+        return pd.concat([self.history, forming], ignore_index=True)
+
+    def seed(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Initialize from history (last row = forming bar).
+        Returns the latest max_bars closed candles plus the forming bar, with EMA columns.
+        """
+        closed = calculate_emas(df.iloc[:-1].copy(), self.periods)
+        last = closed.iloc[-1]
+        self.values = {p: float(last[f"ema_{p}"]) for p in self.periods}
+        self.last_time = last["time"]
+        self.history = closed.iloc[-self.max_bars:].reset_index(drop=True)
+        return self._with_forming(df.iloc[-1:])
+
+    def update(self, df_recent: pd.DataFrame) -> Optional[pd.DataFrame]:
+        """
+        Apply newly closed bars from a short recent fetch (last row = forming bar).
+
+        Returns the updated frame, or None if the fetch doesn't reach back to
+        the last known bar — the caller must then seed() again.
+        """
+        if self.last_time is None or df_recent["time"].iat[0] > self.last_time:
+            return None
+
+        closed = df_recent.iloc[:-1]
+        new_bars = closed[closed["time"] > self.last_time]
+
+        if len(new_bars):
+            rows = new_bars.copy()
+            ema_rows = {p: [] for p in self.periods}
+            for close in rows["close"].to_numpy(dtype=np.float64):
+                self.values = self._step(self.values, close)
+                for p in self.periods:
+                    ema_rows[p].append(self.values[p])
+            for p in self.periods:
+                rows[f"ema_{p}"] = ema_rows[p]
+            self.last_time = rows["time"].iat[-1]
+            self.history = pd.concat([self.history, rows], ignore_index=True)
+            self.history = self.history.iloc[-self.max_bars:].reset_index(drop=True)
+
+        return self._with_forming(df_recent.iloc[-1:])
+
+
 def are_emas_stacked(df: pd.DataFrame, direction: str, index: int = -1) -> bool:
     """
     Check if EMAs (5, 9, 13, 21) are cleanly stacked at a given candle index.
@@ -94,6 +171,42 @@ def is_doji(candle: pd.Series, threshold: Optional[float] = None) -> bool:
     return (body / total_range) <= threshold
 
 
+def doji_ratio(open_: np.ndarray, high: np.ndarray, low: np.ndarray,
+               close: np.ndarray) -> np.ndarray:
+    """
+    Body-to-range ratio for every candle (vectorized).
+    Zero-range candles get NaN so they never qualify as a doji.
+    """
+    body = np.abs(close - open_)
+    total_range = high - low
+    return np.divide(body, total_range, out=np.full_like(body, np.nan),
+                     where=total_range != 0)
+
+
+def doji_mask(open_: np.ndarray, high: np.ndarray, low: np.ndarray,
+              close: np.ndarray, threshold: Optional[float] = None) -> np.ndarray:
+    """Vectorized is_doji() over whole OHLC arrays."""
+    if threshold is None:
+        threshold = config.DOJI_BODY_RATIO
+    return doji_ratio(open_, high, low, close) <= threshold
+
+
+def stacked_mask(emas: List[np.ndarray], direction: str) -> np.ndarray:
+    """
+    Vectorized are_emas_stacked() — emas is ordered fastest to slowest.
+    Mirrors the scalar check exactly, including its handling of NaN values.
+    """
+    stacked = np.ones(len(emas[0]), dtype=bool)
+    for faster, slower in zip(emas[:-1], emas[1:]):
+        if direction == "long":
+            stacked &= ~(faster <= slower)
+        elif direction == "short":
+            stacked &= ~(faster >= slower)
+        else:
+            stacked[:] = False
+    return stacked
+
+
 def candle_direction(candle: pd.Series) -> str:
     """Return 'bullish', 'bearish', or 'neutral' based on candle close vs open."""
     if candle["close"] > candle["open"]:
@@ -0,0 +1,405 @@
+"""
+Event Journal — append-only binary record of what the bot saw and did.
+
+Every event is a length-prefixed record:
+
+    header  <IBq   payload length, event type, wall-clock time (ns)
+    payload        fixed layout per event type (see _LAYOUTS)
+
+zero-padded to RECORD_SIZE bytes, after a 4-byte file signature. Bars
+received, signals found, orders and closes sent and their fills are
+journaled, so a live session can be inspected or replayed through
+trident_pattern without the terminal. The fixed record stride lets
+JournalReader memory-map a journal and decode whole event types as NumPy
+structured arrays without a per-record Python loop (arrays()).
+
+Records are packed on the caller's thread and written by a background
+thread (like the CSV trade log), so journaling an order never puts file
+I/O between the bot and order_send.
+
+Set JOURNAL_FILE = None in config to disable journaling.
+"""
+
+import atexit
+import logging
+import mmap
+import os
+import queue
+import struct
+import threading
+import time
+from collections import namedtuple
+from typing import Dict, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+import config
+from scheduler import TIMEFRAME_SECONDS
+
+JOURNAL_FILE = getattr(config, "JOURNAL_FILE", "trident_journal.bin")
+JOURNAL_FLUSH_TIMEOUT = getattr(config, "JOURNAL_FLUSH_TIMEOUT", 30.0)  # Seconds flush() waits
+
+SIGNATURE = b"TRJ2"
+HEADER = struct.Struct("<IBq")
+RECORD_SIZE = 128  # Header + largest payload, padded
+SYMBOL_BYTES = 32  # MT5 symbol names are at most 31 characters
+
+# Event types
+BAR = 1      # Closed candle received from the terminal
+SIGNAL = 2   # Trident Pattern signal found
+ORDER = 3    # Market order sent to open a position
+CLOSE = 4    # Market order sent to close a position
+FILL = 5     # Terminal's reply to an ORDER / CLOSE
+
+# Payload layouts: (record type, struct format); symbols are SYMBOL_BYTES, NUL-padded
+Bar = namedtuple("Bar", "symbol timeframe time open high low close volume")
+Signal = namedtuple("Signal", "symbol direction signal_time candle1_time candle1_idx "
+                              "doji_idx confirmation_idx entry_price stop_loss fvg_top fvg_bottom")
+Order = namedtuple("Order", "symbol direction position volume price sl tp")
+Fill = namedtuple("Fill", "symbol retcode position order deal volume price")
+
+_LAYOUTS = {
+    BAR: (Bar, struct.Struct("<32sIqddddq")),
+    SIGNAL: (Signal, struct.Struct("<32sbqqqqqdddd")),
+    ORDER: (Order, struct.Struct("<32sbqdddd")),
+    CLOSE: (Order, struct.Struct("<32sbqdddd")),
+    FILL: (Fill, struct.Struct("<32sIqqqdd")),
+}
+
+Event = namedtuple("Event", "type time_ns record")
+
+_HEADER_DTYPE = np.dtype({"names": ["length", "type", "time_ns"],
+                          "formats": ["<u4", "u1", "<i8"],
+                          "offsets": [0, 4, 5], "itemsize": RECORD_SIZE})
+
+
+def _symbol_field(symbol: str) -> bytes:
+    """Encoded symbol name; raises instead of letting struct truncate it."""
+    name = symbol.encode()
+    if len(name) > SYMBOL_BYTES:
+        raise ValueError(f"Symbol name {symbol!r} is longer than {SYMBOL_BYTES} bytes")
+    return name
+
+
+def _epoch(ts) -> int:
+    """Epoch seconds of a timestamp (NaT → 0)."""
+    if ts is None or pd.isna(ts):
+        return 0
+    return int(pd.Timestamp(ts).value // 1_000_000_000)
+
+
+# ─── Writer ────────────────────────────────────────────────────────────────────
+class Journal:
+    """
+    Append-only journal writer. write() packs the record and queues it; a
+    dedicated thread appends queued records in batches and flushes after
+    each batch.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        _set_aside_old_format(path)
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="journal", daemon=True)
+        self._thread.start()
+
+    def write(self, event_type: int, *fields):
+        """Queue one event (never blocks on disk I/O; dropped if the writer has stopped)."""
+        if not self._thread.is_alive():
+            return
+        layout = _LAYOUTS[event_type][1]
+        payload = layout.pack(*fields)
+        record = HEADER.pack(len(payload), event_type, time.time_ns()) + payload
+        self._queue.put(record + bytes(RECORD_SIZE - len(record)))
+
+    def flush(self, timeout: float = JOURNAL_FLUSH_TIMEOUT) -> bool:
+        """
+        Block until every event queued so far is written.
+        Returns False if the writer thread is gone or timeout expires.
+        """
+        if not self._thread.is_alive():
+            return False
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self):
+        """Write everything still queued and stop the writer thread."""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+    # ─── Writer thread ─────────────────────────────────────────────────────────
+    def _run(self):
+        try:
+            file = open(self.path, "ab")
+            if file.tell() == 0:
+                file.write(SIGNATURE)
+        except OSError as e:
+            logging.getLogger("TridentBot").error(f"Journal {self.path} could not be opened: {e}")
+            return
+        try:
+            while True:
+                batch = [self._queue.get()]
+                while isinstance(batch[-1], bytes):
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+
+                records = [item for item in batch if isinstance(item, bytes)]
+                try:
+                    file.write(b"".join(records))
+                    file.flush()
+                except OSError as e:
+                    logging.getLogger("TridentBot").error(f"Journal write failed: {e}")
+
+                if isinstance(batch[-1], threading.Event):
+                    batch[-1].set()
+                elif batch[-1] is None:
+                    return
+        finally:
+            file.close()
+
+
+def _set_aside_old_format(path: str):
+    """Rename a journal of another format so new records are not appended to it."""
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return
+    with open(path, "rb") as f:
+        signature = f.read(len(SIGNATURE))
+    if signature == SIGNATURE:
+        return
+    root, ext = os.path.splitext(path)
+    target = f"{root}_{signature.decode(errors='replace').lower()}{ext}"
+    os.replace(path, target)
+    logging.getLogger("TridentBot").warning(f"Journal {path} has an older format — moved to {target}")
+
+
+_journal = None
+_journal_lock = threading.Lock()
+_last_bar = {}  # (symbol, timeframe) -> newest journaled bar time
+
+
+def get_journal() -> Optional[Journal]:
+    """Process-wide journal (None when JOURNAL_FILE is unset)."""
+    global _journal
+    if _journal is None and JOURNAL_FILE:
+        with _journal_lock:
+            if _journal is None:
+                _journal = Journal(JOURNAL_FILE)
+                atexit.register(shutdown_journal)
+    return _journal
+
+
+def flush_journal() -> bool:
+    """Wait until every queued event is on disk (False if that timed out)."""
+    if _journal is not None:
+        return _journal.flush()
+    return True
+
+
+def shutdown_journal():
+    """Write the queued events and stop the journal writer (safe to call more than once)."""
+    global _journal
+    with _journal_lock:
+        journal, _journal = _journal, None
+    if journal is not None:
+        journal.close()
+
+
+def record_bars(symbol: str, timeframe_name: str, df: pd.DataFrame):
+    """Journal the closed candles in df not journaled yet (the last row is the forming bar)."""
+    journal = get_journal()
+    if journal is None or len(df) < 2:
+        return
+
+    key = (symbol, timeframe_name)
+    times = df["time"].to_numpy().astype("datetime64[s]").astype(np.int64)[:-1]
+    start = int(np.searchsorted(times, _last_bar.get(key, -1), side="right"))
+    if start >= len(times):
+        return
+
+    name = _symbol_field(symbol)
+    tf_seconds = TIMEFRAME_SECONDS.get(timeframe_name, 0)
+    volume = df["volume"] if "volume" in df.columns else df.get("tick_volume")
+    rows = zip(times[start:], df["open"].to_numpy()[start:-1], df["high"].to_numpy()[start:-1],
+               df["low"].to_numpy()[start:-1], df["close"].to_numpy()[start:-1],
+               (volume.to_numpy()[start:-1] if volume is not None else np.zeros(len(times) - start)))
+    for t, o, h, l, c, v in rows:
+        journal.write(BAR, name, tf_seconds, int(t), o, h, l, c, int(v))
+    _last_bar[key] = int(times[-1])
+
+
+def record_signal(signal):
+    """Journal a TradeSignal."""
+    journal = get_journal()
+    if journal is None:
+        return
+    fvg = signal.fvg
+    journal.write(SIGNAL, _symbol_field(signal.symbol), 1 if signal.direction == "BUY" else -1,
+                  _epoch(signal.signal_time), _epoch(fvg.candle1_time), fvg.candle1_idx,
+                  signal.doji_idx, signal.confirmation_idx, signal.entry_price,
+                  signal.stop_loss, fvg.top, fvg.bottom)
+
+
+def record_order(request: dict, buy: bool):
+    """Journal an order request (a close when it carries a position ticket)."""
+    journal = get_journal()
+    if journal is None:
+        return
+    position = int(request.get("position", 0))
+    journal.write(CLOSE if position else ORDER, _symbol_field(request["symbol"]),
+                  1 if buy else -1, position, request["volume"], request["price"],
+                  request.get("sl", 0.0), request.get("tp", 0.0))
+
+
+def record_fill(request: dict, result):
+    """Journal the terminal's reply to an order request (None = no reply)."""
+    journal = get_journal()
+    if journal is None:
+        return
+    if result is None:
+        journal.write(FILL, _symbol_field(request["symbol"]), 0, int(request.get("position", 0)),
+                      0, 0, 0.0, 0.0)
+        return
+    journal.write(FILL, _symbol_field(request["symbol"]), result.retcode,
+                  int(request.get("position", 0)), result.order, result.deal,
+                  result.volume, result.price)
+
+
+# ─── Reader ────────────────────────────────────────────────────────────────────
+class JournalReader:
+    """Memory-mapped journal reader. A truncated trailing record is ignored."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size <= len(SIGNATURE):
+                self._buf = b""
+            else:
+                self._buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._buf and self._buf[:len(SIGNATURE)] != SIGNATURE:
+            if self._buf[:3] == SIGNATURE[:3]:
+                raise ValueError(f"{path} was written in another journal format "
+                                 f"({bytes(self._buf[:len(SIGNATURE)]).decode()})")
+            raise ValueError(f"{path} is not an event journal")
+        self._symbols: Dict[bytes, str] = {}
+
+    def close(self):
+        if isinstance(self._buf, mmap.mmap):
+            self._buf.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _headers(self) -> np.ndarray:
+        """Header fields of every complete record (zero-copy view)."""
+        count = max(len(self._buf) - len(SIGNATURE), 0) // RECORD_SIZE
+        if not count:
+            return np.empty(0, dtype=_HEADER_DTYPE)
+        return np.frombuffer(self._buf, dtype=_HEADER_DTYPE, count=count,
+                             offset=len(SIGNATURE))
+
+    def __len__(self) -> int:
+        return len(self._headers())
+
+    def _symbol(self, raw: bytes) -> str:
+        name = self._symbols.get(raw)
+        if name is None:
+            name = self._symbols[raw] = raw.rstrip(b"\0").decode()
+        return name
+
+    def __iter__(self) -> Iterator[Event]:
+        buf = self._buf
+        unpack_header = HEADER.unpack_from
+        end = len(SIGNATURE) + len(self) * RECORD_SIZE
+        for pos in range(len(SIGNATURE), end, RECORD_SIZE):
+            _, event_type, time_ns = unpack_header(buf, pos)
+            layout = _LAYOUTS.get(event_type)
+            if layout is None:
+                continue  # Unknown (newer) event type
+            kind, fmt = layout
+            fields = fmt.unpack_from(buf, pos + HEADER.size)
+            yield Event(event_type, time_ns, kind(self._symbol(fields[0]), *fields[1:]))
+
+    def arrays(self, event_type: int) -> np.ndarray:
+        """All events of one type as a structured array (plus a time_ns field)."""
+        headers = self._headers()
+        if not len(headers):
+            return np.empty(0, dtype=_record_dtype(event_type))
+        rows = np.flatnonzero(headers["type"] == event_type)
+        records = np.frombuffer(self._buf, dtype=_record_dtype(event_type),
+                                count=len(headers), offset=len(SIGNATURE))
+        return records[rows]
+
+    def bars(self, symbol: str, timeframe_name: str) -> pd.DataFrame:
+        """Journaled closed candles for one symbol/timeframe, de-duplicated."""
+        bars = self.arrays(BAR)
+        tf_seconds = TIMEFRAME_SECONDS[timeframe_name]
+        bars = bars[(bars["symbol"] == symbol.encode()) & (bars["timeframe"] == tf_seconds)]
+        df = pd.DataFrame({
+            "time": pd.to_datetime(bars["time"], unit="s"),
+            "open": bars["open"], "high": bars["high"], "low": bars["low"],
+            "close": bars["close"], "volume": bars["volume"],
+        })
+        return (df.drop_duplicates("time", keep="last")
+                  .sort_values("time").reset_index(drop=True))
+
+
+def _record_dtype(event_type: int) -> np.dtype:
+    """Dtype decoding one event type straight from a RECORD_SIZE-byte record."""
+    kind, fmt = _LAYOUTS[event_type]
+    names, formats, offsets = ["time_ns"], ["<i8"], [5]
+    offset = HEADER.size
+    count = ""
+    for ch in fmt.format.lstrip("<"):
+        if ch.isdigit():
+            count += ch
+            continue
+        code = {"s": f"S{count}", "I": "<u4", "q": "<i8", "d": "<f8", "b": "i1"}[ch]
+        names.append(kind._fields[len(names) - 1])
+        formats.append(code)
+        offsets.append(offset)
+        offset += struct.calcsize("<" + (count if ch == "s" else "") + ch)
+        count = ""
+    return np.dtype({"names": names, "formats": formats, "offsets": offsets,
+                     "itemsize": RECORD_SIZE})
+
+
+# ─── Replay ────────────────────────────────────────────────────────────────────
+def replay_signals(path: str, symbol: str, timeframe_name: Optional[str] = None,
+                   check_time: bool = True) -> list:
+    """
+    Re-run Trident detection over the candles journaled for symbol.
+
+    Returns (signal, journaled) pairs in chronological order, where
+    journaled is the SIGNAL event recorded live for the same confirmation
+    candle (None if the live bot did not report it). Signals recorded live
+    that the replay does not reproduce are returned with signal = None.
+    """
+    from indicators import calculate_emas
+    from trident_pattern import scan_all_signals
+
+    timeframe_name = timeframe_name or config.ENTRY_TIMEFRAME
+    with JournalReader(path) as reader:
+        df = reader.bars(symbol, timeframe_name)
+        live = {}
+        for event in reader:
+            if event.type == SIGNAL and event.record.symbol == symbol:
+                live[event.record.signal_time] = event.record
+
+    replayed = []
+    if not df.empty:
+        df = calculate_emas(df, config.EMA_FAST_PERIODS + [config.EMA_TREND_PERIOD])
+        for signal in scan_all_signals(df, symbol, check_time=check_time):
+            replayed.append((signal, live.pop(_epoch(signal.signal_time), None)))
+
+    replayed.extend((None, record) for record in live.values())
+    replayed.sort(key=lambda pair: _epoch(pair[0].signal_time) if pair[0] is not None
+                  else pair[1].signal_time)
+    return replayed
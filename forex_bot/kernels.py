@@ -0,0 +1,166 @@
+"""
+Compiled kernels — optional numba backend for signal and exit evaluation.
+
+When numba is importable (and USE_NUMBA is not False in config), the
+Trident rules and the path-dependent exit walk run as single tight loops
+over raw float64/int64 arrays:
+
+    signal_rows()  every FVG's doji / confirmation / EMA / time checks
+    exit_bars()    every trade's bar-by-bar walk to its stop loss, daily
+                   EMA unstack or max-hold exit
+
+trident_pattern.signal_rows and backtest.simulate_trades dispatch here when
+ENABLED and otherwise keep their NumPy / per-trade implementations, which
+produce identical results. Compiled functions are cached on disk, so only
+the first run after a change pays the compile time.
+"""
+
+import numpy as np
+
+import config
+
+USE_NUMBA = getattr(config, "USE_NUMBA", True)
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """Stand-in decorator: the kernels run as plain Python."""
+        if args and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+ENABLED = bool(USE_NUMBA and NUMBA_AVAILABLE)
+
+# Exit codes returned by exit_bars (same codes as backtest.EXIT_REASONS)
+EXIT_STOP_LOSS = 1
+EXIT_GOLD_CLOSE = 2
+EXIT_DAILY_UNSTACK = 3
+EXIT_MAX_HOLD = 4
+
+
+def backend() -> str:
+    """Name of the active kernel backend."""
+    return "numba" if ENABLED else "numpy"
+
+
+# ─── Signals ───────────────────────────────────────────────────────────────────
+@njit(cache=True, error_model="numpy")
+def _signal_loop(direction, midpoint, candle1_idx, open_, high, low, close,
+                 emas, trend, kill_zone, use_kill_zone, threshold):
+    n = len(close)
+    rows = np.empty(len(direction), dtype=np.int64)
+    count = 0
+    for r in range(len(direction)):
+        d = candle1_idx[r] + 3          # Doji: the candle after candle3
+        c = d + 1                       # Confirmation: the candle after the doji
+        if c >= n:
+            continue
+        bullish = direction[r] > 0
+
+        # Doji (zero-range candles never qualify)
+        candle_range = high[d] - low[d]
+        if candle_range == 0 or not abs(close[d] - open_[d]) / candle_range <= threshold:
+            continue
+
+        # Doji wicks into the 50% level; confirmation closes inside the doji
+        if bullish:
+            if low[d] > midpoint[r] or close[c] > high[d]:
+                continue
+        elif high[d] < midpoint[r] or close[c] < low[d]:
+            continue
+
+        # EMA stack (fastest to slowest) and 200 EMA bias at the confirmation
+        stacked = True
+        for k in range(emas.shape[0] - 1):
+            if bullish:
+                stacked = not emas[k, r] <= emas[k + 1, r]
+            else:
+                stacked = not emas[k, r] >= emas[k + 1, r]
+            if not stacked:
+                break
+        if not stacked:
+            continue
+        if not (close[c] > trend[r] if bullish else close[c] < trend[r]):
+            continue
+
+        if use_kill_zone and not kill_zone[c]:
+            continue
+        rows[count] = r
+        count += 1
+    return rows[:count]
+
+
+def signal_rows(direction, midpoint, candle1_idx, open_, high, low, close,
+                fast_emas, trend_ema, kill_zone=None, threshold=None) -> np.ndarray:
+    """
+    Compiled trident_pattern.signal_rows() on the FVG columns. The EMAs are
+    gathered at each FVG's confirmation candle first, so the kernel sees one
+    small (periods x FVGs) matrix instead of the full EMA arrays.
+    """
+    if threshold is None:
+        threshold = config.DOJI_BODY_RATIO
+    n = len(close)
+    confirm = np.minimum(candle1_idx + 4, max(n - 1, 0))
+    emas = (np.vstack([ema[confirm] for ema in fast_emas]) if n
+            else np.empty((len(fast_emas), 0)))
+    trend = trend_ema[confirm] if n else np.empty(0)
+    use_kill_zone = kill_zone is not None
+    if not use_kill_zone:
+        kill_zone = np.empty(0, dtype=np.bool_)
+    return _signal_loop(direction, midpoint, candle1_idx, open_, high, low, close,
+                        emas, trend, kill_zone, use_kill_zone, float(threshold))
+
+
+# ─── Exits ─────────────────────────────────────────────────────────────────────
+@njit(cache=True, error_model="numpy")
+def _exit_loop(entry_idx, is_buy, stop_loss, sl_level, sl_on_close, close, high, low,
+               daily_count, unstack_long, unstack_short, has_daily, max_hold, check_every):
+    n = len(close)
+    exit_idx = np.empty(len(entry_idx), dtype=np.int64)
+    reason = np.empty(len(entry_idx), dtype=np.int8)
+    for t in range(len(entry_idx)):
+        entry = entry_idx[t]
+        end = min(n, entry + max_hold)
+        buy = is_buy[t]
+        exit_idx[t] = end - 1
+        reason[t] = EXIT_MAX_HOLD
+        for i in range(entry + 1, end):
+            # Stop loss first when both fire on the same bar
+            if sl_on_close[t]:
+                hit = close[i] <= sl_level[t] if buy else close[i] >= sl_level[t]
+            else:
+                hit = low[i] <= stop_loss[t] if buy else high[i] >= stop_loss[t]
+            if hit:
+                exit_idx[t] = i
+                reason[t] = EXIT_GOLD_CLOSE if sl_on_close[t] else EXIT_STOP_LOSS
+                break
+            # Daily EMA unstack, checked once per ~day of 30M bars
+            if has_daily and i - entry >= check_every and (i - entry) % check_every == 0:
+                k = daily_count[i]
+                if unstack_long[k] if buy else unstack_short[k]:
+                    exit_idx[t] = i
+                    reason[t] = EXIT_DAILY_UNSTACK
+                    break
+    return exit_idx, reason
+
+
+def exit_bars(entry_idx, is_buy, stop_loss, sl_level, sl_on_close, close, high, low,
+              daily_count=None, unstack_long=None, unstack_short=None,
+              max_hold: int = 960, check_every: int = 48):
+    """
+    Exit bar and exit code (EXIT_*) of every trade. sl_on_close marks trades
+    stopped out on a close beyond sl_level (Gold) instead of a wick through
+    stop_loss.
+    """
+    has_daily = daily_count is not None
+    if not has_daily:
+        daily_count = np.empty(0, dtype=np.int64)
+        unstack_long = unstack_short = np.empty(0, dtype=np.bool_)
+    return _exit_loop(np.asarray(entry_idx, dtype=np.int64), np.asarray(is_buy, dtype=np.bool_),
+                      stop_loss, sl_level, np.asarray(sl_on_close, dtype=np.bool_),
+                      close, high, low, daily_count.astype(np.int64, copy=False),
+                      unstack_long, unstack_short, has_daily, max_hold, check_every)
@@ -1,11 +1,16 @@
 """
 Logging module for the trading bot.
-Logs to both console and file, with CSV trade logging.
+Logs to both console and file, with CSV trade logging written by a
+background thread.
 """
 
+import atexit
 import logging
 import csv
 import os
+import queue
+import threading
+import time
 from datetime import datetime
 import config
 
@@ -42,21 +47,186 @@ def setup_logger(name="TridentBot"):
     return logger
 
 
+# ─── Trade log (CSV) ───────────────────────────────────────────────────────────
+TRADE_LOG_FIELDS = [
+    "timestamp", "symbol", "direction", "entry_price",
+    "stop_loss", "take_profit", "lot_size", "result",
+    "pnl", "rr_ratio", "notes"
+]
+TRADE_LOG_FSYNC_INTERVAL = getattr(config, "TRADE_LOG_FSYNC_INTERVAL", 5.0)   # Seconds between fsyncs
+TRADE_LOG_MAX_BYTES = getattr(config, "TRADE_LOG_MAX_BYTES", 10 * 1024 * 1024)  # Rotate above this size
+TRADE_LOG_ROTATE_DAILY = getattr(config, "TRADE_LOG_ROTATE_DAILY", True)        # Rotate when the day changes
+TRADE_LOG_FLUSH_TIMEOUT = getattr(config, "TRADE_LOG_FLUSH_TIMEOUT", 30.0)      # Seconds flush() waits
+
+
+class TradeLogWriter:
+    """
+    Background CSV writer for trade records.
+
+    submit() only puts the row on a queue; a dedicated thread writes queued
+    rows in batches to a file it keeps open, fsyncs every
+    TRADE_LOG_FSYNC_INTERVAL seconds, and rotates the file when the day
+    changes or it grows past TRADE_LOG_MAX_BYTES. The active file is always
+    path; rotated files get the day (and a counter) appended to their name.
+    """
+
+    def __init__(self, path: str, fieldnames=None):
+        self.path = path
+        self.fieldnames = list(fieldnames or TRADE_LOG_FIELDS)
+        self._queue = queue.Queue()
+        self._file = None
+        self._writer = None
+        self._day = None
+        self._last_sync = 0.0
+        self._thread = threading.Thread(target=self._run, name="trade-log", daemon=True)
+        self._thread.start()
+
+    def submit(self, row: dict):
+        """Queue a row for writing (never blocks on disk I/O)."""
+        self._queue.put(row)
+
+    def flush(self, timeout: float = TRADE_LOG_FLUSH_TIMEOUT) -> bool:
+        """
+        Block until every row queued so far is written and synced.
+        Returns False if the writer thread is gone or timeout expires.
+        """
+        if not self._thread.is_alive():
+            return False
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self):
+        """Write everything still queued, sync and stop the writer thread."""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+    # ─── Writer thread ─────────────────────────────────────────────────────────
+    def _run(self):
+        while True:
+            try:
+                item = self._queue.get(timeout=TRADE_LOG_FSYNC_INTERVAL)
+            except queue.Empty:
+                self._guarded(self._sync)
+                continue
+
+            # Drain whatever else is already queued into the same batch
+            batch = [item]
+            while batch[-1] is not None and not isinstance(batch[-1], threading.Event):
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            for item in batch:
+                if item is None:
+                    self._guarded(self._sync, force=True)
+                    self._guarded(self._close_file)
+                    return
+                if isinstance(item, threading.Event):
+                    self._guarded(self._sync, force=True)
+                    item.set()  # Release flush() even if the sync failed
+                else:
+                    self._write(item)
+            self._guarded(self._sync)
+
+    def _guarded(self, step, *args, **kwargs):
+        """Run a writer step, logging I/O errors instead of ending the thread."""
+        try:
+            step(*args, **kwargs)
+        except Exception as e:
+            logging.getLogger("TridentBot").error(f"Trade log {step.__name__.strip('_')} failed: {e}")
+
+    def _write(self, row: dict):
+        self._guarded(self._write_row, row)
+
+    def _write_row(self, row: dict):
+        self._rotate_if_needed()
+        self._writer.writerow(row)
+
+    def _sync(self, force: bool = False):
+        if self._file is None:
+            return
+        now = time.monotonic()
+        if force or now - self._last_sync >= TRADE_LOG_FSYNC_INTERVAL:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._last_sync = now
+        else:
+            self._file.flush()
+
+    def _open(self):
+        if self._day is None and os.path.exists(self.path):
+            self._day = datetime.fromtimestamp(os.path.getmtime(self.path)).date()
+        if self._day is None:
+            self._day = datetime.now().date()
+        self._file = open(self.path, "a", newline="", encoding="utf-8")
+        self._writer = csv.DictWriter(self._file, fieldnames=self.fieldnames)
+        if self._file.tell() == 0:
+            self._writer.writeheader()
+
+    def _close_file(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._writer = None
+
+    def _rotate_if_needed(self):
+        if self._file is None:
+            self._open()
+
+        today = datetime.now().date()
+        new_day = TRADE_LOG_ROTATE_DAILY and today != self._day
+        too_big = TRADE_LOG_MAX_BYTES and self._file.tell() >= TRADE_LOG_MAX_BYTES
+        if not (new_day or too_big):
+            return
+
+        self._sync(force=True)
+        self._close_file()
+        root, ext = os.path.splitext(self.path)
+        target = f"{root}_{self._day:%Y%m%d}{ext}"
+        counter = 1
+        while os.path.exists(target):
+            target = f"{root}_{self._day:%Y%m%d}_{counter}{ext}"
+            counter += 1
+        os.replace(self.path, target)
+        self._day = today
+        self._open()
+
+
+_trade_log_writer = None
+_trade_log_lock = threading.Lock()
+
+
+def _get_trade_log_writer() -> TradeLogWriter:
+    global _trade_log_writer
+    with _trade_log_lock:
+        if _trade_log_writer is None:
+            _trade_log_writer = TradeLogWriter(config.LOG_TRADES_CSV)
+            atexit.register(shutdown_trade_log)
+        return _trade_log_writer
+
+
 def log_trade(trade_data: dict):
-    """Append a trade record to the CSV trade log."""
-    file_exists = os.path.exists(config.LOG_TRADES_CSV)
-    fieldnames = [
-        "timestamp", "symbol", "direction", "entry_price",
-        "stop_loss", "take_profit", "lot_size", "result",
-        "pnl", "rr_ratio", "notes"
-    ]
-
-    with open(config.LOG_TRADES_CSV, "a", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        if not file_exists:
-            writer.writeheader()
-
-        row = {k: trade_data.get(k, "") for k in fieldnames}
-        if "timestamp" not in trade_data or not trade_data["timestamp"]:
-            row["timestamp"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        writer.writerow(row)
+    """Queue a trade record for the CSV trade log (written in the background)."""
+    row = {k: trade_data.get(k, "") for k in TRADE_LOG_FIELDS}
+    if "timestamp" not in trade_data or not trade_data["timestamp"]:
+        row["timestamp"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    _get_trade_log_writer().submit(row)
+
+
+def flush_trade_log() -> bool:
+    """Wait until every queued trade record is on disk (False if that timed out)."""
+    if _trade_log_writer is not None:
+        return _trade_log_writer.flush()
+    return True
+
+
+def shutdown_trade_log():
+    """Flush and stop the trade log writer (safe to call more than once)."""
+    global _trade_log_writer
+    with _trade_log_lock:
+        writer, _trade_log_writer = _trade_log_writer, None
+    if writer is not None:
+        writer.close()
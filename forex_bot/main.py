@@ -11,27 +11,86 @@ Usage:
 
 import time
 import sys
-from datetime import datetime, timedelta
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+import pytz
 
 import config
+import journal
 import mt5_connector as mt5c
-from indicators import calculate_emas
+from indicators import EMAState
+from fvg_index import FVGIndex
 from trident_pattern import scan_for_signals
-from trade_manager import execute_entry, should_exit_on_daily, check_gold_candle_filter
+from trade_manager import execute_entry, check_gold_candle_filter, DailyBiasCache
 from time_filter import is_in_kill_zone, is_weekday, get_ny_now
-from logger import setup_logger
+from scheduler import BarCloseScheduler, MONITOR, TIMEFRAME_SECONDS
+from pnl_ledger import PnLLedger
+from profiler import span
+import profiler
+from logger import setup_logger, shutdown_trade_log
 
 log = setup_logger()
 
-SCAN_INTERVAL = 30  # seconds between scans
+SCAN_BARS = 200     # 30M candles handed to pattern detection
+EMA_SEED_BARS = getattr(config, "EMA_SEED_BARS", 1000)  # History used to warm up EMAs
+RECENT_BARS = 5     # Bars fetched per scan once EMA state is seeded
+
+# NY-time source for the loop (replaced by replays with a simulated clock)
+_clock = get_ny_now
+
+# Incremental EMA state per (symbol, timeframe)
+_ema_states = {}
+
+# Rolling Fair Value Gap index per symbol (entry timeframe)
+_fvg_indexes = {}
+
+# Max symbols analyzed concurrently (1 = sequential)
+SCAN_CONCURRENCY = getattr(config, "SCAN_CONCURRENCY", 4)
+_scan_pool = None
+
+# Daily-chart exit state per symbol, shared by all open positions
+_daily_bias = DailyBiasCache()
+
+# Realized PnL per trading day (created on first use, persisted to disk)
+_pnl_ledger = None
+
+# New-bar detection after a scheduled bar close
+BAR_DETECT_TIMEOUT = getattr(config, "BAR_DETECT_TIMEOUT", 10.0)  # Seconds to wait for the terminal
+BAR_POLL_INTERVAL = getattr(config, "BAR_POLL_INTERVAL", 0.25)   # Seconds between checks
+_last_bar_times = {}
+
+
+def set_clock(clock):
+    """Use clock() (tz-aware NY time) instead of the wall clock."""
+    global _clock
+    _clock = clock
+
+
+def _utc_now():
+    """Current loop time as naive UTC."""
+    return _clock().astimezone(pytz.utc).replace(tzinfo=None)
 
 
-def check_daily_limit():
+def get_pnl_ledger(sync: bool = True) -> PnLLedger:
+    """Shared realized-PnL ledger; sync=True first ingests new account deals."""
+    global _pnl_ledger
+    if _pnl_ledger is None:
+        _pnl_ledger = PnLLedger()
+    if sync:
+        _pnl_ledger.sync(mt5c.get_deals_history, now=_utc_now())
+    return _pnl_ledger
+
+
+def check_daily_limit(snapshot=None):
     """
     Check if the daily loss limit or minimum balance limit has been hit.
     Returns True if trading is allowed, False if limits are breached.
     """
-    account = mt5c.get_account_info()
+    if snapshot is None:
+        snapshot = mt5c.get_snapshot()
+    account = snapshot.account
     if not account:
         return False
 
@@ -40,24 +99,11 @@ def check_daily_limit():
         log.warning(f"🛑 CRITICAL: Balance ({account['balance']}) is below MIN_BALANCE_LIMIT ({config.MIN_BALANCE_LIMIT}). Trading disabled.")
         return False
 
-    # 2. Check Daily Loss (Realized PnL from today)
-    # Note: This is an approximation based on account history
-    import MetaTrader5 as mt5
-    from datetime import datetime, timedelta
-    
-    now = datetime.now()
-    today_start = datetime(now.year, now.month, now.day)
-    
-    # Get deals for today
-    history = mt5.history_deals_get(today_start, now + timedelta(days=1))
-    daily_pnl = 0.0
-    if history:
-        for deal in history:
-            daily_pnl += deal.profit
-            
+    # 2. Check Daily Loss (realized PnL of this bot's trades today, from the ledger)
+    daily_pnl = get_pnl_ledger().realized(magic=config.MAGIC_NUMBER, now=_utc_now())
+
     # Check floating PnL
-    open_positions = mt5c.get_open_positions()
-    floating_pnl = sum(p['profit'] for p in open_positions)
+    floating_pnl = sum(p['profit'] for p in snapshot.positions)
     
     total_today_pnl = daily_pnl + floating_pnl
     
@@ -82,30 +128,134 @@ def print_banner():
     print(banner)
 
 
-def scan_symbols():
-    """Scan all configured symbols for Trident Pattern setups."""
-    signals_found = 0
+def get_entry_candles(symbol: str):
+    """
+    Return the latest 30M candles with EMA columns for pattern detection.
 
-    for symbol in config.SYMBOLS:
-        try:
-            # Fetch 30M candles for entry analysis
-            df_30m = mt5c.get_candles(symbol, config.ENTRY_TIMEFRAME, count=200)
-            if df_30m.empty:
+    The first call per symbol seeds an EMAState from EMA_SEED_BARS of history;
+    later calls fetch only the last few bars and update the EMAs
+    incrementally. Falls back to re-seeding if bars were missed.
+    """
+    key = (symbol, config.ENTRY_TIMEFRAME)
+    state = _ema_states.get(key)
+
+    if state is not None:
+        with span("fetch", symbol):
+            df_recent = mt5c.get_candles(symbol, config.ENTRY_TIMEFRAME, count=RECENT_BARS)
+        if df_recent.empty:
+            return df_recent
+        with span("ema", symbol):
+            df = state.update(df_recent)
+        if df is not None:
+            journal.record_bars(symbol, config.ENTRY_TIMEFRAME, df_recent)
+            return df
+        log.debug(f"EMA state for {symbol} out of date — re-seeding")
+
+    with span("fetch", symbol):
+        df_hist = mt5c.get_candles(symbol, config.ENTRY_TIMEFRAME, count=EMA_SEED_BARS)
+    if len(df_hist) < 2:
+        return pd.DataFrame()
+
+    all_periods = config.EMA_FAST_PERIODS + [config.EMA_TREND_PERIOD]
+    state = EMAState(all_periods, max_bars=SCAN_BARS - 1)
+    _ema_states[key] = state
+    journal.record_bars(symbol, config.ENTRY_TIMEFRAME, df_hist)
+    with span("ema", symbol):
+        return state.seed(df_hist)
+
+
+def analyze_symbol(symbol: str):
+    """Fetch candles and run Trident detection for one symbol (no trading)."""
+    with span("analyze", symbol):
+        # Fetch 30M candles for entry analysis (EMAs updated incrementally)
+        df_30m = get_entry_candles(symbol)
+        if df_30m.empty:
+            return None
+
+        # Track gaps bar by bar, then scan for Trident Pattern
+        fvg_index = _fvg_indexes.get(symbol)
+        if fvg_index is None:
+            fvg_index = _fvg_indexes[symbol] = FVGIndex(check_time=True)
+        with span("fvg_index", symbol):
+            fvg_index.update(df_30m)
+        signal = scan_for_signals(df_30m, symbol, check_time=True, fvg_index=fvg_index)
+        if signal:
+            journal.record_signal(signal)
+        return signal
+
+
+def _get_scan_pool():
+    """Thread pool shared by all scans (created on first use)."""
+    global _scan_pool
+    if _scan_pool is None:
+        _scan_pool = ThreadPoolExecutor(max_workers=SCAN_CONCURRENCY,
+                                        thread_name_prefix="scan")
+    return _scan_pool
+
+
+def detect_new_bars(symbols, timeframe_name: str, timeout: float = BAR_DETECT_TIMEOUT):
+    """
+    Return the symbols whose newest bar on timeframe_name has changed since
+    the last call, polling one record per symbol until every symbol has a
+    new bar or timeout expires (the terminal may lag the clock slightly).
+    A symbol seen for the first time counts as new.
+    """
+    pending = list(symbols)
+    ready = []
+    deadline = time.monotonic() + timeout
+    while True:
+        for symbol in list(pending):
+            bar_time = mt5c.get_last_bar_time(symbol, timeframe_name)
+            if bar_time is None:
                 continue
+            key = (symbol, timeframe_name)
+            if _last_bar_times.get(key) != bar_time:
+                _last_bar_times[key] = bar_time
+                ready.append(symbol)
+                pending.remove(symbol)
+        if not pending or time.monotonic() >= deadline:
+            break
+        time.sleep(BAR_POLL_INTERVAL)
 
-            # Calculate EMAs
-            all_periods = config.EMA_FAST_PERIODS + [config.EMA_TREND_PERIOD]
-            df_30m = calculate_emas(df_30m, all_periods)
+    if pending:
+        log.debug(f"No new {timeframe_name} bar yet for: {', '.join(pending)}")
+    return ready
 
-            # Scan for Trident Pattern
-            signal = scan_for_signals(df_30m, symbol, check_time=True)
+
+def scan_symbols(symbols=None, snapshot=None):
+    """
+    Scan symbols (default: all configured) for Trident Pattern setups.
+
+    Symbols are analyzed concurrently (up to SCAN_CONCURRENCY at once);
+    terminal calls are serialized by mt5_connector, so only detection
+    overlaps. Orders are placed one at a time from this thread as each
+    symbol's analysis completes, so MAX_OPEN_TRADES is always checked
+    against up-to-date positions.
+    """
+    if symbols is None:
+        symbols = config.SYMBOLS
+    if snapshot is None:
+        snapshot = mt5c.get_snapshot()
+    signals_found = 0
+
+    if SCAN_CONCURRENCY > 1 and len(symbols) > 1:
+        pool = _get_scan_pool()
+        futures = {pool.submit(analyze_symbol, symbol): symbol for symbol in symbols}
+        completed = ((futures[f], f) for f in as_completed(futures))
+    else:
+        completed = ((symbol, None) for symbol in symbols)
+
+    for symbol, future in completed:
+        try:
+            signal = future.result() if future is not None else analyze_symbol(symbol)
 
             if signal:
                 log.info(f"🔔 TRIDENT SIGNAL | {symbol} {signal.direction} | "
                          f"Entry: {signal.entry_price:.5f} | SL: {signal.stop_loss:.5f}")
 
                 # Execute the trade
-                result = execute_entry(signal, mt5c)
+                with span("execute_entry", symbol):
+                    result = execute_entry(signal, mt5c, snapshot)
                 if result:
                     signals_found += 1
 
@@ -115,27 +265,22 @@ def scan_symbols():
     return signals_found
 
 
-def monitor_open_positions():
+def monitor_open_positions(snapshot=None):
     """Check open positions for exit conditions using daily chart."""
-    positions = mt5c.get_open_positions()
+    if snapshot is None:
+        snapshot = mt5c.get_snapshot()
 
-    for pos in positions:
+    to_close = []
+    for pos in snapshot.positions:
         symbol = pos["symbol"]
         direction = pos["type"]
         ticket = pos["ticket"]
 
         try:
-            # Get daily chart data for exit analysis
-            df_daily = mt5c.get_candles(symbol, config.BIAS_TIMEFRAME, count=100)
-            if df_daily.empty:
-                continue
-
-            df_daily = calculate_emas(df_daily, config.EMA_FAST_PERIODS)
-
-            # Check daily exit conditions
-            if should_exit_on_daily(df_daily, direction):
+            # Check daily exit conditions (daily chart cached until the next D1 close)
+            if _daily_bias.should_exit(symbol, direction, mt5c, _clock()):
                 log.info(f"📤 Closing {symbol} {direction} (ticket {ticket}) — daily exit signal")
-                mt5c.close_position(ticket)
+                to_close.append(ticket)
                 continue
 
             # Gold-specific candle close filter
@@ -145,11 +290,69 @@ def monitor_open_positions():
                 if not df_30m.empty:
                     if check_gold_candle_filter(df_30m, pos["open_price"], direction):
                         log.info(f"🥇 Closing Gold {direction} (ticket {ticket}) — candle filter")
-                        mt5c.close_position(ticket)
+                        to_close.append(ticket)
 
         except Exception as e:
             log.error(f"Error monitoring position {ticket}: {e}")
 
+    # Close everything that triggered in one batch
+    if to_close:
+        with span("close_positions"):
+            mt5c.close_positions(to_close, snapshot.positions)
+
+
+def run_tick(events):
+    """
+    Handle one scheduler wake-up (events from BarCloseScheduler.wait(),
+    mapped to their scheduled times).
+    """
+    with span("tick"):
+        _run_tick(events)
+    profiler.report()
+
+
+def _run_tick(events):
+    ny_now = _clock()
+    snapshot = mt5c.get_snapshot(refresh=True)  # One terminal read per tick
+
+    # A new entry bar has closed — scan only then. The kill zone is checked
+    # on the bar's open time, not the wake-up (which may run a bit late)
+    if config.ENTRY_TIMEFRAME in events:
+        bar_time = (events[config.ENTRY_TIMEFRAME]
+                    - timedelta(seconds=TIMEFRAME_SECONDS[config.ENTRY_TIMEFRAME]))
+        if is_weekday(bar_time) and is_in_kill_zone(bar_time):
+            log.info(f"⏰ Inside Kill Zone | Bar: {bar_time.strftime('%H:%M')} NY | "
+                     f"NY time: {ny_now.strftime('%H:%M:%S')}")
+
+            # ENFORCE LOSS LIMITS
+            with span("daily_limit"):
+                allowed = check_daily_limit(snapshot)
+            if allowed:
+                with span("detect_bars"):
+                    ready = detect_new_bars(config.SYMBOLS, config.ENTRY_TIMEFRAME,
+                                            BAR_DETECT_TIMEOUT)
+                if ready:
+                    scan_symbols(ready, snapshot)
+            else:
+                log.info("⏳ Waiting for limits to reset or balance to increase...")
+        else:
+            log.debug(f"Outside Kill Zone | Bar: {bar_time.strftime('%H:%M')} NY | "
+                      f"NY time: {ny_now.strftime('%H:%M:%S')}")
+
+    # Monitor open positions on their own cadence (exits can happen anytime)
+    if MONITOR in events:
+        with span("monitor"):
+            monitor_open_positions(snapshot)
+
+        # Show account status periodically (ledger as of the last limit check)
+        account = snapshot.account
+        if account:
+            realized = get_pnl_ledger(sync=False).realized(magic=config.MAGIC_NUMBER, now=_utc_now())
+            log.debug(f"💰 Balance: {account['balance']:.2f} | "
+                      f"Equity: {account['equity']:.2f} | "
+                      f"Positions: {len(snapshot.positions)} | "
+                      f"Realized today: {realized:.2f}")
+
 
 def main():
     """Main bot loop."""
@@ -169,42 +372,20 @@ def main():
 
     try:
         log.info("Bot started. Waiting for London Kill Zone...")
+        scheduler = BarCloseScheduler([config.ENTRY_TIMEFRAME], clock=_clock)
+        log.info(f"Next {config.ENTRY_TIMEFRAME} close: "
+                 f"{scheduler.next_due().strftime('%Y-%m-%d %H:%M')} NY")
         while True:
-            ny_now = get_ny_now()
-
-            # Only trade on weekdays
-            if not is_weekday(ny_now):
-                log.debug("Weekend — market closed.")
-                time.sleep(60)
-                continue
-
-            # Check if we're in the Kill Zone
-            if is_in_kill_zone(ny_now):
-                log.info(f"⏰ Inside Kill Zone | NY time: {ny_now.strftime('%H:%M:%S')}")
-                
-                # ENFORCE LOSS LIMITS
-                if check_daily_limit():
-                    scan_symbols()
-                else:
-                    log.info("⏳ Waiting for limits to reset or balance to increase...")
-            else:
-                log.debug(f"Outside Kill Zone | NY time: {ny_now.strftime('%H:%M:%S')}")
-
-            # Always monitor open positions (exits can happen anytime)
-            monitor_open_positions()
-
-            # Show account status periodically
-            account = mt5c.get_account_info()
-            if account:
-                log.debug(f"💰 Balance: {account['balance']:.2f} | "
-                          f"Equity: {account['equity']:.2f} | "
-                          f"Positions: {len(mt5c.get_open_positions())}")
-
-            time.sleep(SCAN_INTERVAL)
+            run_tick(scheduler.wait())
 
     except KeyboardInterrupt:
         log.info("\n🛑 Bot stopped by user.")
     finally:
+        if _scan_pool is not None:
+            _scan_pool.shutdown(wait=True)
+        profiler.report(force=True)
+        shutdown_trade_log()
+        journal.shutdown_journal()
         mt5c.disconnect()
 
 
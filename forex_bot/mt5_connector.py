@@ -1,37 +1,81 @@
 """
 MT5 Connector — handles MetaTrader 5 connection, data retrieval, and order execution.
+
+The broker backend is selected with config.BROKER_BACKEND:
+    "mt5" — the MetaTrader5 terminal package (default)
+    "sim" — sim_broker, a file-backed simulation that runs without a terminal
+Both expose the same MetaTrader5-style API, so the rest of this module is
+backend-agnostic.
+
+The MetaTrader5 package is not documented as thread-safe, so every call into
+the backend goes through _terminal_lock (symbol scans run on worker
+threads).
 """
 
-import MetaTrader5 as mt5
+import importlib
+import threading
+import time
+
 import pandas as pd
 from datetime import datetime
 import config
+import journal
 from logger import setup_logger
 
 log = setup_logger()
 
+BACKENDS = {
+    "mt5": "MetaTrader5",
+    "sim": "sim_broker",
+}
+
+BROKER_BACKEND = getattr(config, "BROKER_BACKEND", "mt5")
+SYMBOL_INFO_TTL = getattr(config, "SYMBOL_INFO_TTL", 3600)  # Seconds before symbol specs are re-read
+CLOSE_RETRIES = getattr(config, "CLOSE_RETRIES", 3)          # Re-sends after a requote / off quotes
+
+# symbol_info().filling_mode flags (SYMBOL_FILLING_FOK / SYMBOL_FILLING_IOC)
+_SYMBOL_FILLING_FOK = 1
+_SYMBOL_FILLING_IOC = 2
+
+
+def load_backend(name: str):
+    """Import the broker backend module registered under name."""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown broker backend '{name}' (expected one of {list(BACKENDS)})")
+    return importlib.import_module(BACKENDS[name])
+
+
+mt5 = load_backend(BROKER_BACKEND)
+
+# Serializes calls into the backend; hold it only around the call itself
+_terminal_lock = threading.Lock()
+
 
 def connect():
     """Initialize connection to the MT5 terminal."""
-    if not mt5.initialize():
-        log.error(f"MT5 initialize() failed: {mt5.last_error()}")
-        return False
+    with _terminal_lock:
+        if not mt5.initialize():
+            log.error(f"MT5 initialize() failed: {mt5.last_error()}")
+            return False
 
-    account_info = mt5.account_info()
-    if account_info is None:
-        log.error("Failed to get account info — is MT5 logged in?")
-        mt5.shutdown()
-        return False
+        account_info = mt5.account_info()
+        if account_info is None:
+            log.error("Failed to get account info — is MT5 logged in?")
+            mt5.shutdown()
+            return False
 
     log.info(f"Connected to MT5 | Account: {account_info.login} | "
              f"Server: {account_info.server} | "
              f"Balance: {account_info.balance:.2f} {account_info.currency}")
+
+    load_symbols(config.SYMBOLS)
     return True
 
 
 def disconnect():
     """Shutdown MT5 connection."""
-    mt5.shutdown()
+    with _terminal_lock:
+        mt5.shutdown()
     log.info("MT5 connection closed.")
 
 
@@ -53,7 +97,8 @@ def get_timeframe_constant(tf_name: str):
 def get_candles(symbol: str, timeframe_name: str, count: int = 200) -> pd.DataFrame:
     """Fetch OHLC candles as a DataFrame. Returns empty DataFrame on failure."""
     tf = get_timeframe_constant(timeframe_name)
-    rates = mt5.copy_rates_from_pos(symbol, tf, 0, count)
+    with _terminal_lock:
+        rates = mt5.copy_rates_from_pos(symbol, tf, 0, count)
 
     if rates is None or len(rates) == 0:
         log.warning(f"No candle data for {symbol} on {timeframe_name}")
@@ -72,14 +117,34 @@ def get_candles(symbol: str, timeframe_name: str, count: int = 200) -> pd.DataFr
     return df
 
 
-def get_candles_range(symbol: str, timeframe_name: str,
-                      date_from: datetime, date_to: datetime) -> pd.DataFrame:
-    """Fetch candles within a specific date range. Used mainly for backtesting."""
+def get_last_bar_time(symbol: str, timeframe_name: str):
+    """Open time (epoch seconds) of the newest bar — a one-record request. None on failure."""
     tf = get_timeframe_constant(timeframe_name)
-    rates = mt5.copy_rates_range(symbol, tf, date_from, date_to)
+    with _terminal_lock:
+        rates = mt5.copy_rates_from_pos(symbol, tf, 0, 1)
+    if rates is None or len(rates) == 0:
+        return None
+    return int(rates[0]["time"])
+
+
+def get_rates_range(symbol: str, timeframe_name: str,
+                    date_from: datetime, date_to: datetime):
+    """Fetch raw MT5 rate records (NumPy structured array) within a date range."""
+    tf = get_timeframe_constant(timeframe_name)
+    with _terminal_lock:
+        rates = mt5.copy_rates_range(symbol, tf, date_from, date_to)
 
     if rates is None or len(rates) == 0:
         log.warning(f"No candle data for {symbol} between {date_from} and {date_to}")
+        return None
+    return rates
+
+
+def get_candles_range(symbol: str, timeframe_name: str,
+                      date_from: datetime, date_to: datetime) -> pd.DataFrame:
+    """Fetch candles within a specific date range. Used mainly for backtesting."""
+    rates = get_rates_range(symbol, timeframe_name, date_from, date_to)
+    if rates is None:
         return pd.DataFrame()
 
     df = pd.DataFrame(rates)
@@ -89,7 +154,8 @@ def get_candles_range(symbol: str, timeframe_name: str,
 
 def get_account_info() -> dict:
     """Return account balance, equity, margin, etc."""
-    info = mt5.account_info()
+    with _terminal_lock:
+        info = mt5.account_info()
     if info is None:
         return {}
     return {
@@ -103,20 +169,96 @@ def get_account_info() -> dict:
     }
 
 
-def get_symbol_info(symbol: str) -> dict:
-    """Get symbol point size, digits, and other info for order calculations."""
-    info = mt5.symbol_info(symbol)
-    if info is None:
-        log.error(f"Symbol {symbol} not found in MT5")
-        return {}
-    return {
+# ─── Symbol registry ───────────────────────────────────────────────────────────
+_symbols = {}          # symbol -> spec dict (see _load_symbol)
+_order_templates = {}  # symbol -> request fields that never change per order
+
+
+def _filling_type(filling_mode: int):
+    """Order filling type supported by a symbol (IOC preferred, as before)."""
+    if filling_mode & _SYMBOL_FILLING_IOC:
+        return mt5.ORDER_FILLING_IOC
+    if filling_mode & _SYMBOL_FILLING_FOK:
+        return mt5.ORDER_FILLING_FOK
+    return mt5.ORDER_FILLING_RETURN
+
+
+def _load_symbol(symbol: str):
+    """Read a symbol's spec from the terminal and rebuild its order template."""
+    with _terminal_lock:
+        info = mt5.symbol_info(symbol)
+        if info is None:
+            return None
+
+        # Ensure symbol is visible in Market Watch
+        if not info.visible:
+            mt5.symbol_select(symbol, True)
+
+    spec = {
         "point": info.point,
         "digits": info.digits,
         "trade_contract_size": info.trade_contract_size,
         "volume_min": info.volume_min,
         "volume_max": info.volume_max,
         "volume_step": info.volume_step,
+        "filling_mode": getattr(info, "filling_mode", _SYMBOL_FILLING_IOC),
+        "loaded_at": time.monotonic(),
+    }
+    _symbols[symbol] = spec
+    _order_templates[symbol] = {
+        "action":    mt5.TRADE_ACTION_DEAL,
+        "symbol":    symbol,
+        "deviation": config.SLIPPAGE,
+        "magic":     config.MAGIC_NUMBER,
+        "type_time": mt5.ORDER_TIME_GTC,
+        "type_filling": _filling_type(spec["filling_mode"]),
     }
+    return spec
+
+
+def load_symbols(symbols):
+    """Load specs and order templates for symbols (called by connect())."""
+    missing = [s for s in symbols if _load_symbol(s) is None]
+    if missing:
+        log.warning(f"Symbols not found in MT5: {', '.join(missing)}")
+
+
+def _symbol_spec(symbol: str):
+    spec = _symbols.get(symbol)
+    if spec is None or time.monotonic() - spec["loaded_at"] > SYMBOL_INFO_TTL:
+        spec = _load_symbol(symbol)
+    return spec
+
+
+def get_symbol_info(symbol: str) -> dict:
+    """Get symbol point size, digits, and other info for order calculations."""
+    spec = _symbol_spec(symbol)
+    if spec is None:
+        log.error(f"Symbol {symbol} not found in MT5")
+        return {}
+    return {k: v for k, v in spec.items() if k != "loaded_at"}
+
+
+def _order_request(symbol: str, **fields):
+    """Order request from the symbol's template (None if the symbol is unknown)."""
+    if _symbol_spec(symbol) is None:
+        return None
+    request = dict(_order_templates[symbol])
+    request.update(fields)
+    return request
+
+
+# ─── Orders ────────────────────────────────────────────────────────────────────
+def _order_send(request: dict):
+    """order_send with the request and the reply recorded in the event journal."""
+    journal.record_order(request, request["type"] == mt5.ORDER_TYPE_BUY)
+    with _terminal_lock:
+        result = mt5.order_send(request)
+        error = mt5.last_error() if result is None else None
+    journal.record_fill(request, result)
+    if result is None:
+        log.error(f"Order send returned None: {error}")
+    return result
 
 
 def place_order(symbol: str, order_type: str, lot: float,
@@ -126,45 +268,28 @@ def place_order(symbol: str, order_type: str, lot: float,
     order_type: "BUY" or "SELL"
     Returns the order result or None on failure.
     """
-    sym_info = mt5.symbol_info(symbol)
-    if sym_info is None:
+    request = _order_request(symbol, volume=lot, sl=sl, tp=tp, comment=comment)
+    if request is None:
         log.error(f"Symbol {symbol} not found")
         return None
 
-    # Ensure symbol is visible in Market Watch
-    if not sym_info.visible:
-        mt5.symbol_select(symbol, True)
-
-    price = mt5.symbol_info_tick(symbol)
+    with _terminal_lock:
+        price = mt5.symbol_info_tick(symbol)
     if price is None:
         log.error(f"Failed to get tick for {symbol}")
         return None
 
     if order_type == "BUY":
-        trade_type = mt5.ORDER_TYPE_BUY
+        request["type"] = mt5.ORDER_TYPE_BUY
         entry_price = price.ask
     else:
-        trade_type = mt5.ORDER_TYPE_SELL
+        request["type"] = mt5.ORDER_TYPE_SELL
         entry_price = price.bid
+    request["price"] = entry_price
 
-    request = {
-        "action":    mt5.TRADE_ACTION_DEAL,
-        "symbol":    symbol,
-        "volume":    lot,
-        "type":      trade_type,
-        "price":     entry_price,
-        "sl":        sl,
-        "tp":        tp,
-        "deviation": config.SLIPPAGE,
-        "magic":     config.MAGIC_NUMBER,
-        "comment":   comment,
-        "type_time": mt5.ORDER_TIME_GTC,
-        "type_filling": mt5.ORDER_FILLING_IOC,
-    }
-
-    result = mt5.order_send(request)
+    result = _order_send(request)
+    _snapshot.invalidate()  # Positions / deals may have changed, even on failure
     if result is None:
-        log.error(f"Order send returned None: {mt5.last_error()}")
         return None
 
     if result.retcode != mt5.TRADE_RETCODE_DONE:
@@ -177,55 +302,134 @@ def place_order(symbol: str, order_type: str, lot: float,
     return result
 
 
-def close_position(ticket: int):
-    """Close an open position by ticket number."""
-    positions = mt5.positions_get(ticket=ticket)
-    if positions is None or len(positions) == 0:
-        log.warning(f"No position found with ticket {ticket}")
-        return None
+def _retry_retcodes() -> set:
+    """Retcodes worth re-sending with a fresh price (requote / price changed / off quotes)."""
+    names = ("TRADE_RETCODE_REQUOTE", "TRADE_RETCODE_PRICE_CHANGED", "TRADE_RETCODE_PRICE_OFF")
+    return {getattr(mt5, name) for name in names if hasattr(mt5, name)}
 
-    pos = positions[0]
-    symbol = pos.symbol
-    lot = pos.volume
+
+def _send_close(ticket: int, symbol: str, lot: float, is_buy: bool, tick=None):
+    """
+    Send the close order for one position, re-pricing and retrying up to
+    CLOSE_RETRIES times on requotes. Returns the order result or None.
+    """
+    request = _order_request(symbol, volume=lot, position=ticket, comment="TridentBot_Close")
+    if request is None:
+        log.error(f"Failed to close ticket {ticket}: symbol {symbol} not found")
+        return None
 
     # Reverse the direction to close
-    if pos.type == mt5.ORDER_TYPE_BUY:
-        trade_type = mt5.ORDER_TYPE_SELL
-        price = mt5.symbol_info_tick(symbol).bid
-    else:
-        trade_type = mt5.ORDER_TYPE_BUY
-        price = mt5.symbol_info_tick(symbol).ask
+    request["type"] = mt5.ORDER_TYPE_SELL if is_buy else mt5.ORDER_TYPE_BUY
+    retry = _retry_retcodes()
+
+    for attempt in range(CLOSE_RETRIES + 1):
+        if tick is None:
+            with _terminal_lock:
+                tick = mt5.symbol_info_tick(symbol)
+            if tick is None:
+                log.error(f"Failed to close ticket {ticket}: no price for {symbol}")
+                return None
+        price = tick.bid if is_buy else tick.ask
+        request["price"] = price
+
+        result = _order_send(request)
+        _snapshot.invalidate()  # Positions / deals may have changed, even on failure
+        if result is not None and result.retcode == mt5.TRADE_RETCODE_DONE:
+            log.info(f"🔒 Position closed | ticket={ticket} | {symbol} @ {price:.5f}")
+            return result
+        if result is None or result.retcode not in retry or attempt == CLOSE_RETRIES:
+            break
+        log.debug(f"Close of ticket {ticket} requoted (retcode={result.retcode}) — retrying")
+        tick = None
+
+    log.error(f"Failed to close ticket {ticket}: "
+              f"{result.retcode if result is not None else 'no reply from order_send'}")
+    return None
+
+
+def close_position(ticket: int, position: dict = None):
+    """
+    Close an open position by ticket number.
+    position (a get_open_positions() entry) skips the position lookup.
+    """
+    if position is None:
+        with _terminal_lock:
+            positions = mt5.positions_get(ticket=ticket)
+        if positions is None or len(positions) == 0:
+            log.warning(f"No position found with ticket {ticket}")
+            return None
+        pos = positions[0]
+        return _send_close(ticket, pos.symbol, pos.volume, pos.type == mt5.ORDER_TYPE_BUY)
 
-    request = {
-        "action":    mt5.TRADE_ACTION_DEAL,
-        "symbol":    symbol,
-        "volume":    lot,
-        "type":      trade_type,
-        "position":  ticket,
-        "price":     price,
-        "deviation": config.SLIPPAGE,
-        "magic":     config.MAGIC_NUMBER,
-        "comment":   "TridentBot_Close",
-        "type_time": mt5.ORDER_TIME_GTC,
-        "type_filling": mt5.ORDER_FILLING_IOC,
-    }
+    return _send_close(ticket, position["symbol"], position["volume"], position["type"] == "BUY")
 
-    result = mt5.order_send(request)
-    if result is None or result.retcode != mt5.TRADE_RETCODE_DONE:
-        log.error(f"Failed to close ticket {ticket}: {mt5.last_error()}")
-        return None
 
-    log.info(f"🔒 Position closed | ticket={ticket} | {symbol} @ {price:.5f}")
-    return result
+def close_positions(tickets, positions: list = None) -> dict:
+    """
+    Close several positions at once.
+
+    Positions are looked up with one positions_get (or taken from
+    positions, get_open_positions() entries), ticks are fetched once per
+    symbol, and the close orders are sent one after another with retries on
+    requotes (the MetaTrader5 package has no asynchronous order_send, and
+    terminal calls are serialized by _terminal_lock anyway).
+    Returns {ticket: order result, or None if it could not be closed}.
+    """
+    tickets = list(dict.fromkeys(tickets))
+    if not tickets:
+        return {}
+
+    if positions is None:
+        with _terminal_lock:
+            raw = mt5.positions_get()
+        positions = [
+            {"ticket": p.ticket, "symbol": p.symbol, "volume": p.volume,
+             "type": "BUY" if p.type == mt5.ORDER_TYPE_BUY else "SELL"}
+            for p in (raw or ())
+        ]
+    by_ticket = {p["ticket"]: p for p in positions}
+
+    results = {}
+    orders = []
+    for ticket in tickets:
+        pos = by_ticket.get(ticket)
+        if pos is None:
+            log.warning(f"No position found with ticket {ticket}")
+            results[ticket] = None
+        else:
+            orders.append(pos)
+
+    ticks = {}
+    with _terminal_lock:
+        for symbol in {pos["symbol"] for pos in orders}:
+            ticks[symbol] = mt5.symbol_info_tick(symbol)
+
+    for pos in orders:
+        results[pos["ticket"]] = _send_close(pos["ticket"], pos["symbol"], pos["volume"],
+                                             pos["type"] == "BUY", ticks[pos["symbol"]])
+
+    closed = sum(r is not None for r in results.values())
+    log.info(f"🔒 Bulk close | {closed}/{len(tickets)} positions closed")
+    return results
+
+
+def get_deals_history(date_from: datetime, date_to: datetime) -> list:
+    """Return raw account deals executed between date_from and date_to."""
+    with _terminal_lock:
+        deals = mt5.history_deals_get(date_from, date_to)
+    if deals is None:
+        return []
+    return list(deals)
 
 
 def get_open_positions() -> list:
     """Return all open positions placed by this bot (filtered by magic number)."""
-    positions = mt5.positions_get()
+    with _terminal_lock:
+        positions = mt5.positions_get()
     if positions is None:
         return []
 
-    bot_positions = [
+    return [
         {
             "ticket": p.ticket,
             "symbol": p.symbol,
@@ -242,4 +446,43 @@ def get_open_positions() -> list:
         for p in positions
         if p.magic == config.MAGIC_NUMBER
     ]
-    return bot_positions
+
+
+# ─── Per-tick account snapshot ─────────────────────────────────────────────────
+class AccountSnapshot:
+    """
+    Account info and bot positions, each fetched from the terminal at most
+    once until invalidated. place_order / close_position
+    invalidate the shared snapshot, so holders see fresh data on next access.
+    """
+
+    def __init__(self):
+        self._account = None
+        self._positions = None
+
+    def invalidate(self):
+        """Drop cached data; the next access refetches."""
+        self._account = None
+        self._positions = None
+
+    @property
+    def account(self) -> dict:
+        if self._account is None:
+            self._account = get_account_info()
+        return self._account
+
+    @property
+    def positions(self) -> list:
+        if self._positions is None:
+            self._positions = get_open_positions()
+        return self._positions
+
+
+_snapshot = AccountSnapshot()
+
+
+def get_snapshot(refresh: bool = False) -> AccountSnapshot:
+    """Shared account snapshot; refresh=True starts a new tick."""
+    if refresh:
+        _snapshot.invalidate()
+    return _snapshot
@@ -0,0 +1,113 @@
+"""
+Multi-Timeframe Panel — entry and bias timeframe candles of one symbol, aligned once.
+
+The panel holds the entry (30M) and bias (D1) frames with their EMAs
+computed once, and bias_count: for every entry bar, the number of bias bars
+that had closed by the time that entry bar closed. A bias bar only counts
+once its full period has elapsed,
+
+    bias bar k is closed at entry bar i  ⇔  open_k + bias period <= open_i + entry period
+
+so the entry bar at 10:30 sees yesterday's daily candle, never today's
+still-forming one (no look-ahead). The mapping is one searchsorted over the
+whole dataset; looking up the bias bars of any entry bar is then O(1).
+
+The backtest builds its exit context from a panel, and the live
+DailyBiasCache picks its closed daily bars with the same rule
+(closed_count against the newest entry bar), so both see the same bias bar
+at the same moment.
+"""
+
+from datetime import datetime
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+import config
+import candle_store
+from columnar import epoch_ns_array
+from indicators import calculate_emas
+from scheduler import TIMEFRAME_SECONDS
+
+_NS = 1_000_000_000
+
+
+def period_ns(timeframe_name: str) -> int:
+    """Length of one bar of timeframe_name in nanoseconds."""
+    return TIMEFRAME_SECONDS[timeframe_name] * _NS
+
+
+def closed_count(bias_times: np.ndarray, as_of, bias_tf: Optional[str] = None) -> np.ndarray:
+    """
+    Number of bias bars (open times, epoch ns, ascending) closed at each
+    as_of time (epoch ns, scalar or array).
+    """
+    close_times = bias_times + period_ns(bias_tf or config.BIAS_TIMEFRAME)
+    return np.searchsorted(close_times, as_of, side="right")
+
+
+def closed_bar_count(entry_times: np.ndarray, bias_times: np.ndarray,
+                     entry_tf: Optional[str] = None,
+                     bias_tf: Optional[str] = None) -> np.ndarray:
+    """For every entry bar (open times, epoch ns), the number of bias bars closed at its close."""
+    as_of = entry_times + period_ns(entry_tf or config.ENTRY_TIMEFRAME)
+    return closed_count(bias_times, as_of, bias_tf).astype(np.int64)
+
+
+class MTFPanel:
+    """
+    Entry and bias candles of one symbol with EMAs and the entry → bias bar
+    alignment. entry_periods / bias_periods default to the strategy's EMAs;
+    pass [] to skip computing them.
+    """
+
+    def __init__(self, symbol: str, entry: pd.DataFrame, bias: pd.DataFrame,
+                 entry_tf: Optional[str] = None, bias_tf: Optional[str] = None,
+                 entry_periods: Optional[List[int]] = None,
+                 bias_periods: Optional[List[int]] = None):
+        self.symbol = symbol
+        self.entry_tf = entry_tf or config.ENTRY_TIMEFRAME
+        self.bias_tf = bias_tf or config.BIAS_TIMEFRAME
+
+        if entry_periods is None:
+            entry_periods = config.EMA_FAST_PERIODS + [config.EMA_TREND_PERIOD]
+        if bias_periods is None:
+            bias_periods = config.EMA_FAST_PERIODS
+        self.entry = calculate_emas(entry, entry_periods) if not entry.empty else entry
+        self.bias = calculate_emas(bias, bias_periods) if not bias.empty else bias
+
+        self.entry_times = (epoch_ns_array(entry["time"].array) if not entry.empty
+                            else np.empty(0, dtype=np.int64))
+        self.bias_times = (epoch_ns_array(bias["time"].array) if not bias.empty
+                           else np.empty(0, dtype=np.int64))
+        self.bias_count = closed_bar_count(self.entry_times, self.bias_times,
+                                           self.entry_tf, self.bias_tf)
+
+    @classmethod
+    def load(cls, symbol: str, date_from: datetime, date_to: datetime,
+             offline: bool = False, entry_tf: Optional[str] = None,
+             bias_tf: Optional[str] = None, **kwargs) -> "MTFPanel":
+        """Panel over [date_from, date_to] from the local candle cache."""
+        entry_tf = entry_tf or config.ENTRY_TIMEFRAME
+        bias_tf = bias_tf or config.BIAS_TIMEFRAME
+        entry = candle_store.load_candles(symbol, entry_tf, date_from, date_to,
+                                          refresh=not offline)
+        bias = candle_store.load_candles(symbol, bias_tf, date_from, date_to,
+                                         refresh=not offline)
+        return cls(symbol, entry, bias, entry_tf, bias_tf, **kwargs)
+
+    def __len__(self) -> int:
+        return len(self.entry)
+
+    @property
+    def has_bias(self) -> bool:
+        return not self.bias.empty
+
+    def bias_index(self, i: int) -> int:
+        """Row in bias of the last bias bar closed at entry bar i (-1 if none)."""
+        return int(self.bias_count[i]) - 1
+
+    def bias_asof(self, i: int) -> pd.DataFrame:
+        """The bias bars closed at entry bar i (a slice of bias, not a copy)."""
+        return self.bias.iloc[:int(self.bias_count[i])]
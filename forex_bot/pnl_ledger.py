@@ -0,0 +1,191 @@
+"""
+PnL Ledger — running realized PnL per trading day, symbol and magic number.
+
+Deals are ingested incrementally: each sync only asks the terminal for deals
+since the newest one already recorded and skips anything at or before that
+(time, ticket) mark. Totals and the mark are persisted to PNL_LEDGER_FILE so
+a restart does not re-read the day's history.
+
+A trading day runs from PNL_ROLLOVER_HOUR_NY to the same hour on the next
+day (New York time) and is labelled with the date it ends on, so with the
+default 17:00 roll-over Monday 17:00 → Tuesday 17:00 NY is Tuesday.
+
+Deal times come in the trade server's clock and are converted to UTC with
+SERVER_UTC_OFFSET_HOURS (see time_filter) before they are bucketed.
+"""
+
+import json
+import os
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, Dict, Optional
+
+import pytz
+
+import config
+from scheduler import D1_CLOSE_HOUR_NY
+from time_filter import NY_TZ, SERVER_UTC_OFFSET_HOURS, server_to_utc, utc_to_server
+from logger import setup_logger
+
+log = setup_logger()
+
+PNL_LEDGER_FILE = getattr(config, "PNL_LEDGER_FILE", "pnl_ledger.json")
+PNL_ROLLOVER_HOUR_NY = getattr(config, "PNL_ROLLOVER_HOUR_NY", D1_CLOSE_HOUR_NY)
+PNL_KEEP_DAYS = getattr(config, "PNL_KEEP_DAYS", 90)  # Days of totals kept on disk
+
+
+def _utc_now() -> datetime:
+    """Wall clock as naive UTC."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _from_epoch(seconds: int) -> datetime:
+    """Naive datetime of epoch seconds, in whatever clock they were stamped in."""
+    return datetime.fromtimestamp(seconds, timezone.utc).replace(tzinfo=None)
+
+
+def _new_day() -> dict:
+    return {"total": 0.0, "deals": 0, "symbols": {}, "magics": {}}
+
+
+class PnLLedger:
+    """Realized PnL totals built incrementally from account deals."""
+
+    def __init__(self, path: Optional[str] = PNL_LEDGER_FILE,
+                 rollover_hour: int = PNL_ROLLOVER_HOUR_NY,
+                 server_offset: Optional[float] = SERVER_UTC_OFFSET_HOURS):
+        self.path = path
+        self.rollover_hour = rollover_hour
+        self.server_offset = server_offset
+        self.last_time = 0      # Newest ingested deal (epoch seconds)
+        self.last_ticket = 0    # ... and its ticket, to break same-second ties
+        self.days: Dict[str, dict] = {}
+        self._load()
+
+    # ─── Trading-day arithmetic ────────────────────────────────────────────────
+    def trading_day(self, utc_dt: datetime) -> date:
+        """Trading day (labelled by its end date) that a naive UTC time falls in."""
+        ny = pytz.utc.localize(utc_dt).astimezone(NY_TZ)
+        return (ny.replace(tzinfo=None) + timedelta(hours=(24 - self.rollover_hour) % 24)).date()
+
+    def day_start(self, day: date) -> datetime:
+        """Naive UTC start of a trading day."""
+        start_date = day - timedelta(days=1) if self.rollover_hour else day
+        start = NY_TZ.localize(datetime(start_date.year, start_date.month, start_date.day,
+                                        self.rollover_hour))
+        return start.astimezone(pytz.utc).replace(tzinfo=None)
+
+    # ─── Server time ───────────────────────────────────────────────────────────
+    def to_utc(self, server_dt: datetime) -> datetime:
+        """Naive UTC time of a naive trade-server time."""
+        return server_to_utc(server_dt, self.server_offset)
+
+    def to_server(self, utc_dt: datetime) -> datetime:
+        """Naive trade-server time of a naive UTC time."""
+        return utc_to_server(utc_dt, self.server_offset)
+
+    # ─── Ingestion ─────────────────────────────────────────────────────────────
+    def ingest(self, deals) -> int:
+        """Add deals newer than the last recorded one. Returns how many were new."""
+        mark = (self.last_time, self.last_ticket)
+        fresh = sorted((d for d in deals if (int(d.time), int(d.ticket)) > mark),
+                       key=lambda d: (int(d.time), int(d.ticket)))
+
+        for deal in fresh:
+            pnl = (deal.profit + getattr(deal, "commission", 0.0)
+                   + getattr(deal, "swap", 0.0) + getattr(deal, "fee", 0.0))
+            key = self.trading_day(self.to_utc(_from_epoch(int(deal.time)))).isoformat()
+            day = self.days.setdefault(key, _new_day())
+            day["total"] += pnl
+            day["deals"] += 1
+            day["symbols"][deal.symbol] = day["symbols"].get(deal.symbol, 0.0) + pnl
+            magic = str(deal.magic)
+            day["magics"][magic] = day["magics"].get(magic, 0.0) + pnl
+
+        if fresh:
+            self.last_time, self.last_ticket = int(fresh[-1].time), int(fresh[-1].ticket)
+        return len(fresh)
+
+    def sync(self, fetch: Callable[[datetime, datetime], list],
+             now: Optional[datetime] = None) -> int:
+        """
+        Pull new deals with fetch(date_from, date_to) (e.g.
+        mt5_connector.get_deals_history) and persist if anything changed.
+        now is naive UTC (default: the wall clock); fetch gets server times.
+        """
+        if now is None:
+            now = _utc_now()
+
+        if self.last_time:
+            date_from = _from_epoch(self.last_time)
+        else:
+            date_from = self.to_server(self.day_start(self.trading_day(now)))
+
+        added = self.ingest(fetch(date_from, self.to_server(now) + timedelta(days=1)))
+        if added:
+            self._prune(now)
+            self.save()
+        return added
+
+    # ─── Queries ───────────────────────────────────────────────────────────────
+    def realized(self, day: Optional[date] = None, symbol: Optional[str] = None,
+                 magic: Optional[int] = None, now: Optional[datetime] = None) -> float:
+        """Realized PnL for a trading day (default: the current one)."""
+        if day is None:
+            day = self.trading_day(now or _utc_now())
+        totals = self.days.get(day.isoformat())
+        if totals is None:
+            return 0.0
+        if symbol is not None:
+            return totals["symbols"].get(symbol, 0.0)
+        if magic is not None:
+            return totals["magics"].get(str(magic), 0.0)
+        return totals["total"]
+
+    def day_summary(self, day: Optional[date] = None,
+                    now: Optional[datetime] = None) -> dict:
+        """Copy of a day's totals (total, deals, symbols, magics)."""
+        if day is None:
+            day = self.trading_day(now or _utc_now())
+        totals = self.days.get(day.isoformat(), _new_day())
+        return json.loads(json.dumps(totals))
+
+    # ─── Persistence ───────────────────────────────────────────────────────────
+    def _prune(self, now: datetime):
+        cutoff = (self.trading_day(now) - timedelta(days=PNL_KEEP_DAYS)).isoformat()
+        for key in [k for k in self.days if k < cutoff]:
+            del self.days[key]
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError) as e:
+            log.warning(f"Could not read PnL ledger {self.path} ({e}) — starting fresh")
+            return
+        if state.get("rollover_hour", self.rollover_hour) != self.rollover_hour:
+            log.warning("PnL ledger roll-over hour changed — rebuilding from history")
+            return
+        if state.get("server_offset", 0) != self.server_offset:  # Older ledgers read server time as UTC
+            log.warning("PnL ledger server time offset changed — rebuilding from history")
+            return
+        self.last_time = state.get("last_time", 0)
+        self.last_ticket = state.get("last_ticket", 0)
+        self.days = state.get("days", {})
+
+    def save(self):
+        """Write the ledger atomically (no-op without a path)."""
+        if not self.path:
+            return
+        state = {
+            "rollover_hour": self.rollover_hour,
+            "server_offset": self.server_offset,
+            "last_time": self.last_time,
+            "last_ticket": self.last_ticket,
+            "days": self.days,
+        }
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.path)
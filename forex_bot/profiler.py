@@ -0,0 +1,155 @@
+"""
+Profiler — lightweight timing spans for the scan / trade pipeline.
+
+    with span("fetch", symbol):
+        df = mt5c.get_candles(...)
+
+Durations are measured with the monotonic perf_counter and kept per
+(stage, symbol) in a rolling window of the last PROFILE_MAX_SAMPLES calls,
+from which p50 / p95 / p99 are reported. When profiling is off, span()
+returns a shared no-op context manager, so instrumented code pays only a
+function call.
+
+report() (called every loop tick) logs a one-line summary per stage every
+PROFILE_SUMMARY_INTERVAL seconds and, if PROFILE_METRICS_FILE is set,
+rewrites that file with the full per-symbol table as JSON.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+import config
+from logger import setup_logger
+
+PROFILING = getattr(config, "PROFILING", False)
+PROFILE_MAX_SAMPLES = getattr(config, "PROFILE_MAX_SAMPLES", 10000)       # Window per stage/symbol
+PROFILE_SUMMARY_INTERVAL = getattr(config, "PROFILE_SUMMARY_INTERVAL", 300)  # Seconds between summaries
+PROFILE_METRICS_FILE = getattr(config, "PROFILE_METRICS_FILE", None)      # JSON metrics output
+
+_enabled = PROFILING
+_max_samples: Optional[int] = PROFILE_MAX_SAMPLES
+_samples: Dict[Tuple[str, str], deque] = {}
+_lock = threading.Lock()
+_last_report = time.monotonic()
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+class _Span:
+    __slots__ = ("key", "start")
+
+    def __init__(self, key: Tuple[str, str]):
+        self.key = key
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.key[0], time.perf_counter() - self.start, self.key[1])
+        return False
+
+
+def span(stage: str, symbol: str = ""):
+    """Context manager timing one stage (no-op while profiling is disabled)."""
+    if not _enabled:
+        return _NO_SPAN
+    return _Span((stage, symbol))
+
+
+def record(stage: str, seconds: float, symbol: str = ""):
+    """Add one duration sample."""
+    key = (stage, symbol)
+    samples = _samples.get(key)
+    if samples is None:
+        with _lock:
+            samples = _samples.setdefault(key, deque(maxlen=_max_samples))
+    samples.append(seconds)
+
+
+def enable(max_samples: Optional[int] = PROFILE_MAX_SAMPLES):
+    """Turn profiling on; max_samples=None keeps every sample (replays)."""
+    global _enabled, _max_samples
+    _enabled = True
+    _max_samples = max_samples
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def reset():
+    """Drop all collected samples."""
+    with _lock:
+        _samples.clear()
+
+
+def summary(by_symbol: bool = True) -> List[dict]:
+    """Latency table (ms) per stage, or per stage and symbol."""
+    with _lock:
+        items = [(key, list(samples)) for key, samples in _samples.items()]
+
+    groups = defaultdict(list)
+    for (stage, symbol), samples in items:
+        groups[(stage, symbol if by_symbol else "")].extend(samples)
+
+    rows = []
+    for (stage, symbol), samples in groups.items():
+        if not samples:
+            continue
+        ms = np.asarray(samples) * 1000.0
+        p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+        row = {"stage": stage}
+        if by_symbol:
+            row["symbol"] = symbol
+        row.update({"calls": len(ms), "mean_ms": float(ms.mean()), "p50_ms": float(p50),
+                    "p95_ms": float(p95), "p99_ms": float(p99), "max_ms": float(ms.max())})
+        rows.append(row)
+    return rows
+
+
+def report(force: bool = False):
+    """Log a summary line and write the metrics file, at most every PROFILE_SUMMARY_INTERVAL s."""
+    global _last_report
+    if not _enabled:
+        return
+    now = time.monotonic()
+    if not force and now - _last_report < PROFILE_SUMMARY_INTERVAL:
+        return
+    _last_report = now
+
+    rows = summary(by_symbol=False)
+    if rows:
+        # Logger set up on first report, so importing span() has no side effects
+        setup_logger().info("⏱️ Latency ms p50/p95/p99 | " + " | ".join(
+            f"{r['stage']} {r['p50_ms']:.2f}/{r['p95_ms']:.2f}/{r['p99_ms']:.2f}" for r in rows))
+
+    if PROFILE_METRICS_FILE:
+        metrics = {
+            "generated": datetime.now().isoformat(timespec="seconds"),
+            "stages": rows,
+            "symbols": summary(by_symbol=True),
+        }
+        tmp = PROFILE_METRICS_FILE + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(metrics, f, indent=1)
+        os.replace(tmp, PROFILE_METRICS_FILE)
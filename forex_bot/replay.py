@@ -0,0 +1,206 @@
+"""
+Session Replay — runs the live bot loop on recorded data with a simulated clock.
+
+The exact live code path (main.run_tick → check_daily_limit, scan_symbols,
+execute_entry, monitor_open_positions) runs against sim_broker. The
+BarCloseScheduler is driven by a simulated clock whose sleep() advances the
+broker clock instead of waiting, so days replay in seconds. Candles come
+from SIM_DATA_DIR / the candle cache, or from an event journal (--journal).
+
+Profiling spans are enabled for the run and a per-stage latency table
+(mean / p50 / p95 / p99 / max) is printed at the end, so the replay doubles
+as a performance harness.
+
+Usage:
+    python replay.py --days 30
+    python replay.py --start 2025-03-03 --end 2025-03-08 --monitor-interval 300
+    python replay.py --journal trident_journal.bin
+    python replay.py --days 5 --wake-delay 0.005    # wake-ups 5 ms after each bar close
+"""
+
+import sys
+import argparse
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+import numpy as np
+import pandas as pd
+import pytz
+
+import config
+
+# The replay always trades against the simulated broker; this must be set
+# before mt5_connector is imported
+config.BROKER_BACKEND = "sim"
+
+import journal
+import main as bot
+import mt5_connector as mt5c
+import profiler
+import sim_broker as sb
+from pnl_ledger import PnLLedger
+from scheduler import BarCloseScheduler, MONITOR_INTERVAL
+from time_filter import NY_TZ
+from logger import setup_logger, shutdown_trade_log
+
+log = setup_logger("Replay")
+
+
+class SimClock:
+    """
+    NY clock over sim_broker's clock; sleep() moves simulated time forward.
+    wake_delay (seconds) is added to every sleep, like a live wake-up that
+    runs a little after the bar close.
+    """
+
+    def __init__(self, start: datetime, wake_delay: float = 0.0):
+        self._now = float(pytz.utc.localize(start).timestamp())
+        self.wake_delay = wake_delay
+        sb.set_time(int(self._now))
+
+    def now(self) -> datetime:
+        return datetime.fromtimestamp(self._now, NY_TZ)
+
+    def sleep(self, seconds: float):
+        self._now += max(int(np.ceil(seconds)), 1) + self.wake_delay
+        sb.set_time(int(self._now))
+
+
+def load_journal_data(path: str, symbols: List[str]):
+    """Feed the candles recorded in an event journal to the simulated broker."""
+    entry_tf = mt5c.get_timeframe_constant(config.ENTRY_TIMEFRAME)
+    bias_tf = mt5c.get_timeframe_constant(config.BIAS_TIMEFRAME)
+    with journal.JournalReader(path) as reader:
+        for symbol in symbols:
+            df = reader.bars(symbol, config.ENTRY_TIMEFRAME)
+            if df.empty:
+                continue
+            sb.load_rates(symbol, entry_tf, df)
+            # Daily candles are rebuilt from the recorded entry-timeframe bars
+            daily = (df.resample("1D", on="time")
+                       .agg({"open": "first", "high": "max", "low": "min",
+                             "close": "last", "volume": "sum"})
+                       .dropna().reset_index())
+            sb.load_rates(symbol, bias_tf, daily)
+
+
+def data_span(symbols: List[str]):
+    """(first, last) bar time of the entry timeframe across symbols (naive UTC)."""
+    tf = mt5c.get_timeframe_constant(config.ENTRY_TIMEFRAME)
+    bounds = [sb.copy_rates_from_pos(symbol, tf, 0, 10 ** 9) for symbol in symbols]
+    times = [r["time"] for r in bounds if r is not None and len(r)]
+    if not times:
+        return None, None
+    first = min(int(t[0]) for t in times)
+    last = max(int(t[-1]) for t in times)
+    return (datetime.fromtimestamp(first, timezone.utc).replace(tzinfo=None),
+            datetime.fromtimestamp(last, timezone.utc).replace(tzinfo=None))
+
+
+def replay(start: datetime, end: datetime,
+           monitor_interval: float = MONITOR_INTERVAL, wake_delay: float = 0.0) -> dict:
+    """
+    Run the bot loop from start to end (naive UTC) on the simulated broker.
+    Returns a summary with the stage-latency table.
+    """
+    profiler.enable(max_samples=None)
+    profiler.reset()
+
+    clock = SimClock(start, wake_delay)
+    bot.set_clock(clock.now)
+    scheduler = BarCloseScheduler([config.ENTRY_TIMEFRAME], monitor_interval,
+                                  clock=clock.now, sleep=clock.sleep)
+
+    end_ny = pytz.utc.localize(end).astimezone(NY_TZ)
+    balance_start = sb.account_info().balance
+    wall_start = time.perf_counter()
+    ticks = 0
+    while scheduler.next_due() <= end_ny:
+        bot.run_tick(scheduler.wait())
+        ticks += 1
+    wall = time.perf_counter() - wall_start
+
+    deals = sb.history_deals_get(datetime(1970, 1, 1), datetime(2100, 1, 1))
+    return {
+        "ticks": ticks,
+        "simulated_days": (end - start).total_seconds() / 86400,
+        "wall_seconds": wall,
+        "orders": sum(d.entry == sb.DEAL_ENTRY_IN for d in deals),
+        "closes": sum(d.entry == sb.DEAL_ENTRY_OUT for d in deals),
+        "open_positions": len(sb.positions_get()),
+        "pnl": sb.account_info().balance - balance_start,
+        "stages": pd.DataFrame(profiler.summary(by_symbol=False)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay the Trident bot loop on recorded data")
+    parser.add_argument("--symbol", type=str, default=None,
+                        help="Single symbol to replay (default: all configured)")
+    parser.add_argument("--start", type=str, default=None, help="Start date (UTC), e.g. 2025-03-03")
+    parser.add_argument("--end", type=str, default=None, help="End date (UTC; default: end of data)")
+    parser.add_argument("--days", type=int, default=30,
+                        help="Days to replay when --start is not given (default: 30)")
+    parser.add_argument("--journal", type=str, default=None,
+                        help="Replay the candles recorded in this event journal")
+    parser.add_argument("--monitor-interval", type=float, default=MONITOR_INTERVAL,
+                        help=f"Seconds between position checks (default: {MONITOR_INTERVAL})")
+    parser.add_argument("--wake-delay", type=float, default=0.0,
+                        help="Seconds each wake-up runs late, e.g. 0.005 (default: 0)")
+    parser.add_argument("--concurrency", type=int, default=1,
+                        help="Symbols analyzed concurrently (default: 1, fully deterministic)")
+    parser.add_argument("--trade-log", type=str, default="replay_trades.csv",
+                        help="CSV trade log for replayed orders")
+    parser.add_argument("--record", type=str, default=None,
+                        help="Write an event journal of the replay to this file")
+    args = parser.parse_args()
+
+    # Fix Windows console encoding
+    sys.stdout.reconfigure(encoding='utf-8', errors='replace')
+    sys.stderr.reconfigure(encoding='utf-8', errors='replace')
+
+    # Keep replay output apart from the live bot's files
+    config.LOG_TRADES_CSV = args.trade_log
+    journal.JOURNAL_FILE = args.record
+    bot._pnl_ledger = PnLLedger(path=None)
+    bot.SCAN_CONCURRENCY = args.concurrency
+    bot.BAR_DETECT_TIMEOUT = 0  # Simulated bars are available at their close
+
+    symbols = [args.symbol] if args.symbol else config.SYMBOLS
+    config.SYMBOLS = symbols
+    if args.journal:
+        load_journal_data(args.journal, symbols)
+
+    first, last = data_span(symbols)
+    if last is None:
+        log.error("No candle data to replay (fill the candle cache or SIM_DATA_DIR).")
+        sys.exit(1)
+    end = pd.Timestamp(args.end).to_pydatetime() if args.end else last
+    start = pd.Timestamp(args.start).to_pydatetime() if args.start else end - timedelta(days=args.days)
+    start = max(start, first)
+
+    mt5c.connect()
+    try:
+        log.info(f"Replaying {', '.join(symbols)} from {start} to {end} UTC")
+        summary = replay(start, end, monitor_interval=args.monitor_interval,
+                         wake_delay=args.wake_delay)
+    finally:
+        shutdown_trade_log()
+        journal.shutdown_journal()
+
+    print("\n" + "=" * 60)
+    print("  TG Capital Playbook -- Session Replay")
+    print("=" * 60)
+    print(f"  Simulated : {summary['simulated_days']:.1f} days in {summary['wall_seconds']:.2f}s "
+          f"({summary['ticks']} ticks)")
+    print(f"  Orders    : {summary['orders']} opened | {summary['closes']} closed | "
+          f"{summary['open_positions']} still open")
+    print(f"  PnL       : {summary['pnl']:+.2f}")
+    print("\n  Stage latency:")
+    if not summary["stages"].empty:
+        print(summary["stages"].to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+
+
+if __name__ == "__main__":
+    main()
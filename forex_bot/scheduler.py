@@ -0,0 +1,147 @@
+"""
+Bar-Close Scheduler — wakes the bot when bars close instead of polling.
+
+Bar boundaries are computed in New York time. The forex day rolls over at
+D1_CLOSE_HOUR_NY (17:00 NY by default), daily bars close there and
+intraday bars are aligned to it (for M30 / H1 that is simply the clock).
+The market is treated as closed from Friday's roll-over until Sunday's and
+on MARKET_HOLIDAYS, and no bar closes are scheduled while it is closed.
+"""
+
+import time as _time
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+import config
+from time_filter import NY_TZ, get_ny_now
+
+TIMEFRAME_SECONDS = {
+    "TIMEFRAME_M1": 60,
+    "TIMEFRAME_M5": 300,
+    "TIMEFRAME_M15": 900,
+    "TIMEFRAME_M30": 1800,
+    "TIMEFRAME_H1": 3600,
+    "TIMEFRAME_H4": 14400,
+    "TIMEFRAME_D1": 86400,
+}
+
+D1_CLOSE_HOUR_NY = getattr(config, "D1_CLOSE_HOUR_NY", 17)
+MARKET_HOLIDAYS = set(getattr(config, "MARKET_HOLIDAYS", []))  # "YYYY-MM-DD" (NY dates)
+MONITOR_INTERVAL = getattr(config, "MONITOR_INTERVAL", 30)     # Seconds between position checks
+
+MONITOR = "monitor"
+
+
+def _at_hour(day: date, hour: int) -> datetime:
+    """NY wall-clock time hour:00 on day (DST-correct)."""
+    return NY_TZ.localize(datetime(day.year, day.month, day.day, hour))
+
+
+def _session_anchor(ny_dt: datetime) -> datetime:
+    """Most recent daily roll-over (D1_CLOSE_HOUR_NY) at or before ny_dt."""
+    anchor = _at_hour(ny_dt.date(), D1_CLOSE_HOUR_NY)
+    if anchor > ny_dt:
+        anchor = _at_hour(ny_dt.date() - timedelta(days=1), D1_CLOSE_HOUR_NY)
+    return anchor
+
+
+def _next_rollover(ny_dt: datetime) -> datetime:
+    """First daily roll-over strictly after ny_dt."""
+    return _at_hour(_session_anchor(ny_dt).date() + timedelta(days=1), D1_CLOSE_HOUR_NY)
+
+
+def is_market_open(ny_dt: datetime) -> bool:
+    """Forex hours: Sunday roll-over to Friday roll-over, excluding holidays."""
+    if ny_dt.strftime("%Y-%m-%d") in MARKET_HOLIDAYS:
+        return False
+    weekday = ny_dt.weekday()
+    if weekday == 5:                                   # Saturday
+        return False
+    if weekday == 4 and ny_dt.hour >= D1_CLOSE_HOUR_NY:  # Friday after close
+        return False
+    if weekday == 6 and ny_dt.hour < D1_CLOSE_HOUR_NY:   # Sunday before open
+        return False
+    return True
+
+
+def next_market_open(ny_dt: datetime) -> datetime:
+    """First moment at or after ny_dt when the market is open."""
+    cursor = ny_dt
+    while not is_market_open(cursor):
+        # Jump to the next roll-over or midnight, whichever comes first
+        midnight = _at_hour(cursor.date() + timedelta(days=1), 0)
+        cursor = min(_next_rollover(cursor), midnight)
+    return cursor
+
+
+def next_bar_close(ny_now: datetime, timeframe_name: str) -> datetime:
+    """
+    Next close time (NY, tz-aware) of a bar on timeframe_name strictly after
+    ny_now, skipping weekends and holidays.
+    """
+    seconds = TIMEFRAME_SECONDS[timeframe_name]
+    cursor = ny_now
+    while True:
+        if seconds >= 86400:
+            close = _next_rollover(cursor)
+        else:
+            anchor = _session_anchor(cursor)
+            elapsed = (cursor - anchor).total_seconds()
+            close = NY_TZ.normalize(
+                anchor + timedelta(seconds=(int(elapsed // seconds) + 1) * seconds))
+
+        # A bar only closes if the market was open while it was forming
+        if is_market_open(close - timedelta(seconds=1)):
+            return close
+        cursor = next_market_open(close)
+
+
+class BarCloseScheduler:
+    """
+    Sleeps until the next bar close of any watched timeframe or the next
+    position-monitor check, then reports which events are due.
+
+    clock and sleep are injectable so replays can drive the scheduler with a
+    simulated clock.
+    """
+
+    def __init__(self, timeframes: Optional[List[str]] = None,
+                 monitor_interval: float = MONITOR_INTERVAL,
+                 clock: Callable[[], datetime] = get_ny_now,
+                 sleep: Callable[[float], None] = _time.sleep):
+        if timeframes is None:
+            timeframes = [config.ENTRY_TIMEFRAME]
+        self.timeframes = list(timeframes)
+        self.monitor_interval = monitor_interval
+        self.clock = clock
+        self.sleep = sleep
+
+        now = clock()
+        self._next: Dict[str, datetime] = {tf: next_bar_close(now, tf) for tf in self.timeframes}
+        self._next[MONITOR] = now
+
+    def next_due(self) -> datetime:
+        """Time of the earliest pending event."""
+        return min(self._next.values())
+
+    def wait(self) -> Dict[str, datetime]:
+        """
+        Block until at least one event is due and return the due events
+        (timeframe names whose bar just closed and/or MONITOR), each mapped
+        to its scheduled time. The wake-up itself may come a little later.
+        """
+        while True:
+            now = self.clock()
+            due = {event for event, when in self._next.items() if when <= now}
+            if due:
+                break
+            self.sleep(max((self.next_due() - now).total_seconds(), 0.0))
+
+        due = {event: self._next[event] for event in due}
+        for event in due:
+            if event == MONITOR:
+                next_check = now + timedelta(seconds=self.monitor_interval)
+                self._next[MONITOR] = next_market_open(next_check)
+            else:
+                self._next[event] = next_bar_close(now, event)
+        return due
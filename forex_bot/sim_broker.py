@@ -0,0 +1,483 @@
+"""
+Simulated Broker — a file-backed stand-in for the MetaTrader5 package.
+
+Implements the subset of the MetaTrader5 API that mt5_connector uses
+(initialize, copy_rates_*, symbol_info*, order_send, positions_get,
+history_deals_get, ...) so the bot and the backtest run on machines without
+a terminal. Select it with BROKER_BACKEND = "sim" in config.
+
+Candles are read from SIM_DATA_DIR as <SYMBOL>_<TIMEFRAME>.csv or .parquet
+(e.g. EURUSD_TIMEFRAME_M30.csv), falling back to the candle_store cache.
+A simulated clock decides which bars exist: bars opened after the clock are
+hidden and the bar containing the clock is reported as just opened
+(OHLC = open), so nothing leaks from the future. Ticks, fills, positions,
+stop losses and deal history are all simulated from the finest timeframe
+available for the symbol.
+
+Profit is converted to SIM_CURRENCY through the quote currency: cross
+pairs (EURGBP, GBPJPY, ...) need prices for the quote/account pair (GBPUSD,
+USDJPY) too, and orders on a symbol without one are rejected.
+"""
+
+import os
+import threading
+from collections import namedtuple
+from datetime import datetime
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+import config
+from candle_store import RATE_DTYPE, read_rates
+
+SIM_DATA_DIR = getattr(config, "SIM_DATA_DIR", "sim_data")
+SIM_BALANCE = getattr(config, "SIM_BALANCE", 10000.0)
+SIM_CURRENCY = getattr(config, "SIM_CURRENCY", "USD")
+SIM_LEVERAGE = getattr(config, "SIM_LEVERAGE", 100)
+
+# ─── MetaTrader5 constants (same values as the real package) ──────────────────
+TIMEFRAME_M1 = 1
+TIMEFRAME_M5 = 5
+TIMEFRAME_M15 = 15
+TIMEFRAME_M30 = 30
+TIMEFRAME_H1 = 16385
+TIMEFRAME_H4 = 16388
+TIMEFRAME_D1 = 16408
+TIMEFRAME_W1 = 32769
+
+ORDER_TYPE_BUY = 0
+ORDER_TYPE_SELL = 1
+TRADE_ACTION_DEAL = 1
+ORDER_TIME_GTC = 0
+ORDER_FILLING_FOK = 0
+ORDER_FILLING_IOC = 1
+ORDER_FILLING_RETURN = 2
+
+DEAL_TYPE_BUY = 0
+DEAL_TYPE_SELL = 1
+DEAL_ENTRY_IN = 0
+DEAL_ENTRY_OUT = 1
+
+TRADE_RETCODE_REQUOTE = 10004
+TRADE_RETCODE_DONE = 10009
+TRADE_RETCODE_INVALID = 10013
+TRADE_RETCODE_MARKET_CLOSED = 10018
+TRADE_RETCODE_PRICE_CHANGED = 10020
+TRADE_RETCODE_PRICE_OFF = 10021
+TRADE_RETCODE_POSITION_CLOSED = 10036
+
+# Timeframe constant → (config name, bar length in seconds)
+_TIMEFRAMES = {
+    TIMEFRAME_M1: ("TIMEFRAME_M1", 60),
+    TIMEFRAME_M5: ("TIMEFRAME_M5", 300),
+    TIMEFRAME_M15: ("TIMEFRAME_M15", 900),
+    TIMEFRAME_M30: ("TIMEFRAME_M30", 1800),
+    TIMEFRAME_H1: ("TIMEFRAME_H1", 3600),
+    TIMEFRAME_H4: ("TIMEFRAME_H4", 14400),
+    TIMEFRAME_D1: ("TIMEFRAME_D1", 86400),
+    TIMEFRAME_W1: ("TIMEFRAME_W1", 604800),
+}
+
+# ─── Record types (field names match the MetaTrader5 objects) ─────────────────
+AccountInfo = namedtuple("AccountInfo", [
+    "login", "server", "balance", "equity", "margin", "margin_free",
+    "currency", "leverage",
+])
+SymbolInfo = namedtuple("SymbolInfo", [
+    "name", "visible", "point", "digits", "spread", "trade_contract_size",
+    "volume_min", "volume_max", "volume_step", "filling_mode",
+])
+Tick = namedtuple("Tick", ["time", "bid", "ask", "last"])
+TradePosition = namedtuple("TradePosition", [
+    "ticket", "time", "type", "magic", "volume", "price_open", "sl", "tp",
+    "price_current", "profit", "symbol", "comment",
+])
+TradeDeal = namedtuple("TradeDeal", [
+    "ticket", "order", "time", "type", "entry", "magic", "position_id",
+    "volume", "price", "profit", "symbol", "comment",
+])
+OrderSendResult = namedtuple("OrderSendResult", [
+    "retcode", "deal", "order", "volume", "price", "bid", "ask", "comment",
+    "request",
+])
+
+
+class _SimState:
+    """Mutable state of the simulated terminal."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.now: Optional[int] = None            # Clock (epoch seconds); None = end of data
+        self.balance = float(SIM_BALANCE)
+        self.rates: Dict[tuple, np.ndarray] = {}  # (symbol, tf) -> rate records
+        self.positions: Dict[int, dict] = {}
+        self.deals = []
+        self.next_ticket = 1
+        self.last_error = (1, "Success")
+
+
+_state = _SimState()
+_order_lock = threading.Lock()  # order_send may be called from several threads
+
+
+# ─── Data loading ──────────────────────────────────────────────────────────────
+def _frame_to_rates(df: pd.DataFrame) -> np.ndarray:
+    """Convert a CSV/Parquet candle frame to rate records."""
+    df = df.rename(columns={"volume": "tick_volume"})
+    rates = np.zeros(len(df), dtype=RATE_DTYPE)
+    times = df["time"]
+    if pd.api.types.is_numeric_dtype(times):
+        rates["time"] = times.to_numpy(dtype=np.int64)
+    else:
+        rates["time"] = pd.to_datetime(times).to_numpy("datetime64[s]").astype(np.int64)
+    for name in RATE_DTYPE.names[1:]:
+        if name in df.columns:
+            rates[name] = df[name].to_numpy()
+    return np.sort(rates, order="time")
+
+
+def _load_rates(symbol: str, timeframe: int) -> np.ndarray:
+    key = (symbol, timeframe)
+    if key in _state.rates:
+        return _state.rates[key]
+
+    tf_name = _TIMEFRAMES[timeframe][0]
+    base = os.path.join(SIM_DATA_DIR, f"{symbol}_{tf_name}")
+    if os.path.exists(base + ".parquet"):
+        rates = _frame_to_rates(pd.read_parquet(base + ".parquet"))
+    elif os.path.exists(base + ".csv"):
+        rates = _frame_to_rates(pd.read_csv(base + ".csv"))
+    else:
+        rates = np.asarray(read_rates(symbol, tf_name))
+
+    _state.rates[key] = rates
+    return rates
+
+
+def load_rates(symbol: str, timeframe: int, rates):
+    """Inject candle data (rate records or a candle DataFrame) directly (replay harnesses, tests)."""
+    if isinstance(rates, pd.DataFrame):
+        rates = _frame_to_rates(rates)
+    _state.rates[(symbol, timeframe)] = np.asarray(rates).astype(RATE_DTYPE)
+
+
+def _visible_rates(symbol: str, timeframe: int) -> np.ndarray:
+    """Bars that exist at the simulated clock, with the current bar just opened."""
+    rates = _load_rates(symbol, timeframe)
+    if _state.now is None or len(rates) == 0:
+        return rates
+
+    end = int(np.searchsorted(rates["time"], _state.now, side="right"))
+    visible = rates[:end]
+    if end and _state.now < visible["time"][-1] + _TIMEFRAMES[timeframe][1]:
+        visible = visible.copy()
+        forming = visible[-1:]
+        for name in ("high", "low", "close"):
+            forming[name] = forming["open"]
+        forming["tick_volume"] = 1
+    return visible
+
+
+def _price_rates(symbol: str) -> Optional[np.ndarray]:
+    """Finest-timeframe data available for a symbol (drives ticks and fills)."""
+    timeframe = _price_timeframe(symbol)
+    return None if timeframe is None else _load_rates(symbol, timeframe)
+
+
+def _price_timeframe(symbol: str) -> Optional[int]:
+    for timeframe in sorted(_TIMEFRAMES, key=lambda tf: _TIMEFRAMES[tf][1]):
+        if len(_load_rates(symbol, timeframe)):
+            return timeframe
+    return None
+
+
+def _symbol_spec(symbol: str) -> SymbolInfo:
+    name = symbol.upper()
+    if "JPY" in name:
+        point, digits, contract = 0.001, 3, 100000.0
+    elif "XAU" in name or "GOLD" in name:
+        point, digits, contract = 0.01, 2, 100.0
+    else:
+        point, digits, contract = 0.00001, 5, 100000.0
+    return SymbolInfo(
+        name=symbol, visible=True, point=point, digits=digits, spread=0,
+        trade_contract_size=contract, volume_min=0.01, volume_max=100.0,
+        volume_step=0.01, filling_mode=3,  # FOK | IOC
+    )
+
+
+# ─── Clock ─────────────────────────────────────────────────────────────────────
+def set_time(dt):
+    """
+    Advance the simulated clock to dt (datetime or epoch seconds).
+    Stop losses / take profits touched by bars in between are filled.
+    """
+    now = int(pd.Timestamp(dt).timestamp()) if not isinstance(dt, (int, np.integer)) else int(dt)
+    previous = _state.now
+    _state.now = now
+    if previous is not None:
+        _process_stops(previous, now)
+
+
+def get_time() -> Optional[datetime]:
+    """Current simulated time (None when the clock is at the end of the data)."""
+    return None if _state.now is None else pd.Timestamp(_state.now, unit="s").to_pydatetime()
+
+
+def reset():
+    """Clear clock, balances, positions, deals and loaded data."""
+    _state.reset()
+
+
+def _process_stops(start: int, end: int):
+    """Fill SL/TP for bars that closed between two clock readings."""
+    for ticket, pos in list(_state.positions.items()):
+        timeframe = _price_timeframe(pos["symbol"])
+        if timeframe is None:
+            continue
+        rates = _load_rates(pos["symbol"], timeframe)
+        bar_seconds = _TIMEFRAMES[timeframe][1]
+        # Bars whose close time falls in (start, end]
+        lo = int(np.searchsorted(rates["time"], start - bar_seconds, side="right"))
+        hi = int(np.searchsorted(rates["time"], end - bar_seconds, side="right"))
+        for bar in rates[lo:hi]:
+            fill = None
+            if pos["type"] == ORDER_TYPE_BUY:
+                if pos["sl"] and bar["low"] <= pos["sl"]:
+                    fill = pos["sl"]
+                elif pos["tp"] and bar["high"] >= pos["tp"]:
+                    fill = pos["tp"]
+            else:
+                if pos["sl"] and bar["high"] >= pos["sl"]:
+                    fill = pos["sl"]
+                elif pos["tp"] and bar["low"] <= pos["tp"]:
+                    fill = pos["tp"]
+            if fill is not None:
+                _close(ticket, float(fill), int(bar["time"]), "sl/tp")
+                break
+
+
+# ─── Pricing ───────────────────────────────────────────────────────────────────
+def _current_price(symbol: str) -> Optional[tuple]:
+    """(time, price) of the latest known price at the simulated clock."""
+    rates = _price_rates(symbol)
+    if rates is None:
+        return None
+    if _state.now is None:
+        return int(rates["time"][-1]), float(rates["close"][-1])
+
+    idx = int(np.searchsorted(rates["time"], _state.now, side="right")) - 1
+    if idx < 0:
+        return None
+    # The bar containing the clock has only just opened
+    return _state.now, float(rates["open"][idx])
+
+
+def _currencies(symbol: str) -> tuple:
+    """(base, quote) of a currency pair; metals without one are quoted in SIM_CURRENCY."""
+    name = symbol.upper()
+    if len(name) >= 6 and name[:6].isalpha() and not ("XAU" in name or "GOLD" in name):
+        return name[:3], name[3:6]
+    return None, SIM_CURRENCY
+
+
+def _quote_rate(symbol: str, price: float) -> Optional[float]:
+    """
+    Account-currency value of one unit of symbol's quote currency: 1 when
+    quoted in SIM_CURRENCY, 1 / price when SIM_CURRENCY is the base, else
+    the current price of the quote/account pair (e.g. GBPUSD for EURGBP,
+    USDJPY for GBPJPY; the symbol's suffix is tried first). None if no such
+    pair has prices.
+    """
+    base, quote = _currencies(symbol)
+    if quote == SIM_CURRENCY:
+        return 1.0
+    if base == SIM_CURRENCY:
+        return 1.0 / price if price else None
+    suffix = symbol[6:]
+    for pair, invert in ((quote + SIM_CURRENCY, False), (SIM_CURRENCY + quote, True)):
+        for name in dict.fromkeys((pair + suffix, pair)):
+            current = _current_price(name)
+            if current is not None and current[1]:
+                return 1.0 / current[1] if invert else current[1]
+    return None
+
+
+def _profit(pos: dict, price: float) -> float:
+    spec = _symbol_spec(pos["symbol"])
+    diff = price - pos["price_open"] if pos["type"] == ORDER_TYPE_BUY else pos["price_open"] - price
+    profit = diff * pos["volume"] * spec.trade_contract_size  # In the quote currency
+    rate = _quote_rate(pos["symbol"], price)
+    if rate is None:
+        rate = pos["quote_rate"]  # Conversion pair has no price now — last rate at entry
+    return round(profit * rate, 2)
+
+
+def _position_view(pos: dict) -> TradePosition:
+    tick = symbol_info_tick(pos["symbol"])
+    price = pos["price_open"]
+    if tick is not None:
+        price = tick.bid if pos["type"] == ORDER_TYPE_BUY else tick.ask
+    return TradePosition(
+        ticket=pos["ticket"], time=pos["time"], type=pos["type"],
+        magic=pos["magic"], volume=pos["volume"], price_open=pos["price_open"],
+        sl=pos["sl"], tp=pos["tp"], price_current=price,
+        profit=_profit(pos, price), symbol=pos["symbol"], comment=pos["comment"],
+    )
+
+
+def _add_deal(pos: dict, deal_type: int, entry: int, price: float,
+              profit: float, time_: int, comment: str) -> int:
+    ticket = _state.next_ticket
+    _state.next_ticket += 1
+    _state.deals.append(TradeDeal(
+        ticket=ticket, order=ticket, time=time_, type=deal_type, entry=entry,
+        magic=pos["magic"], position_id=pos["ticket"], volume=pos["volume"],
+        price=price, profit=profit, symbol=pos["symbol"], comment=comment,
+    ))
+    return ticket
+
+
+def _close(ticket: int, price: float, time_: int, comment: str) -> int:
+    pos = _state.positions.pop(ticket)
+    profit = _profit(pos, price)
+    _state.balance += profit
+    deal_type = DEAL_TYPE_SELL if pos["type"] == ORDER_TYPE_BUY else DEAL_TYPE_BUY
+    return _add_deal(pos, deal_type, DEAL_ENTRY_OUT, price, profit, time_, comment)
+
+
+# ─── MetaTrader5 API ───────────────────────────────────────────────────────────
+def initialize(*args, **kwargs) -> bool:
+    return True
+
+
+def shutdown():
+    return None
+
+
+def last_error():
+    return _state.last_error
+
+
+def account_info() -> AccountInfo:
+    floating = sum(_position_view(p).profit for p in _state.positions.values())
+    return AccountInfo(
+        login=0, server="SimBroker", balance=round(_state.balance, 2),
+        equity=round(_state.balance + floating, 2), margin=0.0,
+        margin_free=round(_state.balance + floating, 2),
+        currency=SIM_CURRENCY, leverage=SIM_LEVERAGE,
+    )
+
+
+def symbol_info(symbol: str) -> Optional[SymbolInfo]:
+    if _price_rates(symbol) is None:
+        return None
+    return _symbol_spec(symbol)
+
+
+def symbol_select(symbol: str, enable: bool = True) -> bool:
+    return symbol_info(symbol) is not None
+
+
+def symbol_info_tick(symbol: str) -> Optional[Tick]:
+    quote = _current_price(symbol)
+    if quote is None:
+        return None
+    time_, price = quote
+    rates = _price_rates(symbol)
+    spec = _symbol_spec(symbol)
+    bid = round(price, spec.digits)
+    idx = max(int(np.searchsorted(rates["time"], time_, side="right")) - 1, 0)
+    ask = round(bid + int(rates["spread"][idx]) * spec.point, spec.digits)
+    return Tick(time=time_, bid=bid, ask=ask, last=bid)
+
+
+def copy_rates_from_pos(symbol: str, timeframe: int, start_pos: int, count: int):
+    rates = _visible_rates(symbol, timeframe)
+    end = len(rates) - start_pos
+    if end <= 0:
+        return None
+    return rates[max(end - count, 0):end]
+
+
+def copy_rates_range(symbol: str, timeframe: int, date_from, date_to):
+    rates = _visible_rates(symbol, timeframe)
+    start = int(pd.Timestamp(date_from).timestamp())
+    end = int(pd.Timestamp(date_to).timestamp())
+    times = rates["time"]
+    return rates[np.searchsorted(times, start, side="left"):
+                 np.searchsorted(times, end, side="right")]
+
+
+def positions_get(symbol: Optional[str] = None, ticket: Optional[int] = None):
+    positions = [
+        _position_view(p) for p in _state.positions.values()
+        if (symbol is None or p["symbol"] == symbol)
+        and (ticket is None or p["ticket"] == ticket)
+    ]
+    return tuple(positions)
+
+
+def history_deals_get(date_from, date_to):
+    start = int(pd.Timestamp(date_from).timestamp())
+    end = int(pd.Timestamp(date_to).timestamp())
+    return tuple(d for d in _state.deals if start <= d.time <= end)
+
+
+def order_send(request: dict) -> OrderSendResult:
+    """Fill a market order (open or close) at the simulated tick price."""
+    with _order_lock:
+        return _order_send(request)
+
+
+def _order_send(request: dict) -> OrderSendResult:
+    symbol = request["symbol"]
+    tick = symbol_info_tick(symbol)
+
+    def reply(retcode, deal=0, order=0, price=0.0, comment=""):
+        return OrderSendResult(
+            retcode=retcode, deal=deal, order=order, volume=request.get("volume", 0.0),
+            price=price, bid=tick.bid if tick else 0.0, ask=tick.ask if tick else 0.0,
+            comment=comment, request=request,
+        )
+
+    if request.get("action") != TRADE_ACTION_DEAL:
+        _state.last_error = (-2, "Unsupported trade action")
+        return reply(TRADE_RETCODE_INVALID, comment="Unsupported action")
+    if tick is None:
+        _state.last_error = (-1, f"No price for {symbol}")
+        return reply(TRADE_RETCODE_PRICE_OFF, comment="No prices")
+
+    order_type = request["type"]
+    price = tick.ask if order_type == ORDER_TYPE_BUY else tick.bid
+    quote_rate = _quote_rate(symbol, price)
+
+    if request.get("position"):
+        ticket = request["position"]
+        if ticket not in _state.positions:
+            return reply(TRADE_RETCODE_POSITION_CLOSED, comment="Position not found")
+        deal = _close(ticket, price, tick.time, request.get("comment", ""))
+        return reply(TRADE_RETCODE_DONE, deal=deal, order=deal, price=price, comment="Request executed")
+
+    if quote_rate is None:
+        _, quote = _currencies(symbol)
+        _state.last_error = (-2, f"No {quote}{SIM_CURRENCY} / {SIM_CURRENCY}{quote} prices "
+                                 f"to convert {symbol} profit")
+        return reply(TRADE_RETCODE_INVALID, comment="No conversion rate")
+
+    ticket = _state.next_ticket
+    _state.next_ticket += 1
+    pos = {
+        "ticket": ticket, "time": tick.time, "type": order_type,
+        "magic": request.get("magic", 0), "volume": request["volume"],
+        "price_open": price, "sl": request.get("sl", 0.0),
+        "tp": request.get("tp", 0.0), "symbol": symbol,
+        "comment": request.get("comment", ""), "quote_rate": quote_rate,
+    }
+    _state.positions[ticket] = pos
+    deal_type = DEAL_TYPE_BUY if order_type == ORDER_TYPE_BUY else DEAL_TYPE_SELL
+    deal = _add_deal(pos, deal_type, DEAL_ENTRY_IN, price, 0.0, tick.time, pos["comment"])
+    return reply(TRADE_RETCODE_DONE, deal=deal, order=ticket, price=price, comment="Request executed")
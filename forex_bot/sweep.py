@@ -0,0 +1,274 @@
+"""
+Parameter Sweep — grid optimization of the Trident Pattern strategy.
+
+Evaluates every combination of strategy parameters on cached candle history
+and writes a ranked results table. Everything that does not depend on a
+parameter is computed once per symbol (FVGs, NY-time of every candle, EMAs
+per period, daily EMA-unstack events per fast-EMA set, time-window masks),
+so each combination only re-runs the cheap per-FVG checks and the exits of
+its own signals.
+
+Usage:
+    python sweep.py --doji 0.2,0.3,0.4 --ema-fast 5-9-13-21,8-13-21-34
+    python sweep.py --kill-zone 03:00-06:30,02:30-06:00 --gold-pct 0.003,0.005 --workers 8
+"""
+
+import sys
+import argparse
+import itertools
+from dataclasses import dataclass, replace
+from datetime import time, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+import config
+from backtest import (BacktestResult, TradeArrays, build_exit_context,
+                      get_pip_value, load_history, simulate_trades,
+                      summarize_result, _daily_unstack_events)
+from fvg_detector import detect_fvgs
+from indicators import calculate_emas
+from mtf_panel import MTFPanel
+from time_filter import (compute_session_masks, get_server_now, time_of_day_mask,
+                         KILL_ZONE_START, KILL_ZONE_END,
+                         FVG_WINDOW_START, FVG_WINDOW_END)
+from trade_manager import GOLD_CLOSE_FILTER_PCT
+from trident_pattern import BUY, SELL, signal_rows
+from logger import setup_logger
+
+log = setup_logger("Sweep")
+
+
+@dataclass(frozen=True)
+class SweepParams:
+    """One point in the parameter grid."""
+    doji_ratio: float
+    ema_fast: Tuple[int, ...]
+    kill_zone: Tuple[time, time]
+    fvg_window: Tuple[time, time]
+    gold_close_pct: Optional[float]   # None = Gold exits on close beyond SL
+
+    def as_row(self) -> dict:
+        return {
+            "doji_ratio": self.doji_ratio,
+            "ema_fast": "-".join(str(p) for p in self.ema_fast),
+            "kill_zone": f"{self.kill_zone[0]:%H:%M}-{self.kill_zone[1]:%H:%M}",
+            "fvg_window": f"{self.fvg_window[0]:%H:%M}-{self.fvg_window[1]:%H:%M}",
+            "gold_close_pct": self.gold_close_pct,
+        }
+
+
+class SymbolFeatures:
+    """Parameter-independent arrays for one symbol, shared by every combination."""
+
+    def __init__(self, symbol: str, df_30m: pd.DataFrame, df_daily: pd.DataFrame):
+        self.symbol = symbol
+        self.pip_value = get_pip_value(symbol)
+        self.df_daily = df_daily
+        # 30M → daily alignment only; EMAs are computed per period below
+        self.panel = MTFPanel(symbol, df_30m, df_daily, entry_periods=[], bias_periods=[])
+
+        self.open = df_30m["open"].to_numpy(dtype=np.float64)
+        self.high = df_30m["high"].to_numpy(dtype=np.float64)
+        self.low = df_30m["low"].to_numpy(dtype=np.float64)
+        self.close = df_30m["close"].to_numpy(dtype=np.float64)
+        self.times = self.panel.entry_times
+        self.ns_of_day = compute_session_masks(df_30m["time"]).ns_of_day
+
+        # All gaps regardless of time window; windows are applied per combination
+        self.fvgs = detect_fvgs(df_30m, check_time=False)
+
+        self._close_series = df_30m[["close"]]
+        self._emas: Dict[int, np.ndarray] = {}
+        self._windows: Dict[Tuple[time, time], np.ndarray] = {}
+        self._exit_ctx = build_exit_context(df_30m, df_daily, daily_count=self.panel.bias_count)
+        self._exit_ctxs = {}
+
+    def ema(self, period: int) -> np.ndarray:
+        if period not in self._emas:
+            frame = calculate_emas(self._close_series.copy(), [period])
+            self._emas[period] = frame[f"ema_{period}"].to_numpy(dtype=np.float64)
+        return self._emas[period]
+
+    def window(self, bounds: Tuple[time, time]) -> np.ndarray:
+        if bounds not in self._windows:
+            self._windows[bounds] = time_of_day_mask(self.ns_of_day, *bounds)
+        return self._windows[bounds]
+
+    def exit_context(self, ema_fast: Tuple[int, ...]):
+        if ema_fast not in self._exit_ctxs:
+            ctx = self._exit_ctx
+            if ctx.daily_count is not None:
+                ctx = replace(
+                    ctx,
+                    unstack_long=_daily_unstack_events(self.df_daily, "long", list(ema_fast)),
+                    unstack_short=_daily_unstack_events(self.df_daily, "short", list(ema_fast)),
+                )
+            self._exit_ctxs[ema_fast] = ctx
+        return self._exit_ctxs[ema_fast]
+
+    def evaluate(self, params: SweepParams) -> BacktestResult:
+        """Backtest one parameter combination."""
+        result = BacktestResult(symbol=self.symbol)
+
+        # FVG window is checked on the impulse candle (candle2)
+        fvgs = self.fvgs.select(self.window(params.fvg_window)[self.fvgs.candle2_idx])
+        rows = signal_rows(
+            fvgs, self.open, self.high, self.low, self.close,
+            [self.ema(p) for p in params.ema_fast],
+            self.ema(config.EMA_TREND_PERIOD),
+            kill_zone=self.window(params.kill_zone),
+            doji_threshold=params.doji_ratio,
+        )
+
+        confirm_idx = fvgs.candle3_idx[rows] + 2
+        is_buy = fvgs.direction[rows] > 0
+        result.trades = simulate_trades(
+            TradeArrays.entries(
+                self.symbol, np.where(is_buy, BUY, SELL), self.times[confirm_idx],
+                self.close[confirm_idx],
+                np.where(is_buy, fvgs.fvg_candle_low[rows], fvgs.fvg_candle_high[rows]),
+            ),
+            confirm_idx, self.pip_value, self.exit_context(params.ema_fast),
+            gold_close_pct=params.gold_close_pct,
+        )
+        return summarize_result(result)
+
+
+def _evaluate_chunk(task) -> List[dict]:
+    """Worker entry point: build a symbol's features once, run a slice of the grid."""
+    symbol, date_from, date_to, combos = task
+    df_30m, df_daily = load_history(symbol, date_from, date_to, offline=True)
+    if df_30m.empty:
+        return []
+
+    features = SymbolFeatures(symbol, df_30m, df_daily)
+    rows = []
+    for combo_id, params in combos:
+        r = features.evaluate(params)
+        rows.append({
+            "combo": combo_id,
+            "symbol": symbol,
+            **params.as_row(),
+            "trades": r.total_trades,
+            "wins": r.wins,
+            "win_rate": r.win_rate,
+            "total_pnl_pips": r.total_pnl_pips,
+            "avg_rr": r.avg_rr,
+            "max_drawdown_pips": r.max_drawdown_pips,
+        })
+    return rows
+
+
+def build_grid(doji: List[float], ema_fast: List[Tuple[int, ...]],
+               kill_zones: List[Tuple[time, time]], fvg_windows: List[Tuple[time, time]],
+               gold_pcts: List[Optional[float]]) -> List[SweepParams]:
+    """Cartesian product of all parameter lists."""
+    return [SweepParams(*combo) for combo in
+            itertools.product(doji, ema_fast, kill_zones, fvg_windows, gold_pcts)]
+
+
+def run_sweep(symbols: List[str], grid: List[SweepParams], days: int,
+              workers: int = 1, rank_by: str = "total_pnl_pips") -> pd.DataFrame:
+    """
+    Evaluate the grid on every symbol and return results ranked by rank_by.
+    Candles come from the local cache (run backtest.py once to fill it).
+    """
+    date_to = get_server_now()  # Same clock as the candle times
+    date_from = date_to - timedelta(days=days)
+
+    indexed = list(enumerate(grid))
+    n_chunks = max(1, min(workers, len(grid)))
+    tasks = [(symbol, date_from, date_to, indexed[i::n_chunks])
+             for symbol in symbols for i in range(n_chunks)]
+    log.info(f"Sweeping {len(grid)} combinations x {len(symbols)} symbols "
+             f"on {workers} worker(s)")
+
+    if workers > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunks = list(pool.map(_evaluate_chunk, tasks))
+    else:
+        chunks = [_evaluate_chunk(task) for task in tasks]
+
+    table = pd.DataFrame([row for chunk in chunks for row in chunk])
+    if table.empty:
+        return table
+    # Ties are broken by symbol and grid position, independent of chunking
+    return table.sort_values([rank_by, "symbol", "combo"], ascending=[False, True, True],
+                             kind="stable").reset_index(drop=True)
+
+
+# ─── CLI parsing helpers ───────────────────────────────────────────────────────
+def _parse_floats(text: str) -> List[float]:
+    return [float(v) for v in text.split(",")]
+
+
+def _parse_periods(text: str) -> List[Tuple[int, ...]]:
+    return [tuple(int(p) for p in group.split("-")) for group in text.split(",")]
+
+
+def _parse_windows(text: str) -> List[Tuple[time, time]]:
+    windows = []
+    for group in text.split(","):
+        start, end = group.split("-")
+        windows.append((time.fromisoformat(start), time.fromisoformat(end)))
+    return windows
+
+
+def _parse_gold(text: str) -> List[Optional[float]]:
+    return [None if v.lower() == "sl" else float(v) for v in text.split(",")]
+
+
+def main():
+    def periods_text(periods):
+        return "-".join(str(p) for p in periods)
+
+    parser = argparse.ArgumentParser(description="Parameter sweep for the Trident Pattern Strategy")
+    parser.add_argument("--symbol", type=str, default=None,
+                        help="Single symbol to sweep (default: all configured)")
+    parser.add_argument("--days", type=int, default=config.BACKTEST_DAYS,
+                        help=f"Number of days of cached history (default: {config.BACKTEST_DAYS})")
+    parser.add_argument("--doji", type=_parse_floats, default=[config.DOJI_BODY_RATIO],
+                        help="Comma-separated DOJI_BODY_RATIO values")
+    parser.add_argument("--ema-fast", type=_parse_periods,
+                        default=[tuple(config.EMA_FAST_PERIODS)],
+                        help=f"Comma-separated fast EMA sets, e.g. {periods_text(config.EMA_FAST_PERIODS)}")
+    parser.add_argument("--kill-zone", type=_parse_windows,
+                        default=[(KILL_ZONE_START, KILL_ZONE_END)],
+                        help="Comma-separated NY kill zones, e.g. 03:00-06:30")
+    parser.add_argument("--fvg-window", type=_parse_windows,
+                        default=[(FVG_WINDOW_START, FVG_WINDOW_END)],
+                        help="Comma-separated NY FVG windows, e.g. 02:30-04:00")
+    parser.add_argument("--gold-pct", type=_parse_gold, default=[None],
+                        help=f"Comma-separated Gold close-filter fractions "
+                             f"(e.g. {GOLD_CLOSE_FILTER_PCT}); 'sl' = close beyond stop loss")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Worker processes (default: 1)")
+    parser.add_argument("--rank-by", type=str, default="total_pnl_pips",
+                        help="Result column to rank by (default: total_pnl_pips)")
+    parser.add_argument("--output", type=str, default="sweep_results.csv",
+                        help="CSV output filename")
+    args = parser.parse_args()
+
+    # Fix Windows console encoding
+    sys.stdout.reconfigure(encoding='utf-8', errors='replace')
+    sys.stderr.reconfigure(encoding='utf-8', errors='replace')
+
+    symbols = [args.symbol] if args.symbol else config.SYMBOLS
+    grid = build_grid(args.doji, args.ema_fast, args.kill_zone,
+                      args.fvg_window, args.gold_pct)
+
+    table = run_sweep(symbols, grid, args.days, workers=args.workers, rank_by=args.rank_by)
+    if table.empty:
+        log.info("No cached data — nothing to sweep.")
+        return
+
+    table.to_csv(args.output, index=False)
+    print(table.head(20).to_string(index=False))
+    log.info(f"Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
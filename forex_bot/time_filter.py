@@ -3,7 +3,13 @@ Time Filter — validates London Kill Zone and FVG formation windows.
 All times are converted to New York timezone.
 """
 
-from datetime import datetime, time
+import weakref
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta, timezone
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
 import pytz
 import config
 
@@ -39,6 +45,88 @@ def is_in_fvg_window(dt: datetime) -> bool:
     return FVG_WINDOW_START <= current_time <= FVG_WINDOW_END
 
 
+def _time_to_ns(t: time) -> int:
+    """Nanoseconds since midnight for a wall-clock time."""
+    seconds = t.hour * 3600 + t.minute * 60 + t.second
+    return seconds * 1_000_000_000 + t.microsecond * 1_000
+
+
+@dataclass
+class SessionMasks:
+    """Per-candle NY-time session flags for a whole time column."""
+    kill_zone: np.ndarray      # bool — inside the London Kill Zone
+    fvg_window: np.ndarray     # bool — inside the FVG formation window
+    minute_of_day: np.ndarray  # int16 — NY-local minutes since midnight
+    weekday: np.ndarray        # int8 — NY-local weekday (0=Mon, 6=Sun)
+    ns_of_day: np.ndarray      # int64 — NY-local nanoseconds since midnight
+
+
+def time_of_day_mask(ns_of_day: np.ndarray, start: time, end: time) -> np.ndarray:
+    """Boolean mask of NY-local times inside [start, end] (inclusive, like the scalar checks)."""
+    return (ns_of_day >= _time_to_ns(start)) & (ns_of_day <= _time_to_ns(end))
+
+
+def compute_session_masks(times) -> SessionMasks:
+    """
+    Convert a whole time column to New York time in one vectorized call and
+    derive the Kill Zone / FVG window flags for every candle.
+
+    Naive times are treated as UTC, exactly like to_ny_time(). The UTC→NY
+    conversion uses the same tz database, so DST transitions match the
+    per-candle checks.
+    """
+    index = pd.DatetimeIndex(times)
+    if index.tz is None:
+        index = index.tz_localize("UTC")
+    local = index.tz_convert(NY_TZ).tz_localize(None)
+
+    since_midnight = (local - local.normalize()).to_numpy("timedelta64[ns]")
+    valid = ~np.isnat(since_midnight)
+    # datetime.time() has microsecond resolution — truncate the same way.
+    # Missing times (NaT) get -1 so they never fall inside a window.
+    ns_of_day = np.where(valid, since_midnight.astype(np.int64) // 1_000 * 1_000, -1)
+    weekday = np.nan_to_num(local.weekday.to_numpy(dtype=np.float64), nan=-1)
+
+    return SessionMasks(
+        kill_zone=time_of_day_mask(ns_of_day, KILL_ZONE_START, KILL_ZONE_END),
+        fvg_window=time_of_day_mask(ns_of_day, FVG_WINDOW_START, FVG_WINDOW_END),
+        minute_of_day=(ns_of_day // 60_000_000_000).astype(np.int16),
+        weekday=weekday.astype(np.int8),
+        ns_of_day=ns_of_day,
+    )
+
+
+# Masks cached per DataFrame object: id(df) -> (weakref, fingerprint, masks)
+_session_cache: Dict[int, Tuple[weakref.ref, tuple, SessionMasks]] = {}
+
+
+def _time_fingerprint(df: pd.DataFrame) -> tuple:
+    times = df["time"]
+    return (len(times), times.iat[0], times.iat[-1]) if len(times) else (0,)
+
+
+def get_session_masks(df: pd.DataFrame) -> SessionMasks:
+    """
+    Return SessionMasks for df["time"], computed once per DataFrame.
+
+    Detectors and the backtest call this repeatedly on the same frame; the
+    cache entry is dropped when the frame is garbage-collected and rebuilt
+    if the time column no longer matches.
+    """
+    key = id(df)
+    fingerprint = _time_fingerprint(df)
+    cached = _session_cache.get(key)
+    if cached is not None:
+        ref, cached_fingerprint, masks = cached
+        if ref() is df and cached_fingerprint == fingerprint:
+            return masks
+
+    masks = compute_session_masks(df["time"])
+    ref = weakref.ref(df, lambda _, key=key: _session_cache.pop(key, None))
+    _session_cache[key] = (ref, fingerprint, masks)
+    return masks
+
+
 def is_weekday(dt: datetime) -> bool:
     """Check if it's a trading day (Monday–Friday)."""
     return dt.weekday() < 5  # 0=Mon, 4=Fri
@@ -47,3 +135,34 @@ def is_weekday(dt: datetime) -> bool:
 def get_ny_now() -> datetime:
     """Get the current time in New York timezone."""
     return datetime.now(NY_TZ)
+
+
+# ─── Trade-server clock ────────────────────────────────────────────────────────
+# MT5 stamps candles and deals in the trade server's clock. Hours it runs
+# ahead of UTC; None = the "New York close" convention most brokers follow
+# (server midnight is the D1 close at D1_CLOSE_HOUR_NY: GMT+2 in NY winter,
+# GMT+3 in NY summer with the default 17:00). The simulated broker uses UTC.
+SERVER_UTC_OFFSET_HOURS = getattr(config, "SERVER_UTC_OFFSET_HOURS",
+                                  0 if getattr(config, "BROKER_BACKEND", "mt5") == "sim" else None)
+_SERVER_CLOSE_HOUR_NY = getattr(config, "D1_CLOSE_HOUR_NY", 17)
+
+
+def utc_to_server(utc_dt: datetime, offset: Optional[float] = SERVER_UTC_OFFSET_HOURS) -> datetime:
+    """Naive trade-server time of a naive UTC time."""
+    if offset is not None:
+        return utc_dt + timedelta(hours=offset)
+    ny = pytz.utc.localize(utc_dt).astimezone(NY_TZ).replace(tzinfo=None)
+    return ny + timedelta(hours=24 - _SERVER_CLOSE_HOUR_NY)
+
+
+def server_to_utc(server_dt: datetime, offset: Optional[float] = SERVER_UTC_OFFSET_HOURS) -> datetime:
+    """Naive UTC time of a naive trade-server time."""
+    if offset is not None:
+        return server_dt - timedelta(hours=offset)
+    ny = server_dt - timedelta(hours=24 - _SERVER_CLOSE_HOUR_NY)
+    return NY_TZ.localize(ny).astimezone(pytz.utc).replace(tzinfo=None)
+
+
+def get_server_now() -> datetime:
+    """Current trade-server time (naive, the clock candle times are in)."""
+    return utc_to_server(datetime.now(timezone.utc).replace(tzinfo=None))
@@ -4,15 +4,29 @@ and daily chart exit monitoring.
 """
 
 import pandas as pd
-from typing import Optional
+from datetime import timedelta
+from typing import Dict, Optional
 import config
+from columnar import epoch_ns_array
+from indicators import calculate_emas
+from mtf_panel import closed_count
 from logger import setup_logger, log_trade
+from profiler import span
+from scheduler import next_bar_close
+from time_filter import get_ny_now
 from trident_pattern import TradeSignal
 
 log = setup_logger()
 
+# Gold candle-close exit: close beyond this fraction of the entry price
+GOLD_CLOSE_FILTER_PCT = getattr(config, "GOLD_CLOSE_FILTER_PCT", 0.005)
 
-def execute_entry(signal: TradeSignal, mt5_conn) -> Optional[dict]:
+DAILY_BIAS_BARS = 100  # Daily candles used for the exit EMAs
+DAILY_BIAS_RETRY = getattr(config, "DAILY_BIAS_RETRY", 60)  # First re-fetch delay (s) while the new daily bar is late
+DAILY_BIAS_RETRY_MAX = 3600                                 # Retry delay doubles up to this
+
+
+def execute_entry(signal: TradeSignal, mt5_conn, snapshot=None) -> Optional[dict]:
     """
     Execute a trade entry based on a Trident Pattern signal.
     Uses the MT5 connector to place the order.
@@ -20,12 +34,16 @@ def execute_entry(signal: TradeSignal, mt5_conn) -> Optional[dict]:
     Args:
         signal: The validated TradeSignal
         mt5_conn: The mt5_connector module
+        snapshot: Account snapshot for this tick (default: the connector's shared one)
     
     Returns:
         Order result dict, or None on failure
     """
+    if snapshot is None:
+        snapshot = mt5_conn.get_snapshot()
+
     # Check max open trades
-    open_positions = mt5_conn.get_open_positions()
+    open_positions = snapshot.positions
     bot_positions = [p for p in open_positions if p["symbol"] == signal.symbol]
 
     if len(open_positions) >= config.MAX_OPEN_TRADES:
@@ -36,14 +54,15 @@ def execute_entry(signal: TradeSignal, mt5_conn) -> Optional[dict]:
     sl = signal.stop_loss if signal.use_hard_sl else 0.0
 
     # Place the order
-    result = mt5_conn.place_order(
-        symbol=signal.symbol,
-        order_type=signal.direction,
-        lot=config.LOT_SIZE,
-        sl=sl,
-        tp=0.0,  # TP managed via daily chart monitoring
-        comment=f"Trident_{signal.direction}"
-    )
+    with span("place_order", signal.symbol):
+        result = mt5_conn.place_order(
+            symbol=signal.symbol,
+            order_type=signal.direction,
+            lot=config.LOT_SIZE,
+            sl=sl,
+            tp=0.0,  # TP managed via daily chart monitoring
+            comment=f"Trident_{signal.direction}"
+        )
 
     if result is not None:
         log_trade({
@@ -123,30 +142,100 @@ def should_exit_on_daily(daily_df: pd.DataFrame, direction: str) -> bool:
     return False
 
 
+class DailyBiasCache:
+    """
+    Daily-chart exit inputs per symbol, shared by all positions on it.
+
+    Each entry holds the closed daily candles (with fast EMAs) up to the last
+    closed bar and the should_exit_on_daily verdict per direction. Closed
+    bars are the ones whose period has ended by the open of the newest entry
+    bar — the rule the backtest's MTFPanel uses. The chart
+    is only fetched again once the next daily close (per the scheduler) has
+    passed; if the terminal has not produced the new bar yet (late feed, or
+    a broker day that ends at another hour than D1_CLOSE_HOUR_NY) it is
+    retried with a delay that starts at DAILY_BIAS_RETRY and doubles.
+    """
+
+    def __init__(self, timeframe: Optional[str] = None, bars: int = DAILY_BIAS_BARS):
+        self.timeframe = timeframe or config.BIAS_TIMEFRAME
+        self.bars = bars
+        self._entries: Dict[str, dict] = {}
+
+    def _entry(self, symbol: str, mt5_conn, ny_now) -> Optional[dict]:
+        entry = self._entries.get(symbol)
+        if entry is not None and ny_now < entry["valid_until"]:
+            return entry
+
+        df_daily = mt5_conn.get_candles(symbol, self.timeframe, count=self.bars + 1)
+        if len(df_daily) < 2:
+            return entry
+
+        # Keep closed bars only (without the entry bar, assume the newest row is forming)
+        as_of = mt5_conn.get_last_bar_time(symbol, config.ENTRY_TIMEFRAME)
+        if as_of is None:
+            closed = len(df_daily) - 1
+        else:
+            closed = int(closed_count(epoch_ns_array(df_daily["time"].array),
+                                      as_of * 1_000_000_000, self.timeframe))
+        if closed < 1:
+            return entry
+        df_daily = df_daily.iloc[:closed].reset_index(drop=True)
+        bar_time = df_daily["time"].iloc[-1]
+
+        if entry is not None and entry["bar_time"] == bar_time:
+            delay = min(DAILY_BIAS_RETRY * 2 ** entry["misses"], DAILY_BIAS_RETRY_MAX)
+            entry["misses"] += 1
+            entry["valid_until"] = ny_now + timedelta(seconds=delay)
+            return entry
+
+        entry = {
+            "bar_time": bar_time,
+            "df": calculate_emas(df_daily, config.EMA_FAST_PERIODS),
+            "exit": {},
+            "misses": 0,
+            "valid_until": next_bar_close(ny_now, self.timeframe),
+        }
+        self._entries[symbol] = entry
+        return entry
+
+    def should_exit(self, symbol: str, direction: str, mt5_conn, ny_now=None) -> bool:
+        """should_exit_on_daily on the last closed daily bars, computed once per bar."""
+        entry = self._entry(symbol, mt5_conn, ny_now or get_ny_now())
+        if entry is None:
+            return False
+        if direction not in entry["exit"]:
+            entry["exit"][direction] = should_exit_on_daily(entry["df"], direction)
+        return entry["exit"][direction]
+
+
 def check_gold_candle_filter(df_30m: pd.DataFrame, entry_price: float,
-                              direction: str) -> bool:
+                              direction: str,
+                              close_pct: Optional[float] = None) -> bool:
     """
     Gold-specific exit: instead of hard SL, monitor candle closes.
     If a 30M candle CLOSES beyond the stop level, signal exit.
     
     This prevents getting stopped out by deep liquidity wicks that
-    Gold is known for.
+    Gold is known for. close_pct defaults to GOLD_CLOSE_FILTER_PCT (0.5%).
     
     Returns True if the position should be closed.
     """
     if len(df_30m) < 1:
         return False
 
+    if close_pct is None:
+        close_pct = GOLD_CLOSE_FILTER_PCT
+
     last_candle = df_30m.iloc[-1]
 
     if direction == "BUY":
         # If candle CLOSES below entry by a significant amount, exit
         # We use a generous filter since Gold makes deep wicks
-        if last_candle["close"] < entry_price * 0.995:  # 0.5% below entry
+        if last_candle["close"] < entry_price * (1 - close_pct):
             log.info("🥇 Gold candle close filter triggered — exit LONG")
             return True
     elif direction == "SELL":
-        if last_candle["close"] > entry_price * 1.005:
+        if last_candle["close"] > entry_price * (1 + close_pct):
             log.info("🥇 Gold candle close filter triggered — exit SHORT")
             return True
 
@@ -10,30 +10,212 @@ The Trident Pattern sequence:
 5. Price must be on the correct side of the 200 EMA
 """
 
+import numpy as np
 import pandas as pd
-from dataclasses import dataclass
-from typing import Optional
-from fvg_detector import FVG, find_fvgs
-from indicators import are_emas_stacked, get_200ema_bias, is_doji
-from time_filter import is_in_kill_zone
-
-
-@dataclass
-class TradeSignal:
-    """Represents a validated Trident Pattern trade signal."""
-    symbol: str
-    direction: str          # "BUY" or "SELL"
-    entry_price: float      # Price at confirmation candle close
-    stop_loss: float        # Below FVG candle low (longs) or above high (shorts)
-    fvg: FVG                # The FVG that triggered the setup
-    doji_idx: int           # Index of the doji candle
-    confirmation_idx: int   # Index of the confirmation candle
-    signal_time: pd.Timestamp
-    use_hard_sl: bool       # Whether to use hard SL (False for Gold)
+from typing import List, Optional
+import kernels
+from columnar import NAT, ColumnStore, RowView, epoch_ns_array
+from fvg_detector import BULLISH, FVG, FVGArrays, detect_fvgs
+from indicators import doji_mask, stacked_mask
+from time_filter import get_session_masks
+from profiler import span
+
+
+# Direction codes of SignalArrays.direction
+BUY = 1
+SELL = -1
+
+
+class SignalArrays(ColumnStore):
+    """
+    Columnar Trident signals for one symbol, in chronological order.
+
+    fvg_row indexes the FVGArrays the signals were found in; signal_time is
+    int64 epoch nanoseconds. Rows are read as TradeSignal views.
+    """
+    FIELDS = {
+        "direction": "i1",          # BUY or SELL
+        "entry_price": "f8",        # Price at confirmation candle close
+        "stop_loss": "f8",          # Below FVG candle low (longs) or above high (shorts)
+        "fvg_row": "i8",            # Row of the triggering FVG in .fvgs
+        "doji_idx": "i8",           # Index of the doji candle
+        "confirmation_idx": "i8",   # Index of the confirmation candle
+        "signal_time": "i8",
+    }
+    ENUMS = {"direction": {BUY: "BUY", SELL: "SELL"}}
+    TIMES = ("signal_time",)
+
+    def __init__(self, symbol: str, fvgs: FVGArrays, use_hard_sl: bool):
+        super().__init__()
+        self.symbol = symbol
+        self.fvgs = fvgs
+        self.use_hard_sl = use_hard_sl  # Whether to use hard SL (False for Gold)
+
+    def _frame_prefix(self) -> dict:
+        return {"symbol": self.symbol}
+
+
+class TradeSignal(RowView):
+    """Represents a validated Trident Pattern trade signal (a row view of a SignalArrays)."""
+    __slots__ = ()
+    _fields = ("symbol", "direction", "entry_price", "stop_loss", "fvg", "doji_idx",
+               "confirmation_idx", "signal_time", "use_hard_sl")
+
+    @property
+    def symbol(self) -> str:
+        return self._store.symbol
+
+    @property
+    def fvg(self) -> FVG:                # The FVG that triggered the setup
+        return self._store.fvgs[self._store._cols["fvg_row"].item(self._row)]
+
+    @property
+    def use_hard_sl(self) -> bool:
+        return self._store.use_hard_sl
+
+
+SignalArrays.bind(TradeSignal)
+
+
+def signal_rows(fvgs: FVGArrays, open_: np.ndarray, high: np.ndarray,
+                low: np.ndarray, close: np.ndarray, fast_emas: List[np.ndarray],
+                trend_ema: np.ndarray, kill_zone: Optional[np.ndarray] = None,
+                doji_threshold: Optional[float] = None) -> np.ndarray:
+    """
+    Evaluate every FVG in one vectorized pass over raw candle arrays.
+
+    Each FVG has exactly one doji candidate (the candle after candle3) and one
+    confirmation candidate (the candle after the doji), so all conditions are
+    array lookups at those positions. fast_emas is ordered fastest to slowest;
+    kill_zone is a per-candle mask (None skips the time check). Returns the
+    FVG rows that form a complete Trident Pattern, in chronological order.
+    Runs as a compiled loop when kernels.ENABLED.
+    """
+    if kernels.ENABLED:
+        return kernels.signal_rows(fvgs.direction, fvgs.midpoint, fvgs.candle1_idx,
+                                   open_, high, low, close, fast_emas, trend_ema,
+                                   kill_zone=kill_zone, threshold=doji_threshold)
+
+    n = len(close)
+    doji_idx = fvgs.candle3_idx + 1
+    confirm_idx = fvgs.candle3_idx + 2
+
+    # Make sure we have enough candles
+    rows = np.flatnonzero(confirm_idx < n)
+    if not len(rows):
+        return rows
+
+    doji_idx = doji_idx[rows]
+    confirm_idx = confirm_idx[rows]
+    bullish = fvgs.direction[rows] == BULLISH
+    midpoint = fvgs.midpoint[rows]
+
+    # ─── Step 1: Doji right after the FVG ──────────────────────────────
+    valid = doji_mask(open_[doji_idx], high[doji_idx], low[doji_idx],
+                      close[doji_idx], threshold=doji_threshold)
+
+    # ─── Step 2: Doji wicks into FVG 50% ───────────────────────────────
+    # Bullish: doji low reaches the midpoint; bearish: doji high reaches it
+    wick_ok = np.where(bullish, ~(low[doji_idx] > midpoint),
+                       ~(high[doji_idx] < midpoint))
+
+    # ─── Step 3: Confirmation candle ───────────────────────────────────
+    # Longs must close at or below the doji high (controlled move, not
+    # explosive); shorts must close at or above the doji low
+    confirm_close = close[confirm_idx]
+    confirm_ok = np.where(bullish, ~(confirm_close > high[doji_idx]),
+                          ~(confirm_close < low[doji_idx]))
+
+    # ─── Step 4: EMA stacking ──────────────────────────────────────────
+    emas = [ema[confirm_idx] for ema in fast_emas]
+    stack_ok = np.where(bullish, stacked_mask(emas, "long"),
+                        stacked_mask(emas, "short"))
+
+    # ─── Step 5: 200 EMA bias ──────────────────────────────────────────
+    trend = trend_ema[confirm_idx]
+    bias_ok = np.where(bullish, confirm_close > trend, confirm_close < trend)
+
+    valid &= wick_ok & confirm_ok & stack_ok & bias_ok
+
+    # ─── Step 6: Time check ────────────────────────────────────────────
+    if kill_zone is not None:
+        valid &= kill_zone[confirm_idx]
+
+    return rows[valid]
+
+
+def _find_signal_rows(df: pd.DataFrame, fvgs: FVGArrays,
+                      check_time: bool = True) -> np.ndarray:
+    """signal_rows() on the columns of a candle DataFrame with EMA columns."""
+    import config
+
+    ema_col = f"ema_{config.EMA_TREND_PERIOD}"
+    if ema_col not in df.columns:
+        return np.empty(0, dtype=np.int64)  # No 200 EMA bias → neutral → never valid
+
+    kill_zone = None
+    if check_time and "time" in df.columns:
+        kill_zone = get_session_masks(df).kill_zone
+
+    return signal_rows(
+        fvgs,
+        df["open"].to_numpy(dtype=np.float64),
+        df["high"].to_numpy(dtype=np.float64),
+        df["low"].to_numpy(dtype=np.float64),
+        df["close"].to_numpy(dtype=np.float64),
+        [df[f"ema_{p}"].to_numpy(dtype=np.float64) for p in config.EMA_FAST_PERIODS],
+        df[ema_col].to_numpy(dtype=np.float64),
+        kill_zone=kill_zone,
+    )
+
+
+def _build_signals(df: pd.DataFrame, symbol: str, fvgs: FVGArrays,
+                   rows: np.ndarray) -> SignalArrays:
+    """SignalArrays for the validated FVG rows, built column by column."""
+    import config
+
+    is_gold = symbol.upper() in ["XAUUSD", "GOLD"]
+    confirm_idx = fvgs.candle3_idx[rows] + 2
+    is_buy = fvgs.direction[rows] == BULLISH
+    if "time" in df.columns:
+        signal_time = epoch_ns_array(df["time"].array[confirm_idx])
+    else:
+        signal_time = np.full(len(rows), NAT, dtype=np.int64)
+
+    return SignalArrays.from_columns({
+        "direction": np.where(is_buy, BUY, SELL),
+        "entry_price": df["close"].to_numpy(dtype=np.float64)[confirm_idx],
+        # Below the FVG impulse candle low (longs) / above its high (shorts)
+        "stop_loss": np.where(is_buy, fvgs.fvg_candle_low[rows], fvgs.fvg_candle_high[rows]),
+        "fvg_row": rows,
+        "doji_idx": confirm_idx - 1,
+        "confirmation_idx": confirm_idx,
+        "signal_time": signal_time,
+    }, symbol=symbol, fvgs=fvgs, use_hard_sl=not is_gold or config.GOLD_USE_HARD_SL)
+
+
+def scan_all_signals(df: pd.DataFrame, symbol: str,
+                     check_time: bool = True) -> SignalArrays:
+    """
+    Find every valid Trident Pattern in the DataFrame in a single pass.
+
+    Unlike validate_trident_pattern(), which only reports the most recent
+    setup, this returns all of them in chronological order (iterate for
+    TradeSignal views, or use the columns directly). Signal indices
+    (doji_idx, confirmation_idx, fvg.candle*_idx) are positions in df, so a
+    full-history frame yields absolute bar indices.
+    """
+    fvgs = detect_fvgs(df, check_time=check_time)
+    if not len(fvgs):
+        return _build_signals(df, symbol, fvgs, np.empty(0, dtype=np.int64))
+
+    rows = _find_signal_rows(df, fvgs, check_time=check_time)
+    return _build_signals(df, symbol, fvgs, rows)
 
 
 def validate_trident_pattern(df: pd.DataFrame, symbol: str,
-                              check_time: bool = True) -> Optional[TradeSignal]:
+                              check_time: bool = True,
+                              fvg_index=None) -> Optional[TradeSignal]:
     """
     Scan the candle data for a complete Trident Pattern.
     
@@ -44,131 +226,33 @@ def validate_trident_pattern(df: pd.DataFrame, symbol: str,
     4. Verify EMA stacking and 200 EMA bias
     5. Verify time is within kill zone
     
-    Returns a TradeSignal if a valid pattern is found, None otherwise.
+    Returns the most recent valid TradeSignal, or None if no pattern is found.
+    With an up-to-date FVGIndex for df (see fvg_index), its tracked gaps are
+    used instead of re-detecting every gap in df.
     """
-    import config
-
     if len(df) < 6:
         return None
 
-    # Get all FVGs
-    fvgs = find_fvgs(df, check_time=check_time)
+    with span("fvg", symbol):
+        if fvg_index is None:
+            fvgs = detect_fvgs(df, check_time=check_time)
+        else:
+            fvgs = fvg_index.fvgs_for(df)
+    if not len(fvgs):
+        return None
 
-    if not fvgs:
+    with span("trident", symbol):
+        rows = _find_signal_rows(df, fvgs, check_time=check_time)
+    if not len(rows):
         return None
 
-    # Check each FVG for the Trident Pattern (most recent first)
-    for fvg in reversed(fvgs):
-        doji_idx = fvg.candle3_idx + 1      # Candle right after FVG
-        confirm_idx = fvg.candle3_idx + 2    # Candle after doji
-
-        # Make sure we have enough candles
-        if confirm_idx >= len(df):
-            continue
-
-        doji_candle = df.iloc[doji_idx]
-        confirm_candle = df.iloc[confirm_idx]
-
-        # ─── Step 1: Check doji ─────────────────────────────────────────
-        if not is_doji(doji_candle):
-            continue
-
-        # ─── Step 2: Check doji wicks into FVG 50% ─────────────────────
-        if fvg.direction == "bullish":
-            # Doji must wick DOWN into the FVG midpoint zone
-            # The low of the doji should reach near or below the FVG midpoint
-            if doji_candle["low"] > fvg.midpoint:
-                continue  # Doji didn't wick deep enough
-
-            # ─── Step 3: Confirmation candle ────────────────────────────
-            # Must close below doji's high (per strategy PDF)
-            if confirm_candle["close"] >= doji_candle["high"]:
-                # Actually for bullish, confirmation should show continuation
-                # The PDF says "close below doji high" — meaning it doesn't
-                # break above the doji, confirming a controlled pattern
-                pass  # This is actually the VALID condition per strategy
-            
-            # Re-check: For a BULLISH trade, the confirmation candle should
-            # close BELOW the doji's high (controlled move, not explosive)
-            if confirm_candle["close"] > doji_candle["high"]:
-                continue  # Invalid — broke above doji high
-
-            # ─── Step 4: EMA stacking ──────────────────────────────────
-            if not are_emas_stacked(df, "long", confirm_idx):
-                continue
-
-            # ─── Step 5: 200 EMA bias ──────────────────────────────────
-            bias = get_200ema_bias(df, confirm_idx)
-            if bias != "long":
-                continue
-
-            # ─── Step 6: Time check ────────────────────────────────────
-            if check_time and "time" in df.columns:
-                if not is_in_kill_zone(confirm_candle["time"]):
-                    continue
-
-            # ─── Valid bullish Trident Pattern! ────────────────────────
-            is_gold = symbol.upper() in ["XAUUSD", "GOLD"]
-            use_hard_sl = not is_gold or config.GOLD_USE_HARD_SL
-
-            return TradeSignal(
-                symbol=symbol,
-                direction="BUY",
-                entry_price=confirm_candle["close"],
-                stop_loss=fvg.fvg_candle_low,  # Below the FVG impulse candle low
-                fvg=fvg,
-                doji_idx=doji_idx,
-                confirmation_idx=confirm_idx,
-                signal_time=confirm_candle.get("time", pd.NaT),
-                use_hard_sl=use_hard_sl,
-            )
-
-        elif fvg.direction == "bearish":
-            # Doji must wick UP into the FVG midpoint zone
-            if doji_candle["high"] < fvg.midpoint:
-                continue  # Doji didn't wick deep enough
-
-            # Confirmation candle must close above doji's low (for shorts)
-            if confirm_candle["close"] < doji_candle["low"]:
-                continue  # Invalid for short
-
-            # EMA stacking for shorts
-            if not are_emas_stacked(df, "short", confirm_idx):
-                continue
-
-            # 200 EMA bias
-            bias = get_200ema_bias(df, confirm_idx)
-            if bias != "short":
-                continue
-
-            # Time check
-            if check_time and "time" in df.columns:
-                if not is_in_kill_zone(confirm_candle["time"]):
-                    continue
-
-            # Valid bearish Trident Pattern!
-            is_gold = symbol.upper() in ["XAUUSD", "GOLD"]
-            use_hard_sl = not is_gold or config.GOLD_USE_HARD_SL
-
-            return TradeSignal(
-                symbol=symbol,
-                direction="SELL",
-                entry_price=confirm_candle["close"],
-                stop_loss=fvg.fvg_candle_high,  # Above FVG impulse candle high
-                fvg=fvg,
-                doji_idx=doji_idx,
-                confirmation_idx=confirm_idx,
-                signal_time=confirm_candle.get("time", pd.NaT),
-                use_hard_sl=use_hard_sl,
-            )
-
-    return None
-
-
-def scan_for_signals(df: pd.DataFrame, symbol: str,
-                     check_time: bool = True) -> Optional[TradeSignal]:
+    return _build_signals(df, symbol, fvgs, rows[-1:])[0]
+
+
+def scan_for_signals(df: pd.DataFrame, symbol: str, check_time: bool = True,
+                     fvg_index=None) -> Optional[TradeSignal]:
     """
     High-level function to scan for Trident Pattern signals.
     This is the main entry point used by the bot loop and backtest.
     """
-    return validate_trident_pattern(df, symbol, check_time=check_time)
+    return validate_trident_pattern(df, symbol, check_time=check_time, fvg_index=fvg_index)